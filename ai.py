@@ -0,0 +1,277 @@
+"""
+CPU tegenstander: zoekt de beste plaatsing voor de huidige piece.
+
+Voor elke bereikbare (rotatie, x) van de current piece - en optioneel de
+hold piece - wordt de landing berekend met de height map en het bord
+gescoord met een heuristiek (hoogte, lines, holes, bumpiness). De piece
+wordt daarvoor tijdelijk in de row masks ge-OR-d en daarna weer ge-XOR-d,
+dus er wordt geen bord gekopieerd. Met depth=2 (het maximum) kijkt de
+zoektocht ook naar next_piece. Gekozen zetten gaan als gewone input acties
+naar de speler.
+
+Headless: python batch.py --policy ai:ai_policy
+"""
+
+import time
+
+from engine import COLS, SHAPE_TABLE, drop_distance, mask_collides
+
+# El-Tetris style weights
+WEIGHTS = {
+    "height": -0.510066,
+    "lines": 0.760666,
+    "holes": -0.35663,
+    "bumpiness": -0.184483,
+}
+SEARCH_BUDGET_MS = 4.0  # search time per rendered frame
+LOCK_OUT_SCORE = -1e9  # placements that stick out of the top end the game
+SPAWN_Y = -2
+MAX_DEPTH = 2  # current piece + next_piece; a third ply costs ~30x more boards
+
+
+def spawn_x(base_id, cols=COLS):
+    # same centering as Piece.__init__
+    return cols // 2 - SHAPE_TABLE[base_id][0].size // 2
+
+
+def fits(masks, rows, cols, info, x, y):
+    if x + info.min_x < 0 or x + info.max_x >= cols or y + info.max_y >= rows:
+        return False
+    return not mask_collides(masks, rows, info.row_masks, x, y)
+
+
+def column_heights(masks, rows, cols):
+    """Height map of a list of row masks, scanning top-down until every column is found."""
+    heights = [0] * cols
+    full = (1 << cols) - 1
+    seen = 0
+    for y, m in enumerate(masks):
+        new = m & ~seen
+        while new:
+            low = new & -new
+            heights[low.bit_length() - 1] = rows - y
+            new ^= low
+        seen |= m
+        if seen == full:
+            break
+    return heights
+
+
+def evaluate(masks, rows, cols, weights=WEIGHTS):
+    """Heuristic score of a board given as row masks.
+
+    Full rows count as cleared: they are skipped and the rows above them
+    sink, so callers can OR a piece into the live masks, score it and XOR it
+    back out without copying anything.
+    """
+    full = (1 << cols) - 1
+    cleared = 0
+    for m in masks:
+        if m == full:
+            cleared += 1
+    heights = [0] * cols
+    below = cleared  # cleared rows below the current row
+    cov = holes = 0
+    for y in range(rows):
+        m = masks[y]
+        if m == full:
+            below -= 1
+            continue
+        holes += (cov & ~m).bit_count()
+        new = m & ~cov
+        if new:
+            h = rows - y - below
+            while new:
+                low = new & -new
+                heights[low.bit_length() - 1] = h
+                new ^= low
+            cov |= m
+    bumpiness = 0
+    for i in range(cols - 1):
+        bumpiness += abs(heights[i] - heights[i + 1])
+    return (weights["height"] * sum(heights) + weights["lines"] * cleared
+            + weights["holes"] * holes + weights["bumpiness"] * bumpiness)
+
+
+def placements(masks, heights, rows, cols, base_id, rotation, x, y):
+    """Yield (turns, start_x, target_x, landing_y, info) for every placement
+    reachable by rotating in place - with the same -1/+1 wall kicks as
+    Piece.rotate - and then shifting sideways at height y."""
+    infos = SHAPE_TABLE[base_id]
+    for turns in range(len(infos)):
+        info = infos[(rotation + turns) % len(infos)]
+        if turns:
+            for dx in (0, -1, 1):
+                if fits(masks, rows, cols, info, x + dx, y):
+                    x += dx
+                    break
+            else:
+                return  # blocked: further turns are unreachable too
+        elif not fits(masks, rows, cols, info, x, y):
+            return
+        tx = x
+        while fits(masks, rows, cols, info, tx, y):
+            yield turns, x, tx, y + drop_distance(masks, heights, rows, info, tx, y), info
+            tx -= 1
+        tx = x + 1
+        while fits(masks, rows, cols, info, tx, y):
+            yield turns, x, tx, y + drop_distance(masks, heights, rows, info, tx, y), info
+            tx += 1
+
+
+def _place(masks, info, x, y):
+    """OR a landed shape into masks; returns the (row, bits) list to undo it."""
+    changed = []
+    for dy, m in info.row_masks:
+        yy = y + dy
+        if yy >= 0:
+            bits = m << x if x >= 0 else m >> -x
+            masks[yy] |= bits
+            changed.append((yy, bits))
+    return changed
+
+
+def _unplace(masks, changed):
+    for yy, bits in changed:
+        masks[yy] ^= bits
+
+
+def score_placement(masks, rows, cols, info, x, y, weights):
+    """Score one landed placement (copy-free: place, evaluate, undo)."""
+    if y + info.min_y < 0:
+        return LOCK_OUT_SCORE
+    changed = _place(masks, info, x, y)
+    score = evaluate(masks, rows, cols, weights)
+    _unplace(masks, changed)
+    return score
+
+
+def _lookahead(masks, rows, cols, info, x, y, next_id, weights):
+    """Generator: best score over next_id's placements after this one lands.
+
+    Yields after every child placement so the search stays sliceable; the
+    return value is the combined score. Only the row mask list of the child
+    board is built (rows ints), never a Board.
+    """
+    if y + info.min_y < 0:
+        return LOCK_OUT_SCORE
+    changed = _place(masks, info, x, y)
+    full = (1 << cols) - 1
+    kept = [m for m in masks if m != full]
+    _unplace(masks, changed)
+    lines = rows - len(kept)
+    child = [0] * lines + kept
+    child_heights = column_heights(child, rows, cols)
+    bonus = weights["lines"] * lines
+    best = LOCK_OUT_SCORE
+    for _, _, tx, ty, child_info in placements(child, child_heights, rows, cols, next_id, 0,
+                                               spawn_x(next_id, cols), SPAWN_Y):
+        s = score_placement(child, rows, cols, child_info, tx, ty, weights) + bonus
+        if s > best:
+            best = s
+        yield
+    return best
+
+
+def search(player, depth=1, use_hold=True, weights=WEIGHTS):
+    """Generator over the placement search; yields after every scored board
+    so a caller can stop at a time budget. Its return value is the plan.
+
+    depth 1 scores the current (or hold) piece, depth 2 also the best
+    follow-up with next_piece; anything else raises ValueError.
+    """
+    if not 1 <= depth <= MAX_DEPTH:
+        raise ValueError(f"search depth must be 1..{MAX_DEPTH}, got {depth}")
+    board = player.board
+    masks, heights, rows, cols = board.masks, board.heights, board.rows, board.cols
+    current = player.current
+    next_id = player.next_piece.base_id if player.next_piece else None
+    # (action prefix, base_id, rotation, x, y, lookahead piece)
+    branches = [([], current.base_id, current.rotation, current.x, current.y,
+                 next_id if depth > 1 else None)]
+    if use_hold and not current.hold_used:
+        if player.hold_piece is not None:
+            branches.append((["hold"], player.hold_piece.base_id, 0, spawn_x(player.hold_piece.base_id, cols),
+                             SPAWN_Y, next_id if depth > 1 else None))
+        elif next_id is not None:
+            # empty hold: next_piece comes in and the piece after it is unknown
+            branches.append((["hold"], next_id, 0, spawn_x(next_id, cols), SPAWN_Y, None))
+
+    best_score = None
+    plan = ["hard"]
+    for prefix, base_id, rotation, x, y, lookahead in branches:
+        for turns, sx, tx, ty, info in placements(masks, heights, rows, cols, base_id, rotation, x, y):
+            if lookahead is None:
+                s = score_placement(masks, rows, cols, info, tx, ty, weights)
+                yield
+            else:
+                s = yield from _lookahead(masks, rows, cols, info, tx, ty, lookahead, weights)
+            if best_score is None or s > best_score:
+                best_score = s
+                shift = "left" if tx < sx else "right"
+                plan = prefix + ["rotate"] * turns + [shift] * abs(tx - sx) + ["hard"]
+    return plan
+
+
+def best_plan(player, depth=1, use_hold=True, weights=WEIGHTS):
+    """Run the whole search at once (no time budget)."""
+    gen = search(player, depth, use_hold, weights)
+    while True:
+        try:
+            next(gen)
+        except StopIteration as done:
+            return done.value
+
+
+def ai_policy(player, rng):
+    """headless/batch policy: place every piece with a depth-1 search."""
+    return best_plan(player)
+
+
+class CpuController:
+    """Drives one TetrisPlayer through its input actions.
+
+    update() is called once per rendered frame: it resumes the search for at
+    most budget_ms and, once a plan is ready, returns its actions for the
+    caller to queue like key presses. A new search starts whenever the
+    current piece changes (spawn, hold or random swap), and a running one
+    starts over when the board changes (garbage, shrink, undo): the search
+    reads the live row masks, so it would plan for a board that is gone.
+    depth is 1 or 2 (MAX_DEPTH), as in search().
+    """
+
+    def __init__(self, player, depth=2, use_hold=True, budget_ms=SEARCH_BUDGET_MS, weights=WEIGHTS):
+        if not 1 <= depth <= MAX_DEPTH:
+            raise ValueError(f"search depth must be 1..{MAX_DEPTH}, got {depth}")
+        self.player = player
+        self.depth = depth
+        self.use_hold = use_hold
+        self.budget_ms = budget_ms
+        self.weights = weights
+        self.piece = None
+        self.masks = None  # board rows the running search started from
+        self._search = None
+        self.last_search_ms = 0.0  # wall time spent on the last finished search
+
+    def update(self):
+        current = self.player.current
+        masks = self.player.board.masks
+        # a finished plan is already queued: only a running search restarts on a board change
+        if current is not self.piece or (self._search is not None and masks != self.masks):
+            self.piece = current
+            self.masks = list(masks)
+            self._search = search(self.player, self.depth, self.use_hold, self.weights)
+            self._spent = 0.0
+        if self._search is None:
+            return []
+        start = time.perf_counter()
+        deadline = start + self.budget_ms / 1000.0
+        try:
+            while time.perf_counter() < deadline:
+                next(self._search)
+        except StopIteration as done:
+            self._search = None
+            self.last_search_ms = self._spent + (time.perf_counter() - start) * 1000.0
+            return done.value
+        self._spent += (time.perf_counter() - start) * 1000.0
+        return []
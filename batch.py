@@ -0,0 +1,100 @@
+"""
+Batch simulator: speelt veel headless games parallel over een process pool.
+
+Seeds worden over alle combinaties van de gekozen modes verdeeld en in
+chunks naar worker processes gestuurd. Resultaten komen terug zodra een game
+klaar is (imap_unordered), zodat lange sweeps direct output geven.
+
+Run: python batch.py --games 10000 --workers 8 > results.jsonl
+"""
+
+import argparse
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from engine import DEFAULT_MODES
+from headless import MAX_TICKS, random_policy, run_game
+
+SWEEP_MODES = ("bombs", "hyper_mode", "random_swap")
+
+
+def mode_combinations(names=SWEEP_MODES, base=None):
+    """Every on/off combination of the given mode names on top of base."""
+    base = dict(DEFAULT_MODES if base is None else base)
+    combos = []
+    for values in itertools.product((False, True), repeat=len(names)):
+        modes = dict(base)
+        modes.update(zip(names, values))
+        combos.append(modes)
+    return combos
+
+
+def load_policy(spec):
+    """Resolve "module:function" to a policy callable (None -> random_policy)."""
+    if not spec:
+        return random_policy
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _run_task(task):
+    # worker side: policies travel as "module:function" so they pickle cheaply
+    seed, modes, policy_spec, max_ticks = task
+    result = run_game(seed, modes, load_policy(policy_spec), max_ticks)
+    result["modes"] = {k: modes[k] for k in SWEEP_MODES}
+    return result
+
+
+def iter_tasks(games, seed, mode_sets, policy_spec, max_ticks):
+    for i in range(games):
+        yield seed + i, mode_sets[i % len(mode_sets)], policy_spec, max_ticks
+
+
+def run_batch(games, seed=0, mode_sets=None, policy_spec=None, workers=None, max_ticks=MAX_TICKS):
+    """Yield per-game result dicts as workers finish them (unordered)."""
+    mode_sets = mode_sets or mode_combinations()
+    workers = workers or os.cpu_count() or 1
+    tasks = iter_tasks(games, seed, mode_sets, policy_spec, max_ticks)
+    if workers == 1:
+        for task in tasks:
+            yield _run_task(task)
+        return
+    # a few chunks per worker keeps IPC low without starving the tail
+    chunksize = max(1, games // (workers * 8))
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(_run_task, tasks, chunksize):
+            yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many headless Tetris games in parallel.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="default: cpu count")
+    parser.add_argument("--policy", default=None, help="module:function, default headless:random_policy")
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS)
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    games = pieces = 0
+    causes = {}
+    for result in run_batch(args.games, args.seed, policy_spec=args.policy,
+                            workers=args.workers, max_ticks=args.max_ticks):
+        games += 1
+        pieces += result["pieces"]
+        causes[result["cause"]] = causes.get(result["cause"], 0) + 1
+        if not args.quiet:
+            print(json.dumps(result), flush=True)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"games: {games}  pieces: {pieces}  time: {elapsed:.2f}s  causes: {causes}", file=sys.stderr)
+    print(f"games/s: {games / elapsed:.1f}  pieces/s: {pieces / elapsed:.0f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,647 @@
+"""
+Benchmark suite voor de engine en renderer hot paths.
+
+Elke bench draait een seeded synthetische workload (bijna volle borden,
+borden vol bombs, een Hyper mode late game, twee spelers) en meet de tijd
+per operatie of per frame. Rendering gaat naar een offscreen surface via
+SDL's dummy video driver, dus er is geen display nodig.
+
+Resultaten (ops/sec plus p50/p95 per op) gaan als JSON naar --out en worden
+vergeleken met een opgeslagen baseline. Omdat CI machines sneller of
+trager zijn dan de machine die de baseline maakte, wordt elke score eerst
+gedeeld door de mediaan van een korte pure-Python kalibratie loop die voor
+elke bench draait (--absolute zet dat uit). Per bench telt de mediaan
+operatie van de mediaan ronde, zodat een enkele trage of snelle uitschieter
+de vergelijking niet bepaalt.
+Een bench die meer dan de threshold van zijn groep (THRESHOLDS, of
+--threshold) achteruit gaat laat het script falen met exit code 1.
+
+Let op, dit is geen regressie gate in CI: de bench job daar heeft
+continue-on-error en laat de build nooit falen, ook niet bij exit code 1.
+Dezelfde code schommelt tussen runs op gedeelde machines 20-40%, ook met
+medianen en kalibratie, dus een realistische threshold (10-15%) zou
+willekeurig falen. De thresholds staan daarom ruim (40% engine, 50%
+render) en vangen alleen grove regressies; de cijfers per run staan in het
+bench-results artifact. Lokaal, op een rustige machine, kan een strengere
+--threshold tegen een eigen --update-baseline wel als gate dienen.
+
+Run: python bench.py --baseline bench_baseline.json
+     python bench.py --update-baseline            # nieuwe baseline schrijven
+"""
+
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from engine import (
+    DEFAULT_MODES, GRAVITY_20G, GRAVITY_ONE, LOCK_DELAY_MS, PREVIEW, Board, ManualClock, Piece, PieceQueue,
+    TetrisPlayer, add_garbage_line, apply_action, clear_rows, fill_column, lock_piece, piece_chunk,
+    piece_sequence, valid_position,
+)
+from headless import TICK_MS
+from profiler import percentile
+import snapshot
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+# allowed slowdown per group before a bench counts as a regression; shared
+# runners swing ~20-40% between runs even on medians, and blits through SDL
+# jitter more than the pure-Python engine code. Only gross regressions trip
+# these, and CI doesn't gate on them (see the module docstring)
+THRESHOLDS = {"engine": 0.40, "render": 0.50}
+SAMPLES = 15  # timed batches per engine bench
+FRAMES = 300  # timed frames per render bench
+QUICK_FACTOR = 4  # --quick divides samples and frames by this
+ROUNDS = 5  # passes over the suite; the median one per bench counts
+CALIBRATION_LOOPS = 50000
+SEED = 1234
+
+# everything optional off; each bench switches on the modes it measures
+BENCH_MODES = dict(DEFAULT_MODES, random_swap=False, hyper_mode=False, invisible_mode=False,
+                   multiplayer_local=False, sound=False)
+
+
+# ===========================
+# WORKLOADS
+# ===========================
+def clone_board(board):
+    copy = Board(board.cols, board.rows)
+    copy.masks[:] = board.masks
+    copy.colors = [row[:] for row in board.colors]
+    copy.heights[:] = board.heights
+    copy.bombs = set(board.bombs)
+    return copy
+
+
+def near_full_board(rng, cols=10, rows=20, fill=0.75, bomb_rate=0.0):
+    """Bottom fill*rows rows full except one hole each, ragged stack on top.
+
+    bomb_rate: chance per filled cell to be a live bomb tile instead.
+    """
+    board = Board(cols, rows)
+    top = rows - int(rows * fill)
+    for y in range(top, rows):
+        hole = rng.randrange(cols)
+        for x in range(cols):
+            if x != hole:
+                if rng.random() < bomb_rate:
+                    board.set_bomb(x, y, rng.randint(1, 7))
+                else:
+                    board.set_cell(x, y, rng.randint(1, 7))
+    # a couple of loose cells above the stack so heights differ per column
+    for x in range(cols):
+        for y in range(top - rng.randint(0, 2), top):
+            board.set_cell(x, y, rng.randint(1, 7))
+    return board
+
+
+def random_piece(rng, board, bomb=False):
+    piece = Piece(rng.randint(1, 7), is_bomb=bomb, cols=board.cols)
+    piece.rotation = rng.randrange(len(piece.rotations))
+    piece.info = piece.rotations[piece.rotation]
+    piece.x = rng.randint(-piece.info.min_x, board.cols - 1 - piece.info.max_x)
+    return piece
+
+
+def dropped_piece(rng, board, bomb=False):
+    """A random piece at its hard-drop landing row."""
+    piece = random_piece(rng, board, bomb)
+    piece.y += board.drop_distance(piece.info, piece.x, piece.y)
+    return piece
+
+
+def hyper_late_player(seed, minutes=3):
+    """Player with Hyper mode on, fast-forwarded to a late-game field.
+
+    The shrink columns and garbage of `minutes` of play are applied directly
+    (playing there with a random policy tops out long before), the next
+    garbage window / shrink are due a few seconds in.
+    """
+    rng = random.Random(seed)
+    modes = dict(BENCH_MODES, hyper_mode=True, random_swap=True)
+    clock = ManualClock()
+    player = TetrisPlayer(modes, "HYPER", clock=clock, seed=seed)
+    board = player.board
+    shrinks = minutes * 60000 // 45000
+    for i in range(shrinks):
+        if i % 2 == 0:
+            player.shrink_right += 1
+            fill_column(board, board.cols - player.shrink_right, rng)
+        else:
+            player.shrink_left += 1
+            fill_column(board, player.shrink_left - 1, rng)
+    for _ in range(6):
+        add_garbage_line(board, rng)
+    clock.advance(minutes * 60000 - 5000)
+    player.last_drop_time = clock.ticks()
+    player.events.clear()
+    player.events.schedule(clock.ticks() + 2000, "garbage_window")
+    player.events.schedule(clock.ticks() + 4000, "shrink")
+    player.events.schedule(clock.ticks() + 1000, "swap")
+    return player
+
+
+class GravityDriver:
+    """Shifts every new piece a random amount and lets gravity drop it.
+
+    Cheap enough to keep the tick benches about the engine, and with a
+    late-game gravity (default 50 ms per row, no lock delay) the stack still
+    sees locks, clears and top outs.
+    """
+
+    def __init__(self, rng, gravity=GRAVITY_ONE // 50, lock_delay=0):
+        self.rng = rng
+        self.gravity = gravity
+        self.lock_delay = lock_delay
+        self.pieces = {}  # player -> last piece that was shifted
+
+    def tick(self, player):
+        """One 60 FPS frame; False on game over."""
+        player.gravity = self.gravity
+        player.lock_delay = self.lock_delay
+        piece = player.current
+        if self.pieces.get(player) is not piece:
+            self.pieces[player] = piece
+            action = self.rng.choice(("left", "right"))
+            for _ in range(self.rng.randint(0, player.board.cols // 2)):
+                x = piece.x
+                apply_action(player, action)
+                # never steer over filled (shrink) columns while above the field
+                y, piece.y = piece.y, max(piece.y, 0)
+                inside = valid_position(piece, player.board)
+                piece.y = y
+                if not inside:
+                    piece.x = x
+                    break
+        return player.step()
+
+
+# ===========================
+# BENCHES
+# ===========================
+BENCHES = []
+
+
+def bench(name, group="engine"):
+    """Register fn(seed) -> (prepare, run, ops).
+
+    prepare() builds fresh state outside the timer, run(state) is timed and
+    does `ops` operations (or returns the count it did). One prepare/run
+    pair is one sample.
+    """
+    def register(fn):
+        BENCHES.append((name, group, fn))
+        return fn
+    return register
+
+
+@bench("valid_position/near_full")
+def bench_valid_position(seed):
+    rng = random.Random(seed)
+    board = near_full_board(rng)
+    probes = []
+    for _ in range(2000):
+        piece = random_piece(rng, board)
+        piece.x += rng.randint(-1, 1)  # include some out of bounds probes
+        piece.y = rng.randint(-2, board.rows - 1)
+        probes.append(piece)
+
+    def run(_):
+        for piece in probes:
+            valid_position(piece, board)
+    return None, run, len(probes)
+
+
+def _lock_workload(seed, bomb_rate, bomb_pieces):
+    rng = random.Random(seed)
+    modes = dict(BENCH_MODES, bombs=bomb_pieces)
+    boards = [near_full_board(rng, bomb_rate=bomb_rate) for _ in range(50)]
+    pieces = [dropped_piece(rng, b, bomb_pieces and rng.random() < 0.5) for b in boards]
+
+    def prepare():
+        return [clone_board(b) for b in boards]
+
+    def run(fresh):
+        for board, piece in zip(fresh, pieces):
+            affected = lock_piece(piece, board, modes)
+            clear_rows(board, {y for _, y in affected})
+    return prepare, run, len(boards)
+
+
+@bench("lock_clear/near_full")
+def bench_lock_clear(seed):
+    return _lock_workload(seed, 0.0, False)
+
+
+@bench("lock_clear/bombs")
+def bench_lock_clear_bombs(seed):
+    return _lock_workload(seed, 0.15, True)
+
+
+@bench("clear_rows/all_rows")
+def bench_clear_all(seed):
+    # full scan after a shrink: every row is a candidate, several are full
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(50):
+        board = near_full_board(rng)
+        fill_column(board, rng.randrange(board.cols), rng)
+        boards.append(board)
+
+    def prepare():
+        return [clone_board(b) for b in boards]
+
+    def run(fresh):
+        for board in fresh:
+            clear_rows(board)
+    return prepare, run, len(boards)
+
+
+@bench("add_garbage_line/near_full")
+def bench_garbage(seed):
+    rng = random.Random(seed)
+    boards = [near_full_board(rng, fill=0.5, bomb_rate=0.05) for _ in range(50)]
+    garbage_rng = random.Random(seed + 1)
+
+    def prepare():
+        return [clone_board(b) for b in boards]
+
+    def run(fresh):
+        for board in fresh:
+            for _ in range(4):
+                add_garbage_line(board, garbage_rng)
+    return prepare, run, len(boards) * 4
+
+
+@bench("tick/hyper_late")
+def bench_hyper_ticks(seed):
+    driver = GravityDriver(random.Random(seed))
+
+    def prepare():
+        return hyper_late_player(seed)
+
+    def run(player):
+        ticks = 0
+        while ticks < 600:
+            ticks += 1
+            if not driver.tick(player):
+                break
+            player.clock.advance(TICK_MS)
+        return ticks
+    return prepare, run, None
+
+
+@bench("tick/two_players")
+def bench_versus_ticks(seed):
+    driver = GravityDriver(random.Random(seed))
+    modes = dict(BENCH_MODES, bombs=True, random_swap=True, multiplayer_local=True)
+
+    def prepare():
+        clock = ManualClock()
+        return clock, [TetrisPlayer(modes, f"P{i + 1}", clock=clock, seed=seed + i) for i in range(2)]
+
+    def run(state):
+        clock, players = state
+        ticks = 0
+        while ticks < 600:
+            ticks += 1
+            if not all([driver.tick(p) for p in players]):
+                break
+            clock.advance(TICK_MS)
+        return ticks
+    return prepare, run, None
+
+
+@bench("tick/20g")
+def bench_20g_ticks(seed):
+    # top speed: every piece lands on its first tick and sits out the lock delay
+    driver = GravityDriver(random.Random(seed), GRAVITY_20G, LOCK_DELAY_MS)
+    modes = dict(BENCH_MODES, bombs=True)
+
+    def prepare():
+        clock = ManualClock()
+        return clock, TetrisPlayer(modes, "20G", clock=clock, seed=seed)
+
+    def run(state):
+        clock, player = state
+        ticks = 0
+        while ticks < 600:
+            ticks += 1
+            if not driver.tick(player):
+                break
+            clock.advance(TICK_MS)
+        return ticks
+    return prepare, run, None
+
+
+@bench("clone/player")
+def bench_clone(seed):
+    # AI rollouts fork a player per candidate; the rows are shared copy-on-write
+    player = hyper_late_player(seed)
+
+    def run(_):
+        for _ in range(200):
+            player.clone()
+    return None, run, 200
+
+
+@bench("clone/fork_and_lock")
+def bench_clone_lock(seed):
+    # fork + hard drop: the first writes copy only the rows the lock touches
+    player = hyper_late_player(seed)
+
+    def run(_):
+        for _ in range(100):
+            player.clone().hard_drop()
+    return None, run, 100
+
+
+@bench("queue/spawn")
+def bench_queue_spawn(seed):
+    # lock -> next piece: pop the preview, refill it, recycle the locked piece
+    modes = dict(BENCH_MODES, bombs=True)
+    piece_sequence(seed, 1000 + PREVIEW)  # pre-generated, so only cached chunks are read
+
+    def prepare():
+        return PieceQueue(seed, modes)
+
+    def run(queue):
+        for now in range(1000):
+            queue.release(queue.pop(now))
+    return prepare, run, 1000
+
+
+@bench("queue/generate")
+def bench_queue_generate(seed):
+    # bulk pre-generation of 7-bag sequences (headless batches, benches)
+    def prepare():
+        piece_chunk.cache_clear()
+
+    def run(_):
+        piece_sequence(seed, 5600, bag=True)
+    return prepare, run, 5600
+
+
+@bench("snapshot/dumps")
+def bench_snapshot_dumps(seed):
+    players = [hyper_late_player(seed), hyper_late_player(seed + 1)]
+
+    def run(_):
+        for _ in range(20):
+            snapshot.dumps(players)
+    return None, run, 20
+
+
+@bench("snapshot/loads")
+def bench_snapshot_loads(seed):
+    data = snapshot.dumps([hyper_late_player(seed), hyper_late_player(seed + 1)])
+
+    def run(_):
+        for _ in range(20):
+            snapshot.loads(data)
+    return None, run, 20
+
+
+# --- rendering; main.py is only imported when a render bench runs ---------
+def load_ui():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import main
+    return main
+
+
+@bench("draw_grid/near_full", "render")
+def bench_draw_grid(seed):
+    ui = load_ui()
+    rng = random.Random(seed)
+    board = near_full_board(rng, bomb_rate=0.1)
+    surface = ui.pygame.Surface((board.cols * ui.CELL_SIZE, board.rows * ui.CELL_SIZE))
+
+    def run(_):
+        ui.draw_grid(surface, board.colors, bombs=board.bombs)
+    return None, run, 1
+
+
+@bench("draw_panel", "render")
+def bench_draw_panel(seed):
+    ui = load_ui()
+    rng = random.Random(seed)
+    board = Board()
+    surface = ui.pygame.Surface((ui.PANEL_WIDTH, ui.SCREEN_HEIGHT))
+    pieces = [([random_piece(rng, board) for _ in range(PREVIEW)], random_piece(rng, board)) for _ in range(8)]
+    state = {"score": 0}
+
+    def run(_):
+        # a new score every frame: the worst case for the text cache
+        state["score"] += 1000
+        preview, held = pieces[state["score"] // 1000 % len(pieces)]
+        ui.draw_panel(surface, 0, 0, ui.PANEL_WIDTH, "PLAYER 1", state["score"], 1, BENCH_MODES, preview, held)
+    return None, run, 1
+
+
+def _frame_workload(ui, players, driver):
+    """prepare() plays one tick (untimed), run() renders one dirty frame."""
+    layout = ui.versus_layout(players)
+    width = max(vp.x + vp.size[0] for vp in layout)
+    height = max(vp.y + vp.size[1] for vp in layout)
+    renderer = ui.DirtyRenderer(ui.pygame.Surface((width, height)))
+    clock = players[0].clock
+
+    def prepare():
+        for i, player in enumerate(players):
+            if not driver.tick(player):
+                # topped out: carry on with a fresh game in the same slot
+                players[i] = TetrisPlayer(player.modes, player.side_name, clock, player.seed + 100)
+        clock.advance(TICK_MS)
+
+    def run(_):
+        renderer.begin([])
+        for slot, (player, vp) in enumerate(zip(players, layout)):
+            renderer.draw_player(slot, player, vp, player.modes, clock.ticks())
+        renderer.finish()
+    return prepare, run, 1
+
+
+@bench("frame/two_players", "render")
+def bench_frame_versus(seed):
+    ui = load_ui()
+    clock = ManualClock()
+    modes = dict(BENCH_MODES, bombs=True, multiplayer_local=True)
+    players = [TetrisPlayer(modes, f"P{i + 1}", clock=clock, seed=seed + i) for i in range(2)]
+    return _frame_workload(ui, players, GravityDriver(random.Random(seed)))
+
+
+@bench("frame/hyper_late", "render")
+def bench_frame_hyper(seed):
+    ui = load_ui()
+    player = hyper_late_player(seed)
+    return _frame_workload(ui, [player], GravityDriver(random.Random(seed)))
+
+
+# ===========================
+# RUNNER
+# ===========================
+def calibrate(loops=CALIBRATION_LOOPS):
+    """Ops/sec of a fixed pure-Python loop; the machine speed reference."""
+    best = None
+    for _ in range(3):
+        t0 = time.perf_counter()
+        acc = 0
+        for i in range(loops):
+            acc = (acc + i * 7) & 0xFFFF
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return loops / best
+
+
+def measure(fn, seed, samples):
+    prepare, run, ops = fn(seed)
+    run(prepare() if prepare else None)  # warm up caches (sprites, text, imports)
+    per_op = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(samples):
+            state = prepare() if prepare else None
+            t0 = time.perf_counter()
+            done = run(state)
+            elapsed = time.perf_counter() - t0
+            per_op.append(elapsed / (done or ops))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    mean = sum(per_op) / len(per_op)
+    per_op.sort()
+    median = percentile(per_op, 50)
+    return {
+        "ops_per_sec": 1.0 / median if median else 0.0,
+        "mean_ms": mean * 1000.0,
+        "p50_ms": median * 1000.0,
+        "p95_ms": percentile(per_op, 95) * 1000.0,
+        "max_ms": per_op[-1] * 1000.0,
+        "samples": samples,
+    }
+
+
+def run_benches(pattern="*", seed=SEED, quick=False, rounds=ROUNDS):
+    """Run the matching benches `rounds` times, keeping each bench's median round.
+
+    Rounds go over the whole suite (not one bench at a time) so a slow spell
+    of the machine doesn't land on a single bench. The calibration loop runs
+    before every bench and its median is the machine speed, the same
+    statistic as the bench results.
+    """
+    runs = {}
+    calibrations = []
+    for _ in range(rounds):
+        for name, group, fn in BENCHES:
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            calibrations.append(calibrate())
+            samples = FRAMES if group == "render" else SAMPLES
+            if quick:
+                samples = max(3, samples // QUICK_FACTOR)
+            result = measure(fn, seed, samples)
+            result["group"] = group
+            runs.setdefault(name, []).append(result)
+    results = {}
+    for name, rounds_run in runs.items():
+        rounds_run.sort(key=lambda result: result["ops_per_sec"])
+        results[name] = rounds_run[len(rounds_run) // 2]
+    calibrations.sort()
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "rounds": rounds,
+            "calibration": calibrations[len(calibrations) // 2] if calibrations else 0.0,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold=None, absolute=False):
+    """Return (name, ratio, regressed) per bench; ratio < 1 means slower.
+
+    Scores are divided by each run's calibration unless absolute is set.
+    threshold overrides the per-group THRESHOLDS.
+    """
+    scale = 1.0
+    if not absolute:
+        scale = baseline["meta"]["calibration"] / report["meta"]["calibration"]
+    rows = []
+    for name, result in report["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or not base["ops_per_sec"]:
+            rows.append((name, None, False))
+            continue
+        ratio = result["ops_per_sec"] * scale / base["ops_per_sec"]
+        limit = THRESHOLDS[result["group"]] if threshold is None else threshold
+        rows.append((name, ratio, ratio < 1 - limit))
+    return rows
+
+
+def print_report(report, rows=None, out=sys.stdout):
+    rows = {name: (ratio, regressed) for name, ratio, regressed in rows or ()}
+    print(f"{'bench':<28} {'ops/s':>12} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'vs base':>8}", file=out)
+    for name, result in report["results"].items():
+        ratio, regressed = rows.get(name, (None, False))
+        if ratio is None:
+            delta = "new" if rows else ""
+        else:
+            delta = f"{(ratio - 1) * 100:+.0f}%" + (" !" if regressed else "")
+        print(f"{name:<28} {result['ops_per_sec']:>12.0f} {result['mean_ms']:>9.4f} {result['p50_ms']:>9.4f} "
+              f"{result['p95_ms']:>9.4f} {delta:>8}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the engine and renderer hot paths.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--out", default=None, help="write the results as JSON to this path")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="fail when a bench is this fraction slower than the baseline "
+                             "(default: per group, see THRESHOLDS)")
+    parser.add_argument("--only", default="*", help="glob on bench names, e.g. 'frame/*'")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--quick", action="store_true", help="fewer samples (CI smoke run)")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="passes over the suite, median one counts")
+    parser.add_argument("--absolute", action="store_true", help="compare raw ops/sec, no calibration")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results to --baseline")
+    args = parser.parse_args(argv)
+
+    if not any(fnmatch.fnmatch(name, args.only) for name, _, _ in BENCHES):
+        parser.error(f"no bench matches {args.only!r}")
+    report = run_benches(args.only, args.seed, args.quick, args.rounds)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print_report(report)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print_report(report)
+        print(f"no baseline at {args.baseline}, nothing to compare")
+        return 0
+    with open(args.baseline) as f:
+        rows = compare(report, json.load(f), args.threshold, args.absolute)
+    print_report(report, rows)
+    slow = [(name, ratio) for name, ratio, regressed in rows if regressed]
+    for name, ratio in slow:
+        print(f"REGRESSION {name}: {(1 - ratio) * 100:.0f}% slower than baseline", file=sys.stderr)
+    return 1 if slow else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
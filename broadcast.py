@@ -0,0 +1,564 @@
+"""
+Spectator / broadcast mode: live games als delta-gecomprimeerde stream.
+
+De encoder vergelijkt elke frame met de vorige en stuurt alleen wat
+veranderd is (rijen, actieve piece, preview/hold, score, status). Om de
+KEYFRAME_INTERVAL frames komt er een keyframe met de volledige staat, zodat
+nieuwe of achtergebleven kijkers kunnen (her)starten. StreamDecoder bouwt
+de view weer op.
+
+Frame formaat (little endian):
+    u8 flags      bit 7 = keyframe, lage bits = welke velden volgen (F_*)
+    varint        tick (keyframe) of tick delta (delta frame)
+    keyframe      u8 version, u8 cols, u8 rows, daarna elke rij
+    F_ROWS        varint bitmask van gewijzigde rijen, daarna die rijen
+    rij           varint cell mask + een nibble per gevulde cel
+                  (kleur 1..7, | 8 voor een live bomb)
+    F_PIECE       u8 base_id | bomb << 3 | rotation << 4, i8 x, i8 y
+    F_QUEUE       u8 hold, u8 count, count x u8 preview
+                  (base_id | bomb << 3, 0 = geen hold)
+    F_SCORE       varint score, varint lines, varint level
+    F_STATUS      u8 0 = playing, 1 = lock_out, 2 = block_out
+
+Op de lijn: u16 lengte + frame. Kijkers openen een TCP verbinding en sturen
+eerst de naam van het kanaal gevolgd door een newline.
+
+Run:
+    python broadcast.py serve --port 7800 --games 4
+    python broadcast.py watch HOST 7800 game0
+    python broadcast.py bench
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import pickle
+import random
+import struct
+import time
+from collections import deque
+
+from codec import STATUS_CODES, STATUS_NAMES, decode_row, encode_row, read_varint, write_varint
+from engine import DEFAULT_MODES, ManualClock, TetrisPlayer, apply_action
+from headless import TICK_MS, random_policy
+
+KEYFRAME_INTERVAL = 60  # frames between keyframes (1 s at 60 fps)
+MAX_QUEUE = 64  # frames a subscriber may lag before it is resynced
+LENGTH = struct.Struct("<H")
+PIECE = struct.Struct("<Bbb")
+VERSION = 2  # 2: F_QUEUE carries the whole preview instead of one next piece
+
+F_ROWS = 0x01
+F_PIECE = 0x02
+F_QUEUE = 0x04
+F_SCORE = 0x08
+F_STATUS = 0x10
+F_KEY = 0x80
+
+
+def _piece_code(piece):
+    return 0 if piece is None else piece.base_id | piece.is_bomb << 3
+
+
+# ===========================
+# ENCODER / DECODER
+# ===========================
+class StreamEncoder:
+    """Turns successive states of one TetrisPlayer into key / delta frames."""
+
+    def __init__(self, player, keyframe_interval=KEYFRAME_INTERVAL):
+        self.player = player
+        self.keyframe_interval = keyframe_interval
+        self.frames = 0
+        self.force_key = True
+        self._tick = 0
+        self._masks = None
+        self._rows = None
+        self._bombs = None
+        self._piece = None
+        self._queue = None
+        self._score = None
+        self._status = None
+
+    def encode(self, tick):
+        """(frame bytes, is_keyframe) for the player's state at tick."""
+        p = self.player
+        board = p.board
+        key = self.force_key or self.frames % self.keyframe_interval == 0
+        self.force_key = False
+        self.frames += 1
+        cur = p.current
+        piece = (_piece_code(cur) | cur.rotation << 4, cur.x, cur.y)
+        queue = (_piece_code(p.hold_piece), *map(_piece_code, p.queue.preview))
+        score = (p.score, p.lines, p.level)
+        status = STATUS_CODES[p.game_over_cause]
+        bombs = {}
+        for x, y in board.bombs:
+            bombs.setdefault(y, set()).add(x)
+
+        flags = 0
+        changed = 0
+        if key:
+            changed = (1 << board.rows) - 1
+        else:
+            for y in range(board.rows):
+                if (board.masks[y] != self._masks[y] or board.colors[y] != self._rows[y]
+                        or bombs.get(y) != self._bombs.get(y)):
+                    changed |= 1 << y
+            if changed:
+                flags |= F_ROWS
+            if piece != self._piece:
+                flags |= F_PIECE
+            if queue != self._queue:
+                flags |= F_QUEUE
+            if score != self._score:
+                flags |= F_SCORE
+            if status != self._status:
+                flags |= F_STATUS
+
+        out = bytearray()
+        out.append(F_KEY if key else flags)
+        write_varint(out, tick if key else tick - self._tick)
+        if key:
+            out.append(VERSION)
+            out.append(board.cols)
+            out.append(board.rows)
+        elif flags & F_ROWS:
+            write_varint(out, changed)
+        if changed:
+            for y in range(board.rows):
+                if changed >> y & 1:
+                    encode_row(out, board.masks[y], board.colors[y], bombs.get(y, ()))
+        if key or flags & F_PIECE:
+            out += PIECE.pack(*piece)
+        if key or flags & F_QUEUE:
+            out.append(queue[0])
+            out.append(len(queue) - 1)
+            out += bytes(queue[1:])
+        if key or flags & F_SCORE:
+            for value in score:
+                write_varint(out, value)
+        if key or flags & F_STATUS:
+            out.append(status)
+
+        self._tick = tick
+        if key:
+            self._masks = board.masks[:]
+            self._rows = [row[:] for row in board.colors]
+        else:
+            for y in range(board.rows):
+                if changed >> y & 1:
+                    self._masks[y] = board.masks[y]
+                    self._rows[y] = board.colors[y][:]
+        self._bombs = bombs
+        self._piece = piece
+        self._queue = queue
+        self._score = score
+        self._status = status
+        return bytes(out), key
+
+
+class StreamDecoder:
+    """Rebuilds a spectator view from frames; deltas before the first keyframe are skipped."""
+
+    def __init__(self):
+        self.synced = False
+        self.tick = 0
+        self.cols = self.rows = 0
+        self.masks = []
+        self.colors = []
+        self.bombs = set()
+        self.piece = None  # (base_id, is_bomb, rotation, x, y)
+        self.preview = []  # (base_id, is_bomb) per upcoming piece
+        self.hold_piece = None  # (base_id, is_bomb) or None
+        self.score = self.lines = self.level = 0
+        self.status = None
+
+    def feed(self, frame):
+        """Apply one frame; returns False if it was skipped (no keyframe yet)."""
+        flags = frame[0]
+        key = flags & F_KEY
+        if not key and not self.synced:
+            return False
+        value, pos = read_varint(frame, 1)
+        if key:
+            if frame[pos] != VERSION:
+                raise ValueError(f"unsupported stream version {frame[pos]}")
+            self.synced = True
+            self.tick = value
+            self.cols, self.rows = frame[pos + 1], frame[pos + 2]
+            pos += 3
+            self.masks = [0] * self.rows
+            self.colors = [[0] * self.cols for _ in range(self.rows)]
+            self.bombs = set()
+            changed = (1 << self.rows) - 1
+            flags = F_ROWS | F_PIECE | F_QUEUE | F_SCORE | F_STATUS
+        else:
+            self.tick += value
+            changed = 0
+            if flags & F_ROWS:
+                changed, pos = read_varint(frame, pos)
+        for y in range(self.rows):
+            if changed >> y & 1:
+                pos = self._decode_row(frame, pos, y)
+        if flags & F_PIECE:
+            code, x, y = PIECE.unpack_from(frame, pos)
+            pos += PIECE.size
+            self.piece = (code & 7, bool(code & 8), code >> 4, x, y)
+        if flags & F_QUEUE:
+            self.hold_piece = (frame[pos] & 7, bool(frame[pos] & 8)) if frame[pos] else None
+            count = frame[pos + 1]
+            self.preview = [(code & 7, bool(code & 8)) for code in frame[pos + 2:pos + 2 + count]]
+            pos += 2 + count
+        if flags & F_SCORE:
+            self.score, pos = read_varint(frame, pos)
+            self.lines, pos = read_varint(frame, pos)
+            self.level, pos = read_varint(frame, pos)
+        if flags & F_STATUS:
+            self.status = STATUS_NAMES[frame[pos]]
+        return True
+
+    def _decode_row(self, frame, pos, y):
+        mask, row, bomb_xs, pos = decode_row(frame, pos, self.cols)
+        self.masks[y] = mask
+        self.colors[y][:] = row
+        for x in range(self.cols):
+            self.bombs.discard((x, y))
+        self.bombs.update((x, y) for x in bomb_xs)
+        return pos
+
+    @property
+    def next_piece(self):
+        return self.preview[0] if self.preview else None
+
+    def render_text(self):
+        """ASCII view of the board (falling piece not included)."""
+        upcoming = "".join("IJLOSTZ"[base_id - 1] for base_id, _ in self.preview)
+        hold = "IJLOSTZ"[self.hold_piece[0] - 1] if self.hold_piece else "-"
+        lines = [f"tick {self.tick}  score {self.score}  lines {self.lines}  next {upcoming}  hold {hold}  "
+                 f"{self.status or ''}"]
+        for y in range(self.rows):
+            lines.append("|" + "".join("*" if (x, y) in self.bombs else (str(c) if c else ".")
+                                       for x, c in enumerate(self.colors[y])) + "|")
+        return "\n".join(lines)
+
+
+# ===========================
+# FAN-OUT
+# ===========================
+class Subscriber:
+    """One viewer: a bounded frame queue drained by its own writer task.
+
+    When the viewer falls MAX_QUEUE frames behind its queue is dropped and
+    it waits for the next keyframe - a slow viewer skips ahead instead of
+    holding up the publisher or the other viewers.
+    """
+
+    def __init__(self, writer, max_queue=MAX_QUEUE):
+        self.writer = writer
+        self.max_queue = max_queue
+        self.queue = deque()
+        self.wakeup = asyncio.Event()
+        self.need_key = True
+        self.dropped = 0
+        self.resyncs = 0
+        self.bytes_sent = 0
+        self.closed = False
+        self.task = None
+
+    def offer(self, frame, key):
+        if self.need_key and not key:
+            self.dropped += 1
+            return
+        if len(self.queue) >= self.max_queue:
+            self.dropped += len(self.queue)
+            self.queue.clear()
+            self.resyncs += 1
+            if not key:
+                self.need_key = True
+                self.dropped += 1
+                return
+        self.need_key = False
+        self.queue.append(frame)
+        self.wakeup.set()
+
+    def close(self):
+        self.closed = True
+        self.wakeup.set()
+
+    async def run(self):
+        writer = self.writer
+        try:
+            while not self.closed:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.queue:
+                    data = b"".join(LENGTH.pack(len(f)) + f for f in self.queue)
+                    self.queue.clear()
+                    self.bytes_sent += len(data)
+                    writer.write(data)
+                    await writer.drain()  # backpressure: frames pile up in our queue meanwhile
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+
+class Broadcaster:
+    """Fans the frames of one game out to any number of subscribers."""
+
+    def __init__(self, max_queue=MAX_QUEUE):
+        self.max_queue = max_queue
+        self.subscribers = set()
+        self.gop = []  # last keyframe + the deltas since, for late joiners
+
+    def publish(self, frame, key):
+        if key:
+            self.gop = [frame]
+        elif self.gop:
+            self.gop.append(frame)
+        for sub in self.subscribers:
+            sub.offer(frame, key)
+
+    def subscribe(self, writer):
+        sub = Subscriber(writer, self.max_queue)
+        if len(self.gop) <= self.max_queue:
+            # replay the current group of frames, otherwise wait for the next keyframe
+            for i, frame in enumerate(self.gop):
+                sub.offer(frame, i == 0)
+        self.subscribers.add(sub)
+        sub.task = asyncio.create_task(sub.run())
+        sub.task.add_done_callback(lambda _: self.subscribers.discard(sub))
+        return sub
+
+
+class BroadcastServer:
+    """TCP endpoint for viewers; every game is a named channel."""
+
+    def __init__(self, max_queue=MAX_QUEUE):
+        self.max_queue = max_queue
+        self.channels = {}
+        self.server = None
+        self.port = None
+
+    def channel(self, name):
+        if name not in self.channels:
+            self.channels[name] = Broadcaster(self.max_queue)
+        return self.channels[name]
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self._handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            name = (await reader.readline()).decode("utf-8", "replace").strip()
+        except (ConnectionError, OSError):
+            writer.close()
+            return
+        if name not in self.channels:
+            writer.close()
+            return
+        await self.channels[name].subscribe(writer).task
+
+
+async def watch(host, port, channel):
+    """Async generator of decoded views for one channel."""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(channel.encode() + b"\n")
+    decoder = StreamDecoder()
+    try:
+        while True:
+            size, = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+            if decoder.feed(await reader.readexactly(size)):
+                yield decoder
+    except asyncio.IncompleteReadError:
+        return
+    finally:
+        writer.close()
+
+
+# ===========================
+# LIVE GAMES + BENCHMARKS
+# ===========================
+def _new_player(seed):
+    return TetrisPlayer(dict(DEFAULT_MODES), clock=ManualClock(), seed=seed)
+
+
+def _play_tick(player, policy, rng):
+    """One headless tick; returns False at game over."""
+    for action in policy(player, rng):
+        if not apply_action(player, action):
+            return False
+    ok = player.step()
+    player.clock.advance(TICK_MS)
+    return ok
+
+
+async def serve(host, port, games=4, policy=random_policy, seed=0):
+    """Run headless games in real time and broadcast each on channel game<i>."""
+    server = await BroadcastServer().start(host, port)
+    print(f"broadcasting {games} games on {host}:{server.port}")
+    players = [_new_player(seed + i * 1000) for i in range(games)]
+    encoders = [StreamEncoder(p) for p in players]
+    channels = [server.channel(f"game{i}") for i in range(games)]
+    rngs = [random.Random(i) for i in range(games)]
+    loop = asyncio.get_running_loop()
+    tick = 0
+    next_tick = loop.time()
+    while True:
+        for i, player in enumerate(players):
+            ok = _play_tick(player, policy, rngs[i])
+            channels[i].publish(*encoders[i].encode(tick))
+            if not ok:
+                players[i] = _new_player(player.seed + 1)
+                encoders[i] = StreamEncoder(players[i])
+        tick += 1
+        next_tick += TICK_MS / 1000
+        await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+
+def record_stream(seed, ticks, policy=random_policy):
+    """Pre-encoded frames of ticks ticks of headless play (games restart on game over)."""
+    player = _new_player(seed)
+    encoder = StreamEncoder(player)
+    rng = random.Random(seed)
+    frames = []
+    for tick in range(ticks):
+        ok = _play_tick(player, policy, rng)
+        frames.append(encoder.encode(tick))
+        if not ok:
+            player = _new_player(player.seed + 1)
+            encoder.player = player
+            encoder.force_key = True
+    return frames
+
+
+def bench_bytes(ticks=3600, seed=0, policy=random_policy):
+    """Bytes per frame for delta frames vs keyframes vs a pickled cell dict."""
+    player = _new_player(seed)
+    encoder = StreamEncoder(player)
+    rng = random.Random(seed)
+    deltas, keys, naive = [], [], []
+    for tick in range(ticks):
+        ok = _play_tick(player, policy, rng)
+        frame, key = encoder.encode(tick)
+        (keys if key else deltas).append(len(frame))
+        cells = {(x, y): c for x, y, c in player.board.cells()}
+        naive.append(len(pickle.dumps((cells, player.score, player.current.get_cells()))))
+        if not ok:
+            player = _new_player(player.seed + 1)
+            encoder.player = player
+            encoder.force_key = True
+    total = sum(deltas) + sum(keys)
+    return {
+        "frames": ticks,
+        "avg_bytes_per_frame": round(total / ticks, 2),
+        "avg_delta_bytes": round(sum(deltas) / len(deltas), 2) if deltas else None,
+        "avg_keyframe_bytes": round(sum(keys) / len(keys), 2) if keys else None,
+        "avg_naive_bytes": round(sum(naive) / len(naive), 2),
+        "bytes_per_s_at_60fps": round(total / ticks * 60, 1),
+    }
+
+
+def _viewer_swarm(port, count, ready):
+    async def view(channel):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(channel.encode() + b"\n")
+        await writer.drain()
+        try:
+            while await reader.read(65536):
+                pass
+        finally:
+            writer.close()
+
+    async def swarm():
+        tasks = [asyncio.create_task(view("bench")) for _ in range(count)]
+        await asyncio.sleep(0.5)
+        ready.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(swarm())
+
+
+async def bench_fanout(subscribers, frames):
+    """Publish frames to subscribers viewers (in another process) on one core.
+
+    Returns CPU seconds spent by this process plus delivery stats.
+    """
+    server = await BroadcastServer().start()
+    channel = server.channel("bench")
+    ready = multiprocessing.Event()
+    proc = multiprocessing.Process(target=_viewer_swarm, args=(server.port, subscribers, ready), daemon=True)
+    proc.start()
+    while not ready.is_set() or len(channel.subscribers) < subscribers:
+        await asyncio.sleep(0.05)
+    subs = list(channel.subscribers)
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    for frame, key in frames:
+        channel.publish(frame, key)
+        await asyncio.sleep(0)
+    while any(s.queue for s in subs):
+        await asyncio.sleep(0.001)
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    for sub in subs:
+        sub.close()
+    await asyncio.gather(*(s.task for s in subs))
+    await server.close()
+    proc.join(5)
+    if proc.is_alive():
+        proc.terminate()
+    deliveries = subscribers * len(frames) - sum(s.dropped for s in subs)
+    return {
+        "subscribers": subscribers,
+        "frames": len(frames),
+        "cpu_s": round(cpu, 3),
+        "wall_s": round(wall, 3),
+        "dropped": sum(s.dropped for s in subs),
+        "resyncs": sum(s.resyncs for s in subs),
+        "deliveries_per_cpu_s": round(deliveries / max(cpu, 1e-9)),
+        "viewers_per_core_at_60fps": round(deliveries / max(cpu, 1e-9) / 60),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Spectator streaming of live games.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("serve")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=7800)
+    p.add_argument("--games", type=int, default=4)
+    p = sub.add_parser("watch")
+    p.add_argument("host")
+    p.add_argument("port", type=int)
+    p.add_argument("channel", nargs="?", default="game0")
+    p = sub.add_parser("bench")
+    p.add_argument("--ticks", type=int, default=3600)
+    p.add_argument("--subscribers", type=int, nargs="+", default=[10, 100, 500])
+    p.add_argument("--frames", type=int, default=600)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "serve":
+        asyncio.run(serve(args.host, args.port, args.games))
+    elif args.cmd == "watch":
+        async def show():
+            async for view in watch(args.host, args.port, args.channel):
+                if view.tick % 15 == 0:
+                    print("\x1b[H\x1b[2J" + view.render_text(), flush=True)
+        asyncio.run(show())
+    else:
+        print("bytes:", bench_bytes(args.ticks))
+        frames = record_stream(1, args.frames)
+        for n in args.subscribers:
+            print("fanout:", asyncio.run(bench_fanout(n, frames)))
+
+
+if __name__ == "__main__":
+    main()
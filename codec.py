@@ -0,0 +1,54 @@
+"""
+Gedeelde bouwstenen voor de binaire formaten (replay, snapshot, broadcast
+stream, netplay berichten).
+
+    varint   7 bits per byte, laagste eerst, bit 7 = er volgt nog een byte
+    rij      varint cell mask + een nibble per gevulde cel, twee per byte
+             (kleur 1..7, | 8 voor een live bomb)
+    status   u8 0 = playing, 1 = lock_out, 2 = block_out
+"""
+
+STATUS_CODES = {None: 0, "lock_out": 1, "block_out": 2}
+STATUS_NAMES = {v: k for k, v in STATUS_CODES.items()}
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_row(out, mask, row, bomb_xs):
+    """Append one board row; bomb_xs are the columns holding a live bomb."""
+    write_varint(out, mask)
+    nibbles = [row[x] | (8 if x in bomb_xs else 0) for x in range(len(row)) if (mask >> x) & 1]
+    for i in range(0, len(nibbles), 2):
+        out.append(nibbles[i] | (nibbles[i + 1] << 4 if i + 1 < len(nibbles) else 0))
+
+
+def decode_row(data, pos, cols):
+    """(mask, colors, bomb columns, new pos) of the row at pos."""
+    mask, pos = read_varint(data, pos)
+    row = [0] * cols
+    bomb_xs = []
+    count = 0
+    for x in range(cols):
+        if (mask >> x) & 1:
+            nibble = data[pos + count // 2] >> (4 * (count & 1)) & 0x0F
+            count += 1
+            row[x] = nibble & 7
+            if nibble & 8:
+                bomb_xs.append(x)
+    return mask, row, bomb_xs, pos + (count + 1) // 2
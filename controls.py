@@ -0,0 +1,199 @@
+"""
+Input subsystem: key events -> timestamped acties met DAS / ARR auto-repeat.
+
+Een dispatch table (key -> (slot, action)) wordt gebouwd uit de controls
+dicts van alle menselijke spelers. Key down / up events gaan met een
+timestamp in een queue; pas op een logic tick worden ze omgezet in acties,
+inclusief delayed auto-shift (DAS), auto-repeat rate (ARR) en soft drop
+repeat voor ingedrukt gehouden keys. Alle repeat timing loopt in logic tijd
+(tick_ms per tick), dus dezelfde toetsaanslagen geven dezelfde zetten,
+ongeacht de frame rate.
+
+Latency wordt gemeten van het moment dat een event binnenkomt tot de tick
+die de zet uitvoert (to_tick) en tot het frame dat hem laat zien (to_screen).
+Geen pygame nodig; main.py vertaalt pygame events naar push().
+"""
+
+from collections import deque
+
+from engine import WallClock
+from profiler import percentile
+
+DAS_MS = 167  # hold time before left / right starts repeating (10 frames)
+ARR_MS = 33  # time between auto-repeated shifts (2 frames); 0 = straight to the wall
+SOFT_DROP_MS = 33  # time between repeated soft drops while held
+WALL_SHIFT = 32  # shifts per tick for ARR 0, more than any board is wide
+LATENCY_WINDOW = 240  # samples kept per latency stat
+
+SHIFTS = ("left", "right")
+OPPOSITE = {"left": "right", "right": "left"}
+
+
+def build_dispatch(controls):
+    """{key: (slot, action)} from {slot: {action: key}}.
+
+    A key bound twice would silently steer two players, so that raises.
+    """
+    table = {}
+    for slot, mapping in controls.items():
+        for action, key in mapping.items():
+            if key in table:
+                raise ValueError(f"key {key} bound to both {table[key]} and {(slot, action)}")
+            table[key] = (slot, action)
+    return table
+
+
+class LatencyStats:
+    """Rolling window of latencies in ms with nearest-rank percentiles."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+
+    def stats(self):
+        values = sorted(self.samples)
+        if not values:
+            return {"count": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        return {
+            "count": self.count,
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "max": values[-1],
+        }
+
+
+class HeldKeys:
+    """Auto-repeat state of one player slot."""
+
+    def __init__(self):
+        self.shift = None  # "left" / "right" currently driving DAS
+        self.down = set()  # shift keys physically held, for release priority
+        self.das = 0  # ms the shift has been held
+        self.arr = 0  # ms since the last auto-repeated shift
+        self.soft = False
+        self.soft_ms = 0
+
+
+class InputQueue:
+    """Timestamped key events in, per-tick (slot, action) lists out.
+
+    Usage:
+        inputs = InputQueue(build_dispatch({0: controls_p1, 1: controls_p2}))
+        inputs.push(key, True)              # per KEYDOWN / KEYUP
+        for slot, action in inputs.tick():  # per logic tick
+            apply_action(players[slot], action)
+        inputs.presented()                  # after the frame is on screen
+    """
+
+    def __init__(self, dispatch, tick_ms=1000 // 60, das_ms=DAS_MS, arr_ms=ARR_MS,
+                 soft_drop_ms=SOFT_DROP_MS, clock=None):
+        self.dispatch = dispatch
+        self.tick_ms = tick_ms
+        self.das_ms = das_ms
+        self.arr_ms = arr_ms
+        self.soft_drop_ms = soft_drop_ms
+        self.clock = clock if clock is not None else WallClock()
+        self.events = deque()  # (stamp, slot, action, down)
+        self.held = {slot: HeldKeys() for slot, _ in dispatch.values()}
+        self.to_tick = LatencyStats()
+        self.to_screen = LatencyStats()
+        self._unshown = []  # stamps of moves applied but not yet presented
+
+    def push(self, key, down, stamp=None):
+        """Queue a key event; False when the key isn't a player control."""
+        entry = self.dispatch.get(key)
+        if entry is None:
+            return False
+        self.events.append((self.clock.ticks() if stamp is None else stamp, entry[0], entry[1], down))
+        return True
+
+    def reset(self):
+        """Drop queued events and held keys (pause, focus loss, new game)."""
+        self.events.clear()
+        for slot in self.held:
+            self.held[slot] = HeldKeys()
+        self._unshown.clear()
+
+    def tick(self):
+        """Actions for one logic tick: queued presses first, then repeats."""
+        out = []
+        now = self.clock.ticks()
+        fresh = set()  # slots whose shift / soft drop started this tick
+        events = self.events
+        while events:
+            stamp, slot, action, down = events.popleft()
+            held = self.held[slot]
+            if action in SHIFTS:
+                if down:
+                    held.down.add(action)
+                    held.shift, held.das, held.arr = action, 0, 0
+                    fresh.add((slot, "shift"))
+                else:
+                    held.down.discard(action)
+                    if held.shift == action:
+                        # fall back to the other direction if it is still held
+                        other = OPPOSITE[action]
+                        held.shift = other if other in held.down else None
+                        held.das = held.arr = 0
+                        if held.shift:
+                            fresh.add((slot, "shift"))
+                    continue
+            elif action == "soft":
+                held.soft = down
+                held.soft_ms = 0
+                if not down:
+                    continue
+                fresh.add((slot, "soft"))
+            elif not down:
+                continue
+            out.append((slot, action))
+            self._record(now, stamp)
+        for slot, held in self.held.items():
+            if held.shift and (slot, "shift") not in fresh:
+                out.extend((slot, held.shift) for _ in range(self._repeats(held)))
+            if held.soft and (slot, "soft") not in fresh:
+                held.soft_ms += self.tick_ms
+                while held.soft_ms >= self.soft_drop_ms:
+                    held.soft_ms -= self.soft_drop_ms
+                    out.append((slot, "soft"))
+        return out
+
+    def _repeats(self, held):
+        """Auto-repeated shifts due this tick for a held direction."""
+        before = held.das
+        held.das += self.tick_ms
+        if held.das < self.das_ms:
+            return 0
+        if self.arr_ms <= 0:
+            return WALL_SHIFT
+        # time past the DAS threshold counts towards the first repeat
+        held.arr += held.das - max(before, self.das_ms)
+        if before < self.das_ms:
+            # the shift that fires when DAS charges
+            held.arr += self.arr_ms
+        count = held.arr // self.arr_ms
+        held.arr -= count * self.arr_ms
+        return count
+
+    def _record(self, now, stamp):
+        self.to_tick.record(now - stamp)
+        self._unshown.append(stamp)
+
+    def presented(self):
+        """The frame showing the moves applied so far is on screen."""
+        if self._unshown:
+            now = self.clock.ticks()
+            for stamp in self._unshown:
+                self.to_screen.record(now - stamp)
+            self._unshown.clear()
+
+    def report_lines(self):
+        lines = []
+        for name, stat in (("input>tick", self.to_tick), ("input>screen", self.to_screen)):
+            s = stat.stats()
+            lines.append(f"{name:<12} p50 {s['p50']:5.1f}  p95 {s['p95']:5.1f}  max {s['max']:5.1f} ms")
+        return lines
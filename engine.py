@@ -0,0 +1,1160 @@
+"""
+Tetris engine: pieces, board and per-player game rules.
+
+Deze module importeert geen pygame, zodat de regels ook zonder display of
+audio device gedraaid kunnen worden (zie headless.py). Tijd komt van een
+injecteerbare clock in plaats van pygame.time / time.time().
+"""
+
+import functools
+import heapq
+import random
+import time
+from collections import deque
+
+from profiler import NULL_PROFILER
+from telemetry import NULL_TELEMETRY
+
+# ===========================
+# CONFIGURATIE
+# ===========================
+COLS = 10
+ROWS = 20
+
+# Mode toggles — je kunt deze standaard aan/uit zetten of in menu aanpassen
+DEFAULT_MODES = {
+    "bombs": True,
+    "invisible_mode": True,
+    "hyper_mode": True,
+    "random_swap": True,
+    "multiplayer_local": True,
+    "sound": False,
+    "seven_bag": False,  # 7-bag randomizer instead of pure random pieces
+}
+
+# Timed events (ms / per second). Rates keep the old per-frame odds at 60 fps:
+# swap 0.3% per frame, hyper garbage 8% per frame in the first second of
+# every 30 s window, one shrink column every 45 s.
+SWAP_RATE = 0.18  # random swaps per second
+SWAP_COOLDOWN_MS = 500
+GARBAGE_PERIOD_MS = 30000
+GARBAGE_WINDOW_MS = 1000
+GARBAGE_RATE = 4.8  # garbage lines per second inside a window
+SHRINK_PERIOD_MS = 45000
+
+# Level / gravity: one level per LINES_PER_LEVEL lines. Gravity is fixed point,
+# GRAVITY_ONE = 1 row per ms, so fractional speeds accumulate exactly and the
+# same inputs give the same drops on every machine.
+LINES_PER_LEVEL = 10
+MAX_LEVEL = 20
+GRAVITY_ONE = 1 << 20
+GRAVITY_20G = 20 * 60 * GRAVITY_ONE // 1000  # 20 rows per 60 FPS frame: lands at once
+BASE_FALL_MS = 700  # level 1, ms per row
+LOCK_DELAY_MS = 500  # time on the ground before a piece locks
+LOCK_RESETS = 15  # moves / rotations on the ground that restart the lock delay, per piece
+
+def gravity_table(levels=MAX_LEVEL, base_ms=BASE_FALL_MS):
+    """Gravity per level (index 0 unused), after the Guideline speed curve
+    (0.8 - (level - 1) * 0.007) ** (level - 1) scaled to base_ms at level 1,
+    capped at 20G; the last level is always 20G."""
+    table = [0]
+    for level in range(1, levels + 1):
+        ms = base_ms * (0.8 - (level - 1) * 0.007) ** (level - 1)
+        table.append(min(round(GRAVITY_ONE / ms), GRAVITY_20G))
+    table[-1] = GRAVITY_20G
+    return table
+
+GRAVITY = gravity_table()
+
+# SHAPES: elke vorm heeft rotaties; toevoegen van 'bomb' attribuut via shape_id > 7
+# Voor bomb-blocks: we will treat shape_ids 11..17 as bomb variants of 1..7
+SHAPES = {
+    1: [  # I
+        [[0,0,0,0],
+         [1,1,1,1],
+         [0,0,0,0],
+         [0,0,0,0]],
+        [[0,0,1,0],
+         [0,0,1,0],
+         [0,0,1,0],
+         [0,0,1,0]]
+    ],
+    2: [  # J
+        [[1,0,0],
+         [1,1,1],
+         [0,0,0]],
+        [[0,1,1],
+         [0,1,0],
+         [0,1,0]],
+        [[0,0,0],
+         [1,1,1],
+         [0,0,1]],
+        [[0,1,0],
+         [0,1,0],
+         [1,1,0]]
+    ],
+    3: [  # L
+        [[0,0,1],
+         [1,1,1],
+         [0,0,0]],
+        [[0,1,0],
+         [0,1,0],
+         [0,1,1]],
+        [[0,0,0],
+         [1,1,1],
+         [1,0,0]],
+        [[1,1,0],
+         [0,1,0],
+         [0,1,0]]
+    ],
+    4: [  # O
+        [[1,1],
+         [1,1]]
+    ],
+    5: [  # S
+        [[0,1,1],
+         [1,1,0],
+         [0,0,0]],
+        [[0,1,0],
+         [0,1,1],
+         [0,0,1]]
+    ],
+    6: [  # T
+        [[0,1,0],
+         [1,1,1],
+         [0,0,0]],
+        [[0,1,0],
+         [0,1,1],
+         [0,1,0]],
+        [[0,0,0],
+         [1,1,1],
+         [0,1,0]],
+        [[0,1,0],
+         [1,1,0],
+         [0,1,0]]
+    ],
+    7: [  # Z
+        [[1,1,0],
+         [0,1,1],
+         [0,0,0]],
+        [[0,0,1],
+         [0,1,1],
+         [0,1,0]]
+    ]
+}
+
+# ===========================
+# CLOCKS
+# ===========================
+class WallClock:
+    """Real time in milliseconds since the clock was created."""
+
+    def __init__(self):
+        self._t0 = time.perf_counter()
+
+    def ticks(self):
+        return int((time.perf_counter() - self._t0) * 1000)
+
+class ManualClock:
+    """Simulated time in milliseconds; the driver advances it explicitly.
+
+    advance() also takes fractional steps (a Fraction(1000, 60) tick);
+    ticks() stays whole ms, so 60 Hz ticks run 16/17/17 ms without drift.
+    """
+
+    def __init__(self, start=0):
+        self.now = start
+
+    def ticks(self):
+        return int(self.now)
+
+    def advance(self, ms):
+        self.now += ms
+
+class FixedTimestep:
+    """Accumulator scheduler for the logic loop.
+
+    Real elapsed time goes in, whole logic ticks of tick_ms come out, so
+    gravity and timers run at the same rate however fast frames render.
+    tick_ms may be a Fraction (1000 / 60 doesn't divide evenly). At
+    most max_steps ticks are released per call; time beyond that is dropped
+    (counted in self.dropped) so a long stall slows the game down instead of
+    locking it in catch-up.
+    """
+
+    def __init__(self, tick_ms, max_steps=5):
+        self.tick_ms = tick_ms
+        self.max_steps = max_steps
+        self.accumulator = 0  # exact for whole-ms frames, also with a Fraction tick
+        self.dropped = 0
+
+    def advance(self, elapsed_ms):
+        """Add elapsed real time; returns how many logic ticks to run now."""
+        self.accumulator += elapsed_ms
+        steps = int(self.accumulator // self.tick_ms)
+        if steps > self.max_steps:
+            self.dropped += steps - self.max_steps
+            steps = self.max_steps
+            self.accumulator %= self.tick_ms
+        else:
+            self.accumulator -= steps * self.tick_ms
+        return steps
+
+    def alpha(self):
+        """Fraction of the next tick already elapsed, for render interpolation."""
+        return float(self.accumulator / self.tick_ms)
+
+    def reset(self):
+        self.accumulator = 0
+
+# ===========================
+# UTILS / GAME CLASSES
+# ===========================
+class ShapeInfo:
+    """Precomputed data for one (shape_id, rotation) pair."""
+
+    def __init__(self, matrix):
+        self.size = len(matrix[0])  # matrix width, used for spawn centering
+        self.cells = [(j, i) for i, row in enumerate(matrix) for j, val in enumerate(row) if val]
+        xs = [dx for dx, _ in self.cells]
+        ys = [dy for _, dy in self.cells]
+        self.min_x, self.max_x = min(xs), max(xs)
+        self.min_y, self.max_y = min(ys), max(ys)
+        self.width = self.max_x - self.min_x + 1
+        self.height = self.max_y - self.min_y + 1
+        # (dy, mask) with bit j = matrix column j, only for non-empty rows
+        self.row_masks = []
+        for i, row in enumerate(matrix):
+            m = 0
+            for j, val in enumerate(row):
+                if val:
+                    m |= 1 << j
+            if m:
+                self.row_masks.append((i, m))
+        # bottom profile: (dx, lowest dy) per occupied column
+        self.bottom = [(dx, max(dy for cx, dy in self.cells if cx == dx))
+                       for dx in sorted({cx for cx, _ in self.cells})]
+
+def build_shape_table(shapes):
+    return {sid: [ShapeInfo(m) for m in rots] for sid, rots in shapes.items()}
+
+# SHAPE_TABLE[shape_id][rotation] -> ShapeInfo, built once at import
+SHAPE_TABLE = build_shape_table(SHAPES)
+
+class Piece:
+    # __slots__: pieces are pooled by PieceQueue and copied for every fork
+    __slots__ = ("base_id", "is_bomb", "shape_id", "rotations", "rotation", "info", "x", "y",
+                 "spawn_time", "visible_until", "hold_used")
+
+    def __init__(self, shape_id, is_bomb=False, spawn_time=0, cols=COLS):
+        self.reset(shape_id, is_bomb, spawn_time, cols)
+
+    def reset(self, shape_id, is_bomb=False, spawn_time=0, cols=COLS):
+        """Turn this object into a freshly spawned piece (pool reuse)."""
+        # shape_id in 1..7 reference shapes; if is_bomb True create bomb-variant
+        self.base_id = shape_id
+        self.is_bomb = is_bomb
+        self.shape_id = shape_id + (10 if is_bomb else 0)  # bomb ids mapped >10
+        self.rotations = SHAPE_TABLE[shape_id]
+        self.rotation = 0
+        self.info = self.rotations[self.rotation]
+        self.x = cols // 2 - self.info.size // 2  # centered on the owning board
+        self.y = -2  # spawn slightly above to allow rotation
+        self.spawn_time = spawn_time  # ms, from the owning player's clock
+        self.visible_until = self.spawn_time + 2000  # invisible after 2s if invisible_mode on
+        self.hold_used = False
+
+    def rotate(self, board):
+        old = self.rotation
+        self.rotation = (self.rotation + 1) % len(self.rotations)
+        self.info = self.rotations[self.rotation]
+        if not valid_position(self, board):
+            # beperkte wall kick: probeer 1 x left/right
+            for dx in (-1, 1):
+                self.x += dx
+                if valid_position(self, board):
+                    return True
+                self.x -= dx
+            self.rotation = old
+            self.info = self.rotations[self.rotation]
+            return False
+        return True
+
+    def get_cells(self):
+        x, y = self.x, self.y
+        return [(x + dx, y + dy) for dx, dy in self.info.cells]
+
+    def copy(self):
+        # every attribute is a number, a bool or a shared shape table
+        piece = Piece.__new__(Piece)
+        piece.base_id = self.base_id
+        piece.is_bomb = self.is_bomb
+        piece.shape_id = self.shape_id
+        piece.rotations = self.rotations
+        piece.rotation = self.rotation
+        piece.info = self.info
+        piece.x = self.x
+        piece.y = self.y
+        piece.spawn_time = self.spawn_time
+        piece.visible_until = self.visible_until
+        piece.hold_used = self.hold_used
+        return piece
+
+def mask_collides(masks, rows, row_masks, x, y):
+    """row_masks: (dy, mask) pairs with bit j = shape column j.
+
+    Horizontal bounds are the caller's job; rows above the field are empty
+    and everything below the floor is solid. Works on any list of row masks,
+    so search code can probe hypothetical boards without a Board object.
+    """
+    for dy, m in row_masks:
+        yy = y + dy
+        if yy < 0:
+            continue
+        if yy >= rows:
+            return True
+        if masks[yy] & (m << x if x >= 0 else m >> -x):
+            return True
+    return False
+
+def drop_distance(masks, heights, rows, info, x, y):
+    """How many rows a shape at (x, y) can fall before it collides.
+
+    When the shape is above the surface in every column it covers this is
+    O(piece width) from the bottom profile and the height map; a piece
+    tucked under an overhang falls back to a mask sweep.
+    """
+    best = None  # no cap: a shape far above the field falls the whole way
+    for dx, dy in info.bottom:
+        gap = rows - heights[x + dx] - (y + dy) - 1
+        if gap < 0:
+            break  # at or below the surface here: heights can't tell
+        if best is None or gap < best:
+            best = gap
+    else:
+        return best
+    dist = 0
+    while not mask_collides(masks, rows, info.row_masks, x, y + dist + 1):
+        dist += 1
+    return dist
+
+class Board:
+    """Bitboard speelveld.
+
+    Elke rij is een int bitmask (bit x = kolom x) en daarnaast houden we een
+    color plane bij met dezelfde [y][x] layout als de oude grid lijsten, zodat
+    de renderer er direct uit kan lezen. Alle mutaties gaan via deze class
+    zodat masks en kleuren altijd in sync blijven.
+
+    clone() deelt de color rows copy-on-write: owned[y] zegt of de row list
+    van dit bord alleen is, anders wordt hij bij de eerste write gekopieerd.
+    """
+
+    def __init__(self, cols=COLS, rows=ROWS):
+        self.cols = cols
+        self.rows = rows
+        self.full_mask = (1 << cols) - 1
+        self.masks = [0] * rows
+        self.colors = [[0] * cols for _ in range(rows)]
+        # heights[x] = rows - (y of the topmost filled cell), 0 for an empty
+        # column; kept up to date by every mutation below
+        self.heights = [0] * cols
+        # live bomb tiles as (x, y); moves along with row clears / shifts
+        self.bombs = set()
+        # owned[y]: colors[y] belongs to this board only (False after clone())
+        self.owned = [True] * rows
+
+    def reset(self):
+        for y in range(self.rows):
+            self.masks[y] = 0
+            self.colors[y] = [0] * self.cols
+        self.owned[:] = [True] * self.rows
+        self.heights[:] = [0] * self.cols
+        self.bombs.clear()
+
+    def clone(self):
+        """Copy of the board that shares every color row until one side writes it.
+
+        Masks and heights are lists of ints and are copied outright; the row
+        lists are shared and both boards give up ownership of them.
+        """
+        board = Board.__new__(Board)
+        board.cols = self.cols
+        board.rows = self.rows
+        board.full_mask = self.full_mask
+        board.masks = self.masks[:]
+        board.colors = self.colors[:]
+        board.heights = self.heights[:]
+        board.bombs = set(self.bombs)
+        self.owned[:] = [False] * self.rows
+        board.owned = [False] * self.rows
+        return board
+
+    def _own(self, y):
+        """Writable colors[y]: copy a shared row before the first write."""
+        row = self.colors[y] = self.colors[y][:]
+        self.owned[y] = True
+        return row
+
+    def is_filled(self, x, y):
+        return (self.masks[y] >> x) & 1 == 1
+
+    def set_cell(self, x, y, color):
+        self.masks[y] |= 1 << x
+        (self.colors[y] if self.owned[y] else self._own(y))[x] = color
+        if self.rows - y > self.heights[x]:
+            self.heights[x] = self.rows - y
+        if self.bombs:
+            self.bombs.discard((x, y))
+
+    def set_bomb(self, x, y, color):
+        """Place a live bomb tile (drawn with color, tracked in self.bombs)."""
+        self.set_cell(x, y, color)
+        self.bombs.add((x, y))
+
+    def clear_cell(self, x, y):
+        self.masks[y] &= ~(1 << x)
+        (self.colors[y] if self.owned[y] else self._own(y))[x] = 0
+        if self.rows - y == self.heights[x]:
+            self._rescan_column(x, y + 1)
+        if self.bombs:
+            self.bombs.discard((x, y))
+
+    def clear_cells(self, cells):
+        """Empty a batch of (x, y) cells; heights are rescanned once per column."""
+        masks = self.masks
+        colors = self.colors
+        owned = self.owned
+        bombs = self.bombs
+        tops = {}
+        for x, y in cells:
+            masks[y] &= ~(1 << x)
+            (colors[y] if owned[y] else self._own(y))[x] = 0
+            if bombs:
+                bombs.discard((x, y))
+            if self.rows - y == self.heights[x]:
+                tops[x] = y
+        for x, y in tops.items():
+            self._rescan_column(x, y + 1)
+
+    def collapse_columns(self, columns):
+        """Let the cells in the given columns fall into the holes below them.
+
+        Returns the set of (x, y) cells whose content changed (both the old
+        and the new position of every moved cell). Bomb tiles move along.
+        """
+        masks = self.masks
+        colors = self.colors
+        owned = self.owned
+        bombs = self.bombs
+        changed = set()
+        for x in columns:
+            bit = 1 << x
+            write = self.rows - 1
+            for y in range(self.rows - 1, -1, -1):
+                if not masks[y] & bit:
+                    continue
+                if y != write:
+                    masks[write] |= bit
+                    masks[y] &= ~bit
+                    (colors[write] if owned[write] else self._own(write))[x] = colors[y][x]
+                    (colors[y] if owned[y] else self._own(y))[x] = 0
+                    if (x, y) in bombs:
+                        bombs.discard((x, y))
+                        bombs.add((x, write))
+                    changed.add((x, y))
+                    changed.add((x, write))
+                write -= 1
+            self.heights[x] = self.rows - 1 - write
+        return changed
+
+    def _rescan_column(self, x, start):
+        """Recompute heights[x] from the first filled cell at or below start."""
+        bit = 1 << x
+        masks = self.masks
+        for y in range(start, self.rows):
+            if masks[y] & bit:
+                self.heights[x] = self.rows - y
+                return
+        self.heights[x] = 0
+
+    def surface(self, x):
+        """y of the topmost filled cell in column x (rows if empty)."""
+        return self.rows - self.heights[x]
+
+    def collides(self, row_masks, x, y):
+        return mask_collides(self.masks, self.rows, row_masks, x, y)
+
+    def is_full(self, y):
+        return self.masks[y] == self.full_mask
+
+    def clear_full_rows(self, candidates=None):
+        """Remove every full row in one compaction sweep.
+
+        candidates limits the fullness check to rows that were touched (e.g.
+        by the last lock); by default every row is checked. Returns the
+        cleared row indices (top to bottom, pre-clear coordinates). The freed
+        row lists are reused as the new empty rows at the top (unless a clone
+        still shares them), so self.colors keeps its identity for anyone
+        holding a reference to it.
+        """
+        full = self.full_mask
+        masks = self.masks
+        if candidates is None:
+            cleared = [y for y in range(self.rows) if masks[y] == full]
+        else:
+            cleared = sorted(y for y in set(candidates) if 0 <= y < self.rows and masks[y] == full)
+        if not cleared:
+            return cleared
+        empty = [0] * self.cols
+        freed = []
+        kept_masks = []
+        kept_rows = []
+        kept_owned = []
+        owned = self.owned
+        gone = set(cleared)
+        for y in range(self.rows):
+            row = self.colors[y]
+            if y in gone:
+                if owned[y]:
+                    row[:] = empty
+                    freed.append(row)
+                else:
+                    freed.append(empty[:])
+            else:
+                kept_masks.append(masks[y])
+                kept_rows.append(row)
+                kept_owned.append(owned[y])
+        masks[:] = [0] * len(cleared) + kept_masks
+        self.colors[:] = freed + kept_rows
+        owned[:] = [True] * len(cleared) + kept_owned
+        # columns topping out above the highest cleared row just sink by the
+        # number of cleared rows; the rest had their top cell removed
+        k = len(cleared)
+        limit = self.rows - cleared[0]
+        heights = self.heights
+        for x in range(self.cols):
+            if heights[x] > limit:
+                heights[x] -= k
+            else:
+                self._rescan_column(x, cleared[0] + 1)
+        if self.bombs:
+            # bombs in cleared rows are gone, the rest sink by the number of
+            # cleared rows below them
+            self.bombs = {(x, y + sum(1 for c in cleared if c > y))
+                          for x, y in self.bombs if y not in gone}
+        return cleared
+
+    def shift_up(self):
+        """Drop the top row and open an empty row at the bottom."""
+        del self.masks[0]
+        self.masks.append(0)
+        row = self.colors.pop(0)
+        if self.owned.pop(0):
+            row[:] = [0] * self.cols
+        else:
+            row = [0] * self.cols
+        self.colors.append(row)
+        self.owned.append(True)
+        heights = self.heights
+        for x in range(self.cols):
+            if heights[x] == self.rows:
+                # the top cell fell off the field
+                self._rescan_column(x, 0)
+            elif heights[x]:
+                heights[x] += 1
+        if self.bombs:
+            self.bombs = {(x, y - 1) for x, y in self.bombs if y > 0}
+
+    def drop_distance(self, info, x, y):
+        return drop_distance(self.masks, self.heights, self.rows, info, x, y)
+
+    def cells(self):
+        for y, m in enumerate(self.masks):
+            if m:
+                row = self.colors[y]
+                for x in range(self.cols):
+                    if (m >> x) & 1:
+                        yield x, y, row[x]
+
+def valid_position(piece, board):
+    info = piece.info
+    x = piece.x
+    if x + info.min_x < 0 or x + info.max_x >= board.cols or piece.y + info.max_y >= board.rows:
+        return False
+    return not board.collides(info.row_masks, x, piece.y)
+
+# ===========================
+# BOMBS
+# ===========================
+class BlastResolver:
+    """Detonates bomb tiles using the board's live bomb index (board.bombs).
+
+    Every blast empties the square of the given radius around the bomb. A
+    bomb caught in a blast goes off as well (chain) - that is a work queue
+    over the index, the board itself is never scanned for bombs. With
+    gravity on, the blasted columns collapse afterwards.
+
+    fuse_on_lock: bomb pieces explode as soon as they lock (the classic
+    behaviour). When off they stay on the board as live bombs until a line
+    clear through their row or another blast sets them off.
+    """
+
+    def __init__(self, radius=1, chain=True, gravity=False, fuse_on_lock=True):
+        self.radius = radius
+        self.chain = chain
+        self.gravity = gravity
+        self.fuse_on_lock = fuse_on_lock
+        self.detonations = 0  # bombs set off by the last detonate()
+
+    def copy(self):
+        return BlastResolver(self.radius, self.chain, self.gravity, self.fuse_on_lock)
+
+    def detonate(self, board, triggers):
+        """Set off the bombs at triggers; returns the set of changed cells."""
+        r = self.radius
+        bombs = board.bombs
+        queue = list(triggers)
+        seen = set(queue)
+        blasted = set()
+        while queue:
+            bx, by = queue.pop()
+            for ty in range(max(0, by - r), min(board.rows, by + r + 1)):
+                m = board.masks[ty]
+                if not m:
+                    continue
+                for tx in range(max(0, bx - r), min(board.cols, bx + r + 1)):
+                    if (m >> tx) & 1:
+                        blasted.add((tx, ty))
+                        if self.chain and (tx, ty) in bombs and (tx, ty) not in seen:
+                            seen.add((tx, ty))
+                            queue.append((tx, ty))
+        self.detonations = len(seen)
+        board.clear_cells(blasted)
+        for cell in seen:
+            bombs.discard(cell)  # triggers that were never placed on the board
+        if self.gravity and blasted:
+            blasted |= board.collapse_columns(sorted({x for x, _ in blasted}))
+        return blasted
+
+DEFAULT_BLAST = BlastResolver()
+
+def lock_piece(piece, board, modes, blast=DEFAULT_BLAST):
+    """Lock the piece into the board. If bomb -> explode neighbors.
+
+    Returns the set of (x, y) cells that changed, so callers only have to
+    look at the touched rows afterwards.
+    """
+    bomb = piece.is_bomb and modes["bombs"]
+    cells = [(x, y) for x, y in piece.get_cells() if 0 <= x < board.cols and 0 <= y < board.rows]
+    if not bomb:
+        for x, y in cells:
+            board.set_cell(x, y, piece.base_id)
+        return set(cells)
+    for x, y in cells:
+        board.set_bomb(x, y, piece.base_id)
+    if not blast.fuse_on_lock:
+        return set(cells)
+    return blast.detonate(board, cells) | set(cells)
+
+def clear_rows(board, candidates=None):
+    """Clear full rows; returns the list of cleared row indices."""
+    return board.clear_full_rows(candidates)
+
+def add_garbage_line(board, rng=random):
+    """Add a garbage line (random hole) at bottom, shift everything up"""
+    board.shift_up()
+    hole = rng.randint(0, board.cols - 1)
+    bottom = board.rows - 1
+    for x in range(board.cols):
+        if x != hole:
+            board.set_cell(x, bottom, rng.randint(1, 7))
+
+def fill_column(board, col, rng=random):
+    """Fill one column top to bottom with random colors (hyper shrink)."""
+    for row in range(board.rows):
+        board.set_cell(col, row, rng.randint(1, 7))
+
+# ===========================
+# PIECE QUEUE
+# ===========================
+# The piece sequence of a game is a pure function of (piece seed, index): it is
+# generated in chunks of whole bags, each from its own seeded RNG. Forks share
+# the chunks, a snapshot only needs the index, and any stretch of a sequence
+# can be generated up front (piece_sequence) without changing the game.
+PREVIEW = 3  # upcoming pieces kept ready and shown in the panel
+CHUNK_BAGS = 8
+CHUNK = 7 * CHUNK_BAGS  # pieces per generated chunk
+BOMB_CHANCE = 0.08  # share of pieces that are bombs when the bombs mode is on
+BOMB_BIT = 8  # piece code = shape_id | BOMB_BIT for bomb candidates
+
+@functools.lru_cache(maxsize=4096)
+def piece_chunk(seed, chunk, bag):
+    """Piece codes of one chunk: 7-bag (every run of seven is a shuffled full
+    set) or pure random. The bomb roll is always drawn, so the shapes don't
+    depend on whether the bombs mode is on."""
+    rng = random.Random(f"pieces/{seed}/{chunk}")
+    rand = rng.random
+    if bag:
+        shapes = []
+        for _ in range(CHUNK_BAGS):
+            run = [1, 2, 3, 4, 5, 6, 7]
+            rng.shuffle(run)
+            shapes += run
+    else:
+        shapes = [1 + int(7 * rand()) for _ in range(CHUNK)]
+    return tuple(shape | BOMB_BIT if rand() < BOMB_CHANCE else shape for shape in shapes)
+
+def piece_sequence(seed, count, bag=False, start=0):
+    """Piece codes start .. start + count of a sequence, in bulk. The chunks
+    stay cached, so games (or benches) that pre-generate their sequences
+    don't generate them again while they run."""
+    codes = []
+    for chunk in range(start // CHUNK, (start + count + CHUNK - 1) // CHUNK):
+        codes.extend(piece_chunk(seed, chunk, bag))
+    offset = start % CHUNK
+    return codes[offset:offset + count]
+
+class PieceQueue:
+    """The pieces after the current one, for one player.
+
+    preview holds the next `size` pieces as Piece objects (the panel draws
+    them, the AI reads the first). Locked and swapped-out pieces go back to
+    a free list and are reset for reuse instead of allocating new ones.
+    index is the sequence position of preview[0].
+    """
+
+    def __init__(self, seed, modes, cols=COLS, size=PREVIEW, index=0):
+        self.seed = seed
+        self.modes = modes
+        self.bag = bool(modes.get("seven_bag"))
+        self.cols = cols
+        self.index = index
+        self.pool = []
+        self._chunk_no = -1
+        self._chunk = ()
+        self.preview = deque(self._make(index + i) for i in range(size))
+
+    def _make(self, index):
+        chunk_no, offset = divmod(index, CHUNK)
+        if chunk_no != self._chunk_no:
+            self._chunk = piece_chunk(self.seed, chunk_no, self.bag)
+            self._chunk_no = chunk_no
+        code = self._chunk[offset]
+        return self.take(code & 7, bool(code & BOMB_BIT) and self.modes["bombs"])
+
+    def take(self, shape_id, is_bomb=False, spawn_time=0):
+        """A spawned piece from the free list (or a new one if it's empty)."""
+        if self.pool:
+            piece = self.pool.pop()
+            piece.reset(shape_id, is_bomb, spawn_time, self.cols)
+            return piece
+        return Piece(shape_id, is_bomb, spawn_time, self.cols)
+
+    def release(self, piece):
+        """piece is off the board for good; nothing may hold on to it."""
+        self.pool.append(piece)
+
+    def peek(self):
+        return self.preview[0]
+
+    def pop(self, now):
+        """Next piece, spawned at now; the preview refills from the sequence."""
+        preview = self.preview
+        piece = preview.popleft()
+        preview.append(self._make(self.index + len(preview) + 1))
+        self.index += 1
+        piece.spawn_time = now
+        piece.visible_until = now + 2000
+        return piece
+
+    def copy(self):
+        queue = PieceQueue.__new__(PieceQueue)
+        queue.seed = self.seed
+        queue.modes = self.modes
+        queue.bag = self.bag
+        queue.cols = self.cols
+        queue.index = self.index
+        queue.pool = []
+        queue._chunk_no = self._chunk_no
+        queue._chunk = self._chunk  # immutable, shared
+        queue.preview = deque(piece.copy() for piece in self.preview)
+        return queue
+
+# ===========================
+# EVENTS
+# ===========================
+class EventScheduler:
+    """Priority queue of timed game events (time ms, kind).
+
+    Events scheduled for the same time come out in scheduling order.
+    next_time is the earliest due time, so a caller can skip the queue
+    entirely with one comparison while nothing is due.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = 0
+        self.next_time = float("inf")
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, when, kind):
+        heapq.heappush(self._heap, (when, self._seq, kind))
+        self._seq += 1
+        self.next_time = self._heap[0][0]
+
+    def pop_due(self, now):
+        """Remove and return the next (time, kind) due at now, or None."""
+        if self.next_time > now:
+            return None
+        when, _, kind = heapq.heappop(self._heap)
+        self.next_time = self._heap[0][0] if self._heap else float("inf")
+        return when, kind
+
+    def clear(self):
+        self._heap.clear()
+        self.next_time = float("inf")
+
+    def copy(self):
+        events = EventScheduler.__new__(EventScheduler)
+        events._heap = self._heap[:]
+        events._seq = self._seq
+        events.next_time = self.next_time
+        return events
+
+    def items(self):
+        """Pending (time, kind) pairs in the order they would come out."""
+        return [(when, kind) for when, _, kind in sorted(self._heap)]
+
+    def shift(self, delta):
+        """Move every pending event delta ms; the order stays the same."""
+        self._heap = [(when + delta, seq, kind) for when, seq, kind in self._heap]
+        if self._heap:
+            self.next_time = self._heap[0][0]
+
+# ===========================
+# MAIN GAME CLASS (per speler)
+# ===========================
+class TetrisPlayer:
+    def __init__(self, modes, side_name="P1", clock=None, seed=None, cols=COLS, rows=ROWS):
+        self.modes = modes
+        self.clock = clock if clock is not None else WallClock()
+        # eigen RNG stream per speler: same seed + same inputs -> same game
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.board = Board(cols, rows)
+        self.grid = self.board.colors  # live view for the renderer
+        # pieces come from their own stream (see PieceQueue), the events from self.rng
+        self.queue = PieceQueue(seed if seed is not None else self.rng.getrandbits(64), modes, cols)
+        self.current = self.queue.pop(self.clock.ticks())
+        self.hold_piece = None
+        self.score = 0
+        self.level = 1
+        self.lines = 0
+        self.last_cleared = []  # row indices cleared by the last lock
+        self.pieces = 0  # pieces locked so far
+        self.game_over_cause = None  # "lock_out" / "block_out" once the game ends
+        self.profiler = NULL_PROFILER  # swap in a FrameProfiler to time lock/clear
+        self.telemetry = NULL_TELEMETRY  # SessionLog.bind() swaps in a per-player recorder
+        self.blast = BlastResolver()  # bomb radius / chain / gravity settings
+        self.last_affected = set()  # cells changed by the last lock (incl. blasts)
+        self.recheck_rows = False  # next lock checks every row, not just touched ones
+        self.gravity = GRAVITY[self.level]  # GRAVITY_ONE = 1 row per ms
+        self.gravity_acc = 0  # fraction of a row fallen since the last whole row
+        self.last_drop_time = self.clock.ticks()
+        self.lock_delay = LOCK_DELAY_MS
+        self.lock_started = None  # when the current piece touched down, None while falling
+        self.lock_resets = 0  # lock delay restarts used by the current piece
+        self.side_name = side_name
+        self.start_time = self.clock.ticks()
+        self.piece_started = self.start_time  # when the current piece got control, for lock times
+        # swaps, hyper garbage and shrinks are pre-drawn from self.rng and
+        # fire from here, so their rates don't depend on the tick rate
+        self.events = EventScheduler()
+        if modes["random_swap"]:
+            self.events.schedule(self._next_swap(self.start_time), "swap")
+        if modes["hyper_mode"]:
+            self.events.schedule(self.start_time + GARBAGE_PERIOD_MS, "garbage_window")
+            self.events.schedule(self.start_time + SHRINK_PERIOD_MS, "shrink")
+        self.shrink_left = 0
+        self.shrink_right = 0
+
+    def _next_swap(self, after):
+        return after + int(self.rng.expovariate(SWAP_RATE / 1000))
+
+    def _run_events(self, now):
+        events = self.events
+        due = events.pop_due(now)
+        while due:
+            when, kind = due
+            if kind == "swap":
+                # swap to a random piece mid-air but keep position if valid
+                candidate = self.queue.take(self.rng.randint(1, 7),
+                                            self.modes["bombs"] and self.rng.random() < 0.05, now)
+                candidate.x, candidate.y = self.current.x, self.current.y
+                if valid_position(candidate, self.board):
+                    self.queue.release(self.current)
+                    self.current = candidate
+                    when += SWAP_COOLDOWN_MS  # avoid rapid swaps
+                else:
+                    self.queue.release(candidate)
+                events.schedule(self._next_swap(when), "swap")
+            elif kind == "garbage_window":
+                # Poisson burst: arrival times inside the window, drawn up front
+                t = when + self.rng.expovariate(GARBAGE_RATE / 1000)
+                while t < when + GARBAGE_WINDOW_MS:
+                    events.schedule(int(t), "garbage")
+                    t += self.rng.expovariate(GARBAGE_RATE / 1000)
+                events.schedule(when + GARBAGE_PERIOD_MS, "garbage_window")
+            elif kind == "garbage":
+                add_garbage_line(self.board, self.rng)
+                self.telemetry.garbage(self, 1)
+            elif kind == "shrink":
+                # one more column, alternating right / left
+                if self.shrink_right <= self.shrink_left:
+                    self.shrink_right += 1
+                    col = self.board.cols - self.shrink_right
+                else:
+                    self.shrink_left += 1
+                    col = self.shrink_left - 1
+                if 0 <= col < self.board.cols:
+                    fill_column(self.board, col, self.rng)
+                    self.recheck_rows = True  # the new column can complete any row
+                    self.telemetry.shrink(self, col)
+                events.schedule(when + SHRINK_PERIOD_MS, "shrink")
+            due = events.pop_due(now)
+
+    # --- forks / undo: copy-on-write state copies -------------------------
+    def clone(self, clock=None):
+        """Independent copy of the game state for undo or AI rollouts.
+
+        Board rows are shared copy-on-write, pieces and the event queue are
+        flat copies and the RNG continues from the same state, so the fork
+        plays out exactly like the original would. modes and the profiler
+        are shared; clock defaults to the original's clock. Telemetry is
+        not: moves played on a fork never happened in the session.
+        """
+        player = TetrisPlayer.__new__(TetrisPlayer)
+        player.clock = self.clock if clock is None else clock
+        player.profiler = self.profiler
+        player.telemetry = NULL_TELEMETRY
+        self._copy_state(player)
+        return player
+
+    def restore(self, state, elapsed=0):
+        """Put this player back into a state taken with clone().
+
+        The object itself (and everything holding a reference to it) stays;
+        state remains reusable. elapsed: ms the clock moved on since the
+        clone, so fall timers and events keep their distance to now.
+        """
+        state._copy_state(self)
+        if elapsed:
+            self.shift_times(elapsed)
+
+    def _copy_state(self, target):
+        target.modes = self.modes
+        target.side_name = self.side_name
+        target.seed = self.seed
+        # __new__ skips seeding from os.urandom, setstate overwrites it anyway
+        target.rng = random.Random.__new__(random.Random)
+        target.rng.setstate(self.rng.getstate())
+        target.board = self.board.clone()
+        target.grid = target.board.colors
+        target.queue = self.queue.copy()
+        target.current = self.current.copy()
+        target.hold_piece = self.hold_piece.copy() if self.hold_piece else None
+        target.score = self.score
+        target.level = self.level
+        target.lines = self.lines
+        target.last_cleared = list(self.last_cleared)
+        target.pieces = self.pieces
+        target.game_over_cause = self.game_over_cause
+        target.blast = self.blast.copy()
+        target.last_affected = set(self.last_affected)
+        target.recheck_rows = self.recheck_rows
+        target.gravity = self.gravity
+        target.gravity_acc = self.gravity_acc
+        target.last_drop_time = self.last_drop_time
+        target.lock_delay = self.lock_delay
+        target.lock_started = self.lock_started
+        target.lock_resets = self.lock_resets
+        target.start_time = self.start_time
+        target.piece_started = self.piece_started
+        target.events = self.events.copy()
+        target.shrink_left = self.shrink_left
+        target.shrink_right = self.shrink_right
+
+    def shift_times(self, delta):
+        """Move every absolute timestamp of the state delta ms."""
+        self.last_drop_time += delta
+        self.start_time += delta
+        self.piece_started += delta
+        if self.lock_started is not None:
+            self.lock_started += delta
+        for piece in (self.current, self.hold_piece):
+            if piece is not None:
+                piece.spawn_time += delta
+                piece.visible_until += delta
+        self.events.shift(delta)
+
+    @property
+    def next_piece(self):
+        return self.queue.preview[0]
+
+    def lock_current(self):
+        """Lock the current piece, clear rows and spawn the next one.
+
+        Bombs explode before the row check, so fullness is always read from
+        the post-blast board; only rows touched by the lock or a blast are
+        checked. Returns False on game over, which is either a lock above the
+        visible field or a blocked spawn.
+        """
+        piece = self.current
+        locked_out = piece.y + piece.info.min_y < 0
+        board = self.board
+        blast = self.blast
+        with self.profiler.phase("lock"):
+            blast.detonations = 0
+            affected = lock_piece(piece, board, self.modes, blast)
+            blasts = blast.detonations
+            if board.bombs:
+                # live bombs in a completed row go off instead of the row clearing
+                full = {y for _, y in affected if 0 <= y < board.rows and board.is_full(y)}
+                triggers = [b for b in board.bombs if b[1] in full]
+                if triggers:
+                    affected |= blast.detonate(board, triggers)
+                    blasts += blast.detonations
+        # cells a blast left empty, read before the line clear moves rows
+        blasted = sum(1 for x, y in affected if not (board.masks[y] >> x) & 1) if blasts else 0
+        self.pieces += 1
+        self.last_affected = affected
+        with self.profiler.phase("line_clear"):
+            candidates = None if self.recheck_rows else {y for _, y in affected}
+            self.recheck_rows = False
+            self.last_cleared = clear_rows(board, candidates)
+        if self.last_cleared:
+            rows = len(self.last_cleared)
+            self.score += rows * 1000
+            self.lines += rows
+            level = min(MAX_LEVEL, 1 + self.lines // LINES_PER_LEVEL)
+            if level != self.level:
+                self.level = level
+                self.gravity = GRAVITY[level]
+        now = self.clock.ticks()
+        self.current = self.queue.pop(now)
+        self._spawned(now)
+        if locked_out:
+            self.game_over_cause = "lock_out"
+        elif not valid_position(self.current, self.board):
+            self.game_over_cause = "block_out"
+        self.telemetry.piece(self, piece, now - self.piece_started, blasts, blasted, self.last_cleared)
+        self.piece_started = now
+        self.queue.release(piece)
+        if self.game_over_cause is not None:
+            self.telemetry.game_over(self)
+        return self.game_over_cause is None
+
+    def _spawned(self, now):
+        """A new current piece: fresh fall and lock timers."""
+        self.gravity_acc = 0
+        self.last_drop_time = now
+        self.lock_started = None
+        self.lock_resets = 0
+
+    def moved(self):
+        """The current piece shifted or rotated on the ground: the lock delay
+        starts over, at most LOCK_RESETS times per piece so it can't stall
+        forever."""
+        if self.lock_started is not None and self.lock_resets < LOCK_RESETS:
+            self.lock_resets += 1
+            self.lock_started = self.clock.ticks()
+
+    def soft_drop(self):
+        self.current.y += 1
+        if not valid_position(self.current, self.board):
+            self.current.y -= 1
+            return self.lock_current()
+        return True
+
+    def ghost_y(self):
+        """Row where the current piece would land on a hard drop."""
+        piece = self.current
+        return piece.y + self.board.drop_distance(piece.info, piece.x, piece.y)
+
+    def hard_drop(self):
+        self.current.y = self.ghost_y()
+        return self.lock_current()
+
+    def hold(self):
+        if self.current.hold_used:
+            return
+        now = self.clock.ticks()
+        cols = self.board.cols
+        held = self.current
+        held.reset(held.base_id, held.is_bomb, now, cols)  # back to its spawn orientation
+        if self.hold_piece is None:
+            self.current = self.queue.pop(now)
+        else:
+            # swap
+            self.current = self.hold_piece
+            self.current.reset(self.current.base_id, self.current.is_bomb, now, cols)
+        self.hold_piece = held
+        self.current.hold_used = True
+        self._spawned(now)
+
+    def step(self):
+        now = self.clock.ticks()
+        # gravity: rows fallen since last_drop_time, the fraction carries over
+        fall = self.gravity_acc + (now - self.last_drop_time) * self.gravity
+        instant = self.gravity >= GRAVITY_20G
+        if fall >= GRAVITY_ONE or instant or self.lock_started is not None:
+            rows, self.gravity_acc = divmod(fall, GRAVITY_ONE)
+            self.last_drop_time = now
+            # one sweep for any number of rows, so 20G costs the same as 1 row
+            piece = self.current
+            dist = self.board.drop_distance(piece.info, piece.x, piece.y)
+            if instant or rows >= dist:
+                rows = dist
+                self.gravity_acc = 0  # no fall stored up while on the ground
+            piece.y += rows
+            if rows == dist:
+                if self.lock_started is None:
+                    self.lock_started = now
+                if now - self.lock_started >= self.lock_delay and not self.lock_current():
+                    return False
+            else:
+                self.lock_started = None  # slid off the ledge: falling again
+
+        # timed events (random swap, hyper garbage / shrink); O(1) while nothing is due
+        if now >= self.events.next_time:
+            self._run_events(now)
+
+        # invisible mode: current piece visibility handled in draw
+        return True
+
+# input actions; the index doubles as the action code in replays
+ACTIONS = ("left", "right", "rotate", "soft", "hard", "hold")
+
+def apply_action(player, action):
+    """Apply one of ACTIONS to a player. Returns False on game over."""
+    piece = player.current
+    if action == "left" or action == "right":
+        dx = -1 if action == "left" else 1
+        piece.x += dx
+        if not valid_position(piece, player.board):
+            piece.x -= dx
+        elif player.lock_started is not None:
+            player.moved()
+    elif action == "rotate":
+        if piece.rotate(player.board) and player.lock_started is not None:
+            player.moved()
+    elif action == "soft":
+        return player.soft_drop()
+    elif action == "hard":
+        return player.hard_drop()
+    elif action == "hold":
+        player.hold()
+    return True
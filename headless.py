@@ -0,0 +1,104 @@
+"""
+Headless runner: speelt Tetris games zonder display, audio of pygame.
+
+De engine wordt gestuurd door een ManualClock die elke tick een vast aantal
+ms vooruit gaat, dus games lopen zo snel als de CPU toelaat.
+
+Run: python headless.py --games 200 --seed 1 [--telemetry runs.tlog]
+"""
+
+import argparse
+import random
+import time
+
+from engine import DEFAULT_MODES, ManualClock, TetrisPlayer, apply_action
+from telemetry import SessionLog
+
+TICK_MS = 1000 // 60  # one simulated 60 FPS frame
+MAX_TICKS = 100000
+
+
+def random_policy(player, rng):
+    """Shift and rotate the current piece at random, then hard drop."""
+    actions = ["rotate"] * rng.randint(0, 3)
+    actions += [rng.choice(("left", "right"))] * rng.randint(0, 5)
+    actions.append("hard")
+    return actions
+
+
+def run_game(seed, modes=None, policy=random_policy, max_ticks=MAX_TICKS, tick_ms=TICK_MS, recorder=None,
+             telemetry=None):
+    """Play one game to the end (or max_ticks) and return a result dict.
+
+    The player and the policy get separate RNG streams derived from seed, so a
+    game is fully determined by (seed, modes, policy). Pass a ReplayRecorder to
+    capture the inputs, a telemetry.SessionLog to log every piece.
+    """
+    modes = dict(DEFAULT_MODES if modes is None else modes)
+    rng = random.Random(~seed)
+    clock = ManualClock()
+    player = TetrisPlayer(modes, clock=clock, seed=seed)
+    if telemetry is not None:
+        telemetry.bind(player)
+    ticks = 0
+    alive = True
+    while alive and ticks < max_ticks:
+        for action in policy(player, rng):
+            if recorder is not None:
+                recorder.record(ticks, 0, action)
+            if not apply_action(player, action):
+                alive = False
+                break
+        if alive and not player.step():
+            alive = False
+        clock.advance(tick_ms)
+        ticks += 1
+    if recorder is not None:
+        recorder.finish(ticks)
+    if telemetry is not None:
+        telemetry.unbind(player, "max_ticks")
+    return {
+        "seed": seed,
+        "score": player.score,
+        "lines": player.lines,
+        "pieces": player.pieces,
+        "ticks": ticks,
+        "game_over": not alive,
+        "cause": player.game_over_cause if not alive else "max_ticks",
+    }
+
+
+def run_games(games, seed=0, modes=None, policy=random_policy, max_ticks=MAX_TICKS, telemetry=None):
+    """Run games sequentially; returns (results, elapsed seconds)."""
+    start = time.perf_counter()
+    results = [run_game(seed + i, modes, policy, max_ticks, telemetry=telemetry) for i in range(games)]
+    return results, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Tetris games without a display.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS)
+    parser.add_argument("--off", nargs="*", default=[], choices=sorted(DEFAULT_MODES),
+                        help="modes to switch off")
+    parser.add_argument("--telemetry", metavar="PATH", help="append a record per piece to this file")
+    args = parser.parse_args(argv)
+
+    modes = dict(DEFAULT_MODES)
+    for name in args.off:
+        modes[name] = False
+    log = SessionLog(args.telemetry) if args.telemetry else None
+    try:
+        results, elapsed = run_games(args.games, args.seed, modes, max_ticks=args.max_ticks, telemetry=log)
+    finally:
+        if log is not None:
+            log.close()
+    pieces = sum(r["pieces"] for r in results)
+    elapsed = max(elapsed, 1e-9)
+    print(f"games: {len(results)}  pieces: {pieces}  time: {elapsed:.2f}s")
+    print(f"games/s: {len(results) / elapsed:.1f}  pieces/s: {pieces / elapsed:.0f}")
+
+
+if __name__ == "__main__":
+    main()
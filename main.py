@@ -3,8 +3,14 @@ Tetris Hardcore Pack
 - Bomb pieces
 - Invisible mode (piece invisible after 2s)
 - Hyper mode (field contraction over time + periodic garbage)
+- Levels every 10 lines: gravity up to 20G, 0.5 s lock delay (move / rotate resets it)
+- 3-piece preview, pure random or 7-bag pieces (seven_bag mode)
 - Random shape swap
 - Local 2-player split-screen
+- Held keys auto-repeat (DAS / ARR, soft drop repeat), see controls.py
+- Quick save / load (F5 / F9) and undo per piece (Backspace)
+- Per-piece session stats (--telemetry PATH, summary: python telemetry.py PATH)
+- Online versus via netplay.py (--connect HOST:PORT)
 - Simple menu to toggle modes
 
 Benodigdheden: pygame
@@ -12,29 +18,38 @@ Installatie: pip install pygame
 Run: python tetris_hardcore_pack.py
 """
 
+import argparse
+import asyncio
 import pygame
 import random
 import sys
-import time
+from collections import OrderedDict, deque
+from fractions import Fraction
+
+from ai import CpuController
+from broadcast import BroadcastServer, StreamEncoder
+from controls import InputQueue, build_dispatch
+from engine import COLS, ROWS, DEFAULT_MODES, FixedTimestep, ManualClock, TetrisPlayer, apply_action
+from netplay import VersusClient
+from profiler import FrameProfiler
+from replay import Replay, ReplayRecorder, ReplayRunner, play_replay
+import snapshot
+from telemetry import SessionLog
 
 # ===========================
 # CONFIGURATIE
 # ===========================
 CELL_SIZE = 24
-COLS = 10
-ROWS = 20
 PANEL_WIDTH = 200
-FPS = 60
-
-# Mode toggles — je kunt deze standaard aan/uit zetten of in menu aanpassen
-DEFAULT_MODES = {
-    "bombs": True,
-    "invisible_mode": True,
-    "hyper_mode": True,
-    "random_swap": True,
-    "multiplayer_local": True,
-    "sound": False
-}
+FPS = 60  # render cap
+LOGIC_HZ = 60  # game logic ticks per second, independent of FPS
+MAX_CATCH_UP = 5  # max logic ticks per rendered frame after a stall
+SHOW_GHOST = True  # outline where the falling piece will land
+CPU_DEPTH = 2  # CPU opponent lookahead: 1 = current piece only, 2 = also next_piece
+CPU_BUDGET_MS = 4.0  # CPU search time per rendered frame
+TOURNAMENT_CPU_BUDGET_MS = 8.0  # search time per frame, shared by all CPU boards
+QUICKSAVE_PATH = "quicksave.tsnp"
+UNDO_DEPTH = 50  # pieces that can be taken back
 
 # kleuren
 COLORS = [
@@ -49,223 +64,6 @@ COLORS = [
     (200, 200, 200)   # grid lijnen/tekst
 ]
 
-# SHAPES: elke vorm heeft rotaties; toevoegen van 'bomb' attribuut via shape_id > 7
-# Voor bomb-blocks: we will treat shape_ids 11..17 as bomb variants of 1..7
-SHAPES = {
-    1: [  # I
-        [[0,0,0,0],
-         [1,1,1,1],
-         [0,0,0,0],
-         [0,0,0,0]],
-        [[0,0,1,0],
-         [0,0,1,0],
-         [0,0,1,0],
-         [0,0,1,0]]
-    ],
-    2: [  # J
-        [[1,0,0],
-         [1,1,1],
-         [0,0,0]],
-        [[0,1,1],
-         [0,1,0],
-         [0,1,0]],
-        [[0,0,0],
-         [1,1,1],
-         [0,0,1]],
-        [[0,1,0],
-         [0,1,0],
-         [1,1,0]]
-    ],
-    3: [  # L
-        [[0,0,1],
-         [1,1,1],
-         [0,0,0]],
-        [[0,1,0],
-         [0,1,0],
-         [0,1,1]],
-        [[0,0,0],
-         [1,1,1],
-         [1,0,0]],
-        [[1,1,0],
-         [0,1,0],
-         [0,1,0]]
-    ],
-    4: [  # O
-        [[1,1],
-         [1,1]]
-    ],
-    5: [  # S
-        [[0,1,1],
-         [1,1,0],
-         [0,0,0]],
-        [[0,1,0],
-         [0,1,1],
-         [0,0,1]]
-    ],
-    6: [  # T
-        [[0,1,0],
-         [1,1,1],
-         [0,0,0]],
-        [[0,1,0],
-         [0,1,1],
-         [0,1,0]],
-        [[0,0,0],
-         [1,1,1],
-         [0,1,0]],
-        [[0,1,0],
-         [1,1,0],
-         [0,1,0]]
-    ],
-    7: [  # Z
-        [[1,1,0],
-         [0,1,1],
-         [0,0,0]],
-        [[0,0,1],
-         [0,1,1],
-         [0,1,0]]
-    ]
-}
-
-# ===========================
-# UTILS / GAME CLASSES
-# ===========================
-class Piece:
-    def __init__(self, shape_id, is_bomb=False):
-        # shape_id in 1..7 reference shapes; if is_bomb True create bomb-variant
-        self.base_id = shape_id
-        self.is_bomb = is_bomb
-        self.shape_id = shape_id + (10 if is_bomb else 0)  # bomb ids mapped >10
-        self.rotations = SHAPES[shape_id]
-        self.rotation = 0
-        self.shape = self.rotations[self.rotation]
-        self.x = COLS // 2 - len(self.shape[0]) // 2
-        self.y = -2  # spawn slightly above to allow rotation
-        self.spawn_time = time.time()
-        self.visible_until = self.spawn_time + 2.0  # invisible after 2s if invisible_mode on
-        self.hold_used = False
-
-    def rotate(self, grid):
-        old = self.rotation
-        self.rotation = (self.rotation + 1) % len(self.rotations)
-        self.shape = self.rotations[self.rotation]
-        if not valid_position(self, grid):
-            # beperkte wall kick: probeer 1 x left/right
-            for dx in (-1, 1):
-                self.x += dx
-                if valid_position(self, grid):
-                    return True
-                self.x -= dx
-            self.rotation = old
-            self.shape = self.rotations[self.rotation]
-            return False
-        return True
-
-    def get_cells(self):
-        cells = []
-        for i, row in enumerate(self.shape):
-            for j, val in enumerate(row):
-                if val:
-                    cells.append((self.x + j, self.y + i))
-        return cells
-
-def create_grid(locked_positions, cols=COLS, rows=ROWS):
-    return [[0 for _ in range(cols)] for _ in range(rows)]
-
-def valid_position(piece, grid):
-    for i, row in enumerate(piece.shape):
-        for j, val in enumerate(row):
-            if val:
-                x = piece.x + j
-                y = piece.y + i
-                if x < 0 or x >= COLS or y >= ROWS:
-                    return False
-                if y >= 0 and grid[y][x] != 0:
-                    return False
-    return True
-
-def lock_piece(piece, locked_positions, modes):
-    """Lock the piece into locked_positions. If bomb -> explode neighbors."""
-    for i, row in enumerate(piece.shape):
-        for j, val in enumerate(row):
-            if val:
-                x = piece.x + j
-                y = piece.y + i
-                if 0 <= x < COLS and 0 <= y < ROWS:
-                    if piece.is_bomb and modes["bombs"]:
-                        # mark bomb cell differently (we'll explode immediately)
-                        locked_positions[(x, y)] = -1  # -1 means bomb tile
-                    else:
-                        locked_positions[(x, y)] = piece.base_id
-    # handle bombs explosion: find bombs and explode
-    if modes["bombs"]:
-        bombs = [pos for pos, v in list(locked_positions.items()) if v == -1]
-        for (bx, by) in bombs:
-            # explosion radius 1
-            for dx in (-1, 0, 1):
-                for dy in (-1, 0, 1):
-                    tx, ty = bx + dx, by + dy
-                    if (tx, ty) in locked_positions:
-                        del locked_positions[(tx, ty)]
-            # leave a small flash? already removed
-    return
-
-def clear_rows(grid, locked_positions):
-    rows_cleared = 0
-    for y in range(ROWS - 1, -1, -1):
-        full = True
-        for x in range(COLS):
-            if grid[y][x] == 0:
-                full = False
-                break
-        if full:
-            rows_cleared += 1
-            # remove from locked
-            for x in range(COLS):
-                if (x, y) in locked_positions:
-                    del locked_positions[(x, y)]
-            # move everything above down
-            for key in sorted(list(locked_positions.keys()), key=lambda k: k[1])[::-1]:
-                xk, yk = key
-                if yk < y:
-                    val = locked_positions.pop(key)
-                    locked_positions[(xk, yk + 1)] = val
-    return rows_cleared
-
-def convert_locked_to_grid(locked_positions):
-    grid = create_grid(locked_positions)
-    for (x, y), v in locked_positions.items():
-        if 0 <= y < ROWS and 0 <= x < COLS:
-            # bomb exploded cells were deleted already; store base id values only
-            if v > 0:
-                grid[y][x] = v
-    return grid
-
-def add_garbage_line(locked_positions):
-    """Add a garbage line (random hole) at bottom, shift everything up"""
-    # shift everything up by 1: decrease y by 1
-    new_locked = {}
-    for (x, y), v in list(locked_positions.items()):
-        ny = y - 1
-        if ny >= 0:
-            new_locked[(x, ny)] = v
-    # new bottom row at y = ROWS-1 with hole
-    hole = random.randint(0, COLS - 1)
-    for x in range(COLS):
-        if x != hole:
-            new_locked[(x, ROWS - 1)] = random.randint(1, 7)
-    locked_positions.clear()
-    locked_positions.update(new_locked)
-
-def shrink_field_from_sides(locked_positions, shrink_amount_left, shrink_amount_right):
-    """Mark columns as unusable by setting locked cells in the shrink columns."""
-    # left shrink
-    for col in range(shrink_amount_left):
-        for row in range(ROWS):
-            locked_positions[(col, row)] = random.randint(1, 7)
-    for col in range(COLS - shrink_amount_right, COLS):
-        for row in range(ROWS):
-            locked_positions[(col, row)] = random.randint(1, 7)
-
 # ===========================
 # GAME LOOP / UI
 # ===========================
@@ -273,8 +71,10 @@ pygame.init()
 pygame.mixer.init()
 FONT = pygame.font.SysFont('consolas', 18)
 BIGFONT = pygame.font.SysFont('consolas', 36)
+SMALLFONT = pygame.font.SysFont('consolas', 14)
 
-SCREEN_WIDTH = COLS * CELL_SIZE + (PANEL_WIDTH if not DEFAULT_MODES["multiplayer_local"] else PANEL_WIDTH * 2)
+# one board + panel per player
+SCREEN_WIDTH = (COLS * CELL_SIZE + PANEL_WIDTH) * (2 if DEFAULT_MODES["multiplayer_local"] else 1)
 SCREEN_HEIGHT = ROWS * CELL_SIZE
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption("Tetris Hardcore Pack")
@@ -290,211 +90,485 @@ if DEFAULT_MODES["sound"]:
     except Exception:
         SOUND_DROP = None
 
-def draw_grid(surface, grid, offset_x=0, offset_y=0, hide_grid=False):
-    for y in range(ROWS):
-        for x in range(COLS):
-            val = grid[y][x]
-            color = COLORS[val] if val < len(COLORS) else COLORS[0]
-            rect = pygame.Rect(offset_x + x * CELL_SIZE, offset_y + y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-            pygame.draw.rect(surface, color, rect)
-            if not hide_grid:
-                pygame.draw.rect(surface, COLORS[8], rect, 1)
-
-def draw_piece(surface, piece, offset_x=0, offset_y=0, modes=None):
-    # if invisible_mode enabled and piece is past visible_until -> don't draw it
-    if modes and modes["invisible_mode"] and time.time() > piece.visible_until:
-        return  # invisible (still collides)
-    for i, row in enumerate(piece.shape):
-        for j, v in enumerate(row):
-            if v:
-                x = piece.x + j
-                y = piece.y + i
-                if y >= 0:
-                    rect = pygame.Rect(offset_x + x * CELL_SIZE, offset_y + y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                    # bomb pieces brighter
-                    color = COLORS[piece.base_id]
-                    if piece.is_bomb and modes and modes["bombs"]:
-                        # highlight bomb with white border
-                        pygame.draw.rect(surface, color, rect)
-                        pygame.draw.rect(surface, (255, 255, 255), rect, 2)
-                    else:
-                        pygame.draw.rect(surface, color, rect)
-                        pygame.draw.rect(surface, COLORS[8], rect, 1)
-
-def draw_panel(surface, x, y, width, title, score, level, modes, next_piece, hold_piece):
-    pygame.draw.rect(surface, (20, 20, 20), (x, y, width - 10, 200))
-    title_surf = FONT.render(title, True, (240,240,240))
-    surface.blit(title_surf, (x + 10, y + 10))
-    score_surf = FONT.render(f"Score: {score}", True, (240,240,240))
-    level_surf = FONT.render(f"Level: {level}", True, (240,240,240))
-    surface.blit(score_surf, (x + 10, y + 40))
-    surface.blit(level_surf, (x + 10, y + 70))
-    # modes
-    y0 = y + 110
-    for idx, (k, v) in enumerate(modes.items()):
-        mtxt = f"{k}: {'ON' if v else 'OFF'}"
-        ms = FONT.render(mtxt, True, (200,200,200))
-        surface.blit(ms, (x + 10, y0 + idx*20))
-    # draw next piece
-    if next_piece:
-        nsurf = FONT.render("Next:", True, (200,200,200))
-        surface.blit(nsurf, (x + 10, y + 160))
-        for i, row in enumerate(next_piece.shape):
-            for j, val in enumerate(row):
-                if val:
-                    rect = pygame.Rect(x + 80 + j * CELL_SIZE, y + 150 + i * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                    pygame.draw.rect(surface, COLORS[next_piece.base_id], rect)
-                    pygame.draw.rect(surface, COLORS[8], rect, 1)
-    # hold
-    if hold_piece:
-        hs = FONT.render("Hold:", True, (200,200,200))
-        surface.blit(hs, (x + 10, y + 260))
-        for i, row in enumerate(hold_piece.shape):
-            for j, val in enumerate(row):
-                if val:
-                    rect = pygame.Rect(x + 80 + j * CELL_SIZE, y + 250 + i * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                    pygame.draw.rect(surface, COLORS[hold_piece.base_id], rect)
-                    pygame.draw.rect(surface, COLORS[8], rect, 1)
+class DrawStats:
+    """Counts draw calls (rects + blits) so renderer savings can be measured."""
+
+    def __init__(self):
+        self.calls = 0
+        self.last_frame = 0
+
+    def end_frame(self):
+        self.last_frame = self.calls
+        self.calls = 0
+
+draw_stats = DrawStats()
 
 # ===========================
-# MAIN GAME CLASS (per speler)
+# SPRITES
 # ===========================
-class TetrisPlayer:
-    def __init__(self, modes, side_name="P1"):
-        self.modes = modes
-        self.locked = {}  # (x,y) -> id
-        self.grid = create_grid(self.locked)
-        self.current = self.get_new_piece()
-        self.next_piece = self.get_new_piece()
-        self.hold_piece = None
-        self.score = 0
-        self.level = 1
-        self.lines = 0
-        self.fall_speed = 700  # ms
-        self.last_drop_time = pygame.time.get_ticks()
-        self.swap_cooldown = 0  # for random swap
-        self.side_name = side_name
-        self.start_time = time.time()
-        self.shrink_left = 0
-        self.shrink_right = 0
-
-    def get_new_piece(self):
-        # small chance to spawn bomb piece if bombs mode on
-        is_bomb = self.modes["bombs"] and random.random() < 0.08  # 8% chance
-        return Piece(random.randint(1, 7), is_bomb=is_bomb)
-
-    def update_grid_from_locked(self):
-        self.grid = create_grid(self.locked)
-        for (x, y), v in self.locked.items():
-            if 0 <= x < COLS and 0 <= y < ROWS and v > 0:
-                self.grid[y][x] = v
-
-    def soft_drop(self):
-        self.current.y += 1
-        if not valid_position(self.current, self.grid):
-            self.current.y -= 1
-            lock_piece(self.current, self.locked, self.modes)
-            rows = clear_rows(self.grid, self.locked)
-            if rows:
-                self.score += rows * 1000
-                self.lines += rows
-            self.current = self.next_piece
-            self.next_piece = self.get_new_piece()
-            self.current.hold_used = False
-            if not valid_position(self.current, self.grid):
-                return False  # game over
-        return True
+GHOST_BORDER = 2
+BOMB_BORDER = (255, 255, 255)
+
+class SpriteCache:
+    """Pre-rendered cell surfaces per (color id, style) and empty board
+    backgrounds, built lazily per cell size so boards of different scales
+    share one cache. Everything is dropped when COLORS changes.
+
+    Styles: "normal" (fill + grid border), "bomb" (fill + white rim),
+    "ghost" (empty cell with a colored outline) and "flat" (fill only).
+    """
+
+    STYLES = ("normal", "bomb", "ghost", "flat")
+
+    def __init__(self):
+        self.palette = None
+        self.sets = {}  # cell size -> {(color id, style): surface}
+        self.backgrounds = {}  # (cell size, cols, rows) -> surface
 
-    def hard_drop(self):
-        while valid_position(self.current, self.grid):
-            self.current.y += 1
-        self.current.y -= 1
-        lock_piece(self.current, self.locked, self.modes)
-        rows = clear_rows(self.grid, self.locked)
-        if rows:
-            self.score += rows * 1000
-            self.lines += rows
-        self.current = self.next_piece
-        self.next_piece = self.get_new_piece()
-        self.current.hold_used = False
-        if not valid_position(self.current, self.grid):
+    def refresh(self):
+        """Drop everything if the palette changed; True when it did."""
+        palette = tuple(COLORS)
+        if palette == self.palette:
             return False
+        self.palette = palette
+        self.sets.clear()
+        self.backgrounds.clear()
         return True
 
-    def hold(self):
-        if self.current.hold_used:
-            return
-        if self.hold_piece is None:
-            self.hold_piece = Piece(self.current.base_id, is_bomb=self.current.is_bomb)
-            self.current = self.next_piece
-            self.next_piece = self.get_new_piece()
+    def cells(self, size=CELL_SIZE):
+        cells = self.sets.get(size)
+        if cells is None:
+            cells = self.sets[size] = self._build(size)
+        return cells
+
+    def _build(self, size):
+        rect = pygame.Rect(0, 0, size, size)
+        cells = {}
+        border = min(GHOST_BORDER, max(1, size // 8))
+        for color_id, color in enumerate(COLORS):
+            for style in self.STYLES:
+                surf = pygame.Surface((size, size))
+                if style == "ghost":
+                    surf.fill(COLORS[0])
+                    pygame.draw.rect(surf, COLORS[8], rect, 1)
+                    pygame.draw.rect(surf, color, rect, border)
+                else:
+                    surf.fill(color)
+                    if style == "normal":
+                        pygame.draw.rect(surf, COLORS[8], rect, 1)
+                    elif style == "bomb":
+                        pygame.draw.rect(surf, BOMB_BORDER, rect, border)
+                cells[(color_id, style)] = surf.convert()
+        return cells
+
+    def background(self, size=CELL_SIZE, cols=COLS, rows=ROWS):
+        key = (size, cols, rows)
+        surf = self.backgrounds.get(key)
+        if surf is None:
+            empty = self.cells(size)[(0, "normal")]
+            surf = pygame.Surface((cols * size, rows * size)).convert()
+            surf.blits([(empty, (x * size, y * size)) for y in range(rows) for x in range(cols)])
+            self.backgrounds[key] = surf
+        return surf
+
+    def cell(self, color_id, style="normal", size=CELL_SIZE):
+        cells = self.cells(size)
+        return cells.get((color_id, style)) or cells[(0, style)]
+
+sprites = SpriteCache()
+
+def draw_cell(surface, px, py, color_id, style="normal", size=CELL_SIZE):
+    surface.blit(sprites.cell(color_id, style, size), (px, py))
+    draw_stats.calls += 1
+    return pygame.Rect(px, py, size, size)
+
+def piece_style(piece, modes):
+    """Sprite style for a falling piece; bombs get a white rim."""
+    if piece.is_bomb and modes and modes["bombs"]:
+        return "bomb"
+    return "normal"
+
+def piece_visible(piece, modes, now):
+    # invisible_mode: piece disappears after visible_until (still collides)
+    return not (modes and modes["invisible_mode"] and now > piece.visible_until)
+
+def draw_grid(surface, grid, offset_x=0, offset_y=0, hide_grid=False, bombs=(), size=CELL_SIZE):
+    """One background blit plus a batched blits() of the occupied cells.
+
+    bombs: (x, y) cells holding a live bomb tile, drawn with the bomb sprite.
+    """
+    sprites.refresh()
+    style = "flat" if hide_grid else "normal"
+    rows, cols = len(grid), len(grid[0])
+    if hide_grid:
+        surface.fill(COLORS[0], (offset_x, offset_y, cols * size, rows * size))
+    else:
+        surface.blit(sprites.background(size, cols, rows), (offset_x, offset_y))
+    cells = sprites.cells(size)
+    surface.blits([(cells.get((v, "bomb" if (x, y) in bombs else style), cells[(0, style)]),
+                    (offset_x + x * size, offset_y + y * size))
+                   for y, row in enumerate(grid) for x, v in enumerate(row) if v], doreturn=False)
+    draw_stats.calls += 2
+
+def draw_piece(surface, piece, offset_x=0, offset_y=0, modes=None, now=0, size=CELL_SIZE):
+    if not piece_visible(piece, modes, now):
+        return
+    sprite = sprites.cell(piece.base_id, piece_style(piece, modes), size)
+    surface.blits([(sprite, (offset_x + x * size, offset_y + y * size))
+                   for x, y in piece.get_cells() if y >= 0], doreturn=False)
+    draw_stats.calls += 1
+
+# ===========================
+# TEXT CACHE
+# ===========================
+class TextCache:
+    """LRU cache of rendered text surfaces keyed by (font, text, color).
+
+    A string is only rasterized again when its value changes (e.g. a new
+    score); hits and misses are counted for the profiler.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surf = self.entries.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = font.render(text, True, color)
+        self.entries[key] = surf
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return surf
+
+    def clear(self):
+        self.entries.clear()
+
+text_cache = TextCache()
+
+def draw_text(surface, font, text, color, pos):
+    text_surf = text_cache.render(font, text, color)
+    surface.blit(text_surf, pos)
+    draw_stats.calls += 1
+    return text_surf
+
+def draw_panel(surface, x, y, width, title, score, level, modes, preview, hold_piece):
+    pygame.draw.rect(surface, (20, 20, 20), (x, y, width - 10, 100))
+    draw_stats.calls += 1
+    draw_text(surface, FONT, title, (240,240,240), (x + 10, y + 10))
+    draw_text(surface, FONT, f"Score: {score}", (240,240,240), (x + 10, y + 40))
+    draw_text(surface, FONT, f"Level: {level}", (240,240,240), (x + 10, y + 70))
+    # next / hold previews in small cells so the mode list fits underneath;
+    # the pieces after next at half that size in a row below it
+    size = CELL_SIZE * 2 // 3
+    if preview:
+        draw_text(surface, FONT, "Next:", (200,200,200), (x + 10, y + 120))
+        for j, i in preview[0].info.cells:
+            draw_cell(surface, x + 80 + j * size, y + 110 + i * size, preview[0].base_id, size=size)
+        small = size // 2
+        fits = (width - 90) // (5 * small)
+        for k in range(1, min(len(preview), 1 + fits)):
+            piece = preview[k]
+            for j, i in piece.info.cells:
+                draw_cell(surface, x + 80 + (k - 1) * 5 * small + j * small, y + 150 + i * small, piece.base_id,
+                          size=small)
+    if hold_piece:
+        draw_text(surface, FONT, "Hold:", (200,200,200), (x + 10, y + 200))
+        for j, i in hold_piece.info.cells:
+            draw_cell(surface, x + 80 + j * size, y + 190 + i * size, hold_piece.base_id, size=size)
+    # modes
+    y0 = y + 280
+    for idx, (k, v) in enumerate(modes.items()):
+        draw_text(surface, FONT, f"{k}: {'ON' if v else 'OFF'}", (200,200,200), (x + 10, y0 + idx*20))
+
+# ===========================
+# LAYOUT
+# ===========================
+LABEL_HEIGHT = 18  # name / score strip above a compact board
+TOURNAMENT_SIZE = (1280, 720)
+TOURNAMENT_GAP = 8
+
+class Viewport:
+    """Where one board goes on screen: tile origin, cell size and board size.
+
+    A board either has a side panel of panel px (the normal versus view) or,
+    with label px, a compact name/score strip above it (tournament view).
+    """
+
+    def __init__(self, x, y, cell=CELL_SIZE, cols=COLS, rows=ROWS, panel=0, label=0):
+        self.x = x
+        self.y = y
+        self.cell = cell
+        self.cols = cols
+        self.rows = rows
+        self.panel = panel
+        self.label = label
+        self.bx = x  # board origin
+        self.by = y + label
+
+    @property
+    def board_rect(self):
+        return pygame.Rect(self.bx, self.by, self.cols * self.cell, self.rows * self.cell)
+
+    @property
+    def size(self):
+        """(width, height) of the whole tile."""
+        return self.cols * self.cell + self.panel, self.rows * self.cell + self.label
+
+def versus_layout(players):
+    """Full-size boards side by side, each with its panel."""
+    viewports = []
+    x = 0
+    for player in players:
+        vp = Viewport(x, 0, CELL_SIZE, player.board.cols, player.board.rows, panel=PANEL_WIDTH)
+        viewports.append(vp)
+        x += vp.size[0]
+    return viewports
+
+def grid_layout(players, width, height, gap=TOURNAMENT_GAP, label=LABEL_HEIGHT):
+    """Scale len(players) boards into a width x height window.
+
+    Tries every column count and keeps the one with the largest cell size;
+    the grid is centered. Boards may have different sizes - the biggest one
+    decides the tile.
+    """
+    count = len(players)
+    if not count:
+        return []
+    cols = max(p.board.cols for p in players)
+    rows = max(p.board.rows for p in players)
+    best = None
+    for ncols in range(1, count + 1):
+        nrows = -(-count // ncols)
+        cell = min((width - gap * (ncols + 1)) // (ncols * cols),
+                   (height - gap * (nrows + 1) - nrows * label) // (nrows * rows))
+        if best is None or cell > best[0]:
+            best = (cell, ncols, nrows)
+    cell, ncols, nrows = best
+    cell = max(cell, 2)
+    tile_w, tile_h = cols * cell, rows * cell + label
+    x0 = (width - ncols * tile_w - (ncols - 1) * gap) // 2
+    y0 = (height - nrows * tile_h - (nrows - 1) * gap) // 2
+    viewports = []
+    for i, player in enumerate(players):
+        r, c = divmod(i, ncols)
+        viewports.append(Viewport(x0 + c * (tile_w + gap), y0 + r * (tile_h + gap), cell,
+                                  player.board.cols, player.board.rows, label=label))
+    return viewports
+
+# ===========================
+# DIRTY-RECT RENDERER
+# ===========================
+BG_COLOR = (10, 10, 10)
+
+class BoardView:
+    """What one board slot showed on the previous frame."""
+
+    def __init__(self):
+        self.player = None
+        self.rows = None   # copies of the drawn color rows
+        self.piece = None  # (cells, base_id, style, ghost cells) of the drawn piece, None if hidden
+        self.panel = None  # state key of the drawn panel
+
+class DirtyRenderer:
+    """Redraws only cells, pieces and panels that changed since the last frame
+    and pushes just those rects with pygame.display.update().
+
+    Boards and panels are drawn on an offscreen base layer; each dirty rect is
+    copied to the screen and the HUD overlays are blended on top, clipped to
+    that rect, so anti-aliased text never gets blended twice.
+    """
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.surface = pygame.Surface(screen.get_size())
+        self.screen_rect = screen.get_rect()
+        self.views = []
+        self.overlays = None
+        self.frame_overlays = []
+        self.full = True
+        self.dirty = []
+
+    def invalidate(self):
+        self.full = True
+
+    def mark_dirty(self, rect):
+        """Force rect to be pushed this frame (e.g. a live overlay)."""
+        self.dirty.append(pygame.Rect(rect))
+
+    def begin(self, overlays):
+        """Start a frame. overlays: (name, surface, pos) HUD items drawn on top."""
+        self.dirty = []
+        if sprites.refresh():
+            self.full = True
+        key = [(name, pos) for name, _, pos in overlays]
+        if key != self.overlays:
+            # an overlay appeared, moved or disappeared: repaint everything
+            self.overlays = key
+            self.full = True
+        self.frame_overlays = overlays
+        if self.full:
+            self.surface.fill(BG_COLOR)
+            draw_stats.calls += 1
+            for view in self.views:
+                view.player = None
+
+    def draw_player(self, slot, player, vp, modes, now):
+        """Bring board slot up to date with player, drawn at Viewport vp.
+
+        All cell sprites of the board go out in one blits() call and the
+        changes are pushed as one dirty rect per board, so the per-board cost
+        stays flat as the board count grows.
+        """
+        while len(self.views) <= slot:
+            self.views.append(BoardView())
+        view = self.views[slot]
+        if view.player is not player:
+            view.player = player
+            view.rows = view.piece = view.panel = None
+        surface = self.surface
+        grid = player.grid
+        bombs = player.board.bombs
+        size = vp.cell
+        bx, by = vp.bx, vp.by
+        cells = sprites.cells(size)
+        batch = []
+        area = None
+
+        # board cells; painted collects what got repainted from the grid
+        painted = set()
+        if view.rows is None:
+            draw_grid(surface, grid, bx, by, bombs=bombs, size=size)
+            view.rows = [row[:] for row in grid]
+            area = vp.board_rect
+            painted = None  # everything
         else:
-            # swap
-            tmp = Piece(self.current.base_id, is_bomb=self.current.is_bomb)
-            self.current = Piece(self.hold_piece.base_id, is_bomb=self.hold_piece.is_bomb)
-            self.hold_piece = tmp
-        self.current.hold_used = True
-
-    def step(self):
-        # update grid
-        self.update_grid_from_locked()
-        # gravitational drop based on fall_speed (ms)
-        now = pygame.time.get_ticks()
-        if now - self.last_drop_time > max(50, self.fall_speed):
-            self.current.y += 1
-            if not valid_position(self.current, self.grid):
-                self.current.y -= 1
-                lock_piece(self.current, self.locked, self.modes)
-                rows = clear_rows(self.grid, self.locked)
-                if rows:
-                    self.score += rows * 1000
-                    self.lines += rows
-                self.current = self.next_piece
-                self.next_piece = self.get_new_piece()
-                self.current.hold_used = False
-                if not valid_position(self.current, self.grid):
-                    return False
-            self.last_drop_time = now
-
-        # random swap: occasionally swap to random shape mid-air
-        if self.modes["random_swap"]:
-            if pygame.time.get_ticks() > self.swap_cooldown:
-                # small probability each tick to swap
-                if random.random() < 0.003:  # ~0.3% per frame
-                    # swap to a random piece but keep position if valid
-                    candidate = Piece(random.randint(1, 7), is_bomb=(self.modes["bombs"] and random.random() < 0.05))
-                    candidate.x, candidate.y = self.current.x, self.current.y
-                    if valid_position(candidate, self.grid):
-                        self.current = candidate
-                        self.swap_cooldown = pygame.time.get_ticks() + 500  # 0.5s cooldown to avoid rapid swaps
-
-        # hyper mode: periodic garbage + shrink sides over time
-        if self.modes["hyper_mode"]:
-            elapsed = time.time() - self.start_time
-            # every 30s add garbage
-            if int(elapsed) % 30 == 0 and int(elapsed) != 0:
-                # add garbage only occasionally (50% chance)
-                if random.random() < 0.08:
-                    add_garbage_line(self.locked)
-            # shrink sides every 45s by 1 column
-            shrink_steps = int(elapsed // 45)
-            if shrink_steps > 0:
-                # compute left/right shrink amounts progressively (alternate)
-                new_left = shrink_steps // 2
-                new_right = shrink_steps - new_left
-                if new_left != self.shrink_left or new_right != self.shrink_right:
-                    self.shrink_left, self.shrink_right = new_left, new_right
-                    shrink_field_from_sides(self.locked, self.shrink_left, self.shrink_right)
-
-        # invisible mode: current piece visibility handled in draw
-        return True
+            for y, row in enumerate(grid):
+                last = view.rows[y]
+                if row != last:
+                    for x in range(vp.cols):
+                        if row[x] != last[x]:
+                            batch.append((cells[(row[x], "bomb" if (x, y) in bombs else "normal")],
+                                          (bx + x * size, by + y * size)))
+                            painted.add((x, y))
+                    last[:] = row
+                    rect = pygame.Rect(bx, by + y * size, vp.cols * size, size)
+                    area = rect if area is None else area.union(rect)
+
+        # falling piece + ghost: erase the old cells (repaint board under them), draw the new ones
+        piece = player.current
+        key = None
+        if piece_visible(piece, modes, now) and not player.game_over_cause:
+            full = piece.get_cells()
+            pcells = tuple(c for c in full if c[1] >= 0)
+            ghost = ()
+            if SHOW_GHOST:
+                # from every cell: the rows above the field land on the board too
+                dy = player.ghost_y() - piece.y
+                ghost = tuple((x, y + dy) for x, y in full if (x, y + dy) not in pcells and 0 <= y + dy < vp.rows)
+            key = (pcells, piece.base_id, piece_style(piece, modes), ghost)
+        old = view.piece
+        if key != old or (key and (painted is None or not painted.isdisjoint(key[0] + key[3]))):
+            touched = []
+            if old and painted is not None:
+                for x, y in old[0] + old[3]:
+                    if (x, y) not in painted:
+                        batch.append((cells[(grid[y][x], "bomb" if (x, y) in bombs else "normal")],
+                                      (bx + x * size, by + y * size)))
+                        touched.append((x, y))
+            if key:
+                pcells, base_id, style, ghost = key
+                ghost_sprite = cells.get((base_id, "ghost"))
+                piece_sprite = cells.get((base_id, style))
+                batch.extend((ghost_sprite, (bx + x * size, by + y * size)) for x, y in ghost)
+                batch.extend((piece_sprite, (bx + x * size, by + y * size)) for x, y in pcells)
+                touched.extend(ghost)
+                touched.extend(pcells)
+            if touched:
+                xs = [x for x, _ in touched]
+                ys = [y for _, y in touched]
+                rect = pygame.Rect(bx + min(xs) * size, by + min(ys) * size,
+                                   (max(xs) - min(xs) + 1) * size, (max(ys) - min(ys) + 1) * size)
+                area = rect if area is None else area.union(rect)
+            view.piece = key
+        if batch:
+            surface.blits(batch, doreturn=False)
+            draw_stats.calls += 1
+        if area is not None:
+            self.dirty.append(area)
+
+        # side panel or compact label
+        hold_piece = player.hold_piece
+        panel_key = (player.side_name, player.score, player.level, player.lines, player.game_over_cause,
+                     tuple(modes.items()), player.queue.index, hold_piece and hold_piece.base_id)
+        if panel_key != view.panel:
+            if vp.panel:
+                px = bx + vp.cols * size + 10
+                area = pygame.Rect(px, vp.y, vp.panel - 10, vp.rows * size)
+                surface.fill(BG_COLOR, area)
+                draw_stats.calls += 1
+                draw_panel(surface, px, vp.y + 10, vp.panel, player.side_name, player.score, player.level,
+                           modes, player.queue.preview, hold_piece)
+                self.dirty.append(area)
+            elif vp.label:
+                area = pygame.Rect(vp.x, vp.y, vp.cols * size, vp.label)
+                surface.fill(BG_COLOR, area)
+                status = "  KO" if player.game_over_cause else ""
+                surface.set_clip(area)
+                draw_text(surface, SMALLFONT, f"{player.side_name}  {player.score}{status}",
+                          (240, 90, 90) if status else (220, 220, 220), (vp.x + 2, vp.y + 2))
+                surface.set_clip(None)
+                draw_stats.calls += 1
+                self.dirty.append(area)
+            view.panel = panel_key
+
+    def finish(self):
+        """Composite the dirty rects plus HUD overlays and push them."""
+        screen = self.screen
+        dirty = [self.screen_rect] if self.full else [r.clip(self.screen_rect) for r in self.dirty]
+        for rect in dirty:
+            screen.blit(self.surface, rect, rect)
+            draw_stats.calls += 1
+            for _, surf, pos in self.frame_overlays:
+                if rect.colliderect(surf.get_rect(topleft=pos)):
+                    screen.set_clip(rect)
+                    screen.blit(surf, pos)
+                    screen.set_clip(None)
+                    draw_stats.calls += 1
+        if self.full:
+            pygame.display.flip()
+            self.full = False
+        elif dirty:
+            pygame.display.update(dirty)
+        draw_stats.end_frame()
 
 # ===========================
 # GAME INIT
 # ===========================
+TICK_MS = Fraction(1000, LOGIC_HZ)  # game time per logic tick, exact: 1000 // 60 would run at 62.5 Hz
+
 modes = DEFAULT_MODES.copy()
-player1 = TetrisPlayer(modes, side_name="PLAYER 1")
-player2 = TetrisPlayer(modes, side_name="PLAYER 2") if modes["multiplayer_local"] else None
+game_clock = ManualClock()  # advanced per logic tick, so pause freezes all timers
+timestep = FixedTimestep(TICK_MS, MAX_CATCH_UP)
+match_seed = random.randrange(1 << 32)
+player1 = TetrisPlayer(modes, side_name="PLAYER 1", clock=game_clock, seed=match_seed)
+player2 = TetrisPlayer(modes, side_name="PLAYER 2", clock=game_clock, seed=match_seed + 1) \
+    if modes["multiplayer_local"] else None
+
+# frame profiler: F3 toggles the overlay, --profile PATH dumps a trace on exit
+profiler = FrameProfiler()
+for _p in (player1, player2):
+    if _p:
+        _p.profiler = profiler
+show_profiler = False
+PROFILER_REFRESH = 15  # frames between overlay text updates
 
 # input mapping
 controls_p1 = {
@@ -514,121 +588,411 @@ controls_p2 = {
     "hold": pygame.K_q
 }
 
+# key events -> per-tick actions with DAS / ARR; rebuilt per loop for the humans playing
+inputs = InputQueue(build_dispatch({0: controls_p1, 1: controls_p2}), TICK_MS)
+
 paused = False
 muted = not modes["sound"]
 
-def draw():
-    screen.fill((10,10,10))
-    # left player viewport
-    left_offset_x = 0
-    right_offset_x = COLS * CELL_SIZE + PANEL_WIDTH if modes["multiplayer_local"] else COLS * CELL_SIZE
-    # draw player1 area
-    player1.update_grid_from_locked()
-    draw_grid(screen, player1.grid, offset_x=left_offset_x)
-    draw_piece(screen, player1.current, offset_x=left_offset_x, modes=modes)
-    draw_panel(screen, left_offset_x + COLS * CELL_SIZE + 10, 10, PANEL_WIDTH, player1.side_name,
-               player1.score, player1.level, modes, player1.next_piece, player1.hold_piece)
+renderer = DirtyRenderer(screen)
+
+_profiler_surf = None
+
+def profiler_overlay():
+    """(surface, refreshed) for the rolling p50/p95/p99 table; the text is
+    only re-rendered every PROFILER_REFRESH frames."""
+    global _profiler_surf
+    refreshed = _profiler_surf is None or profiler.frames % PROFILER_REFRESH == 0
+    if refreshed:
+        lines = profiler.report_lines()[:11] + inputs.report_lines()
+        lines.append(f"draw calls: {draw_stats.last_frame}  text cache: "
+                     f"{text_cache.hits}/{text_cache.misses}")
+        # fixed size so the overlay rect stays stable between refreshes
+        _profiler_surf = pygame.Surface((420, 20 * 14))
+        _profiler_surf.fill((0, 0, 0))
+        for idx, line in enumerate(lines[:14]):
+            _profiler_surf.blit(FONT.render(line, True, (0, 255, 0)), (4, 2 + idx * 20))
+    return _profiler_surf, refreshed
+
+def versus_boards():
+    """(player, viewport) pairs for the normal one / two player view."""
+    players = [player1] + ([player2] if modes["multiplayer_local"] and player2 else [])
+    return list(zip(players, versus_layout(players)))
+
+def draw(alpha=0.0, boards=None):
+    # time-based visuals (invisible mode) are interpolated into the current tick,
+    # per board since replays and network mirrors run on their own clocks;
+    # piece positions are whole cells and need no interpolation
+    if boards is None:
+        boards = versus_boards()
+    width, height = renderer.screen_rect.size
+    with profiler.phase("draw_hud"):
+        overlays = []
+        # top HUD
+        if paused:
+            text = text_cache.render(BIGFONT, "PAUSED", (255,255,255))
+            overlays.append(("paused", text, ((width - text.get_width())//2, 10)))
+        # controls hint
+        hint = text_cache.render(FONT, "P=pauze  M=mute  F3=profiel  ESC=quit", (200,200,200))
+        overlays.append(("hint", hint, (10, height - 30)))
+        refreshed = False
+        if show_profiler:
+            surf, refreshed = profiler_overlay()
+            overlays.append(("profiler", surf, (0, 0)))
+        renderer.begin(overlays)
+        if refreshed:
+            renderer.mark_dirty(surf.get_rect())
+
+    for idx, (player, vp) in enumerate(boards):
+        with profiler.phase(f"draw_p{idx + 1}" if len(boards) <= 2 else "draw_boards"):
+            renderer.draw_player(idx, player, vp, player.modes, player.clock.ticks() + alpha * TICK_MS)
+    with profiler.phase("present"):
+        renderer.finish()
 
-    if modes["multiplayer_local"] and player2:
-        player2.update_grid_from_locked()
-        draw_grid(screen, player2.grid, offset_x=right_offset_x)
-        draw_piece(screen, player2.current, offset_x=right_offset_x, modes=modes)
-        draw_panel(screen, right_offset_x + COLS * CELL_SIZE + 10, 10, PANEL_WIDTH, player2.side_name,
-                   player2.score, player2.level, modes, player2.next_piece, player2.hold_piece)
-
-    # top HUD
-    if paused:
-        text = BIGFONT.render("PAUSED", True, (255,255,255))
-        screen.blit(text, ((SCREEN_WIDTH - text.get_width())//2, 10))
-    # controls hint
-    hint = FONT.render("P=pauze  M=mute  ESC=quit", True, (200,200,200))
-    screen.blit(hint, (10, SCREEN_HEIGHT - 30))
-
-    pygame.display.flip()
+# ===========================
+# SAVE / UNDO
+# ===========================
+class UndoHistory:
+    """Copy-on-write clones of all players at the start of every piece.
+
+    undo() puts everyone back at the start of the previous piece; timers are
+    shifted by the time that passed, so nothing fires the moment play resumes.
+    """
+
+    def __init__(self, depth=UNDO_DEPTH):
+        self.states = deque(maxlen=depth)
+        self.pieces = None
+
+    def track(self, players, now):
+        """Call once per logic tick, before inputs are applied."""
+        pieces = sum(p.pieces for p in players)
+        if pieces != self.pieces:
+            self.pieces = pieces
+            self.states.append((now, [p.clone() for p in players]))
+
+    def undo(self, players, now):
+        if len(self.states) > 1:
+            self.states.pop()  # the start of the current piece
+        if not self.states:
+            return False
+        taken, states = self.states[-1]
+        for player, state in zip(players, states):
+            player.restore(state, now - taken)
+        self.pieces = sum(p.pieces for p in players)  # already on the stack
+        return True
+
+def quick_save(players, path=QUICKSAVE_PATH):
+    snapshot.save(path, players, game_clock.ticks())
+    print(f"Saved to {path}")
+
+def quick_load(players, path=QUICKSAVE_PATH):
+    """Restore players in place (renderer, CPU and streams keep their references)."""
+    try:
+        loaded = snapshot.load(path, game_clock)
+    except (OSError, ValueError) as exc:
+        print(f"Can't load {path}: {exc}")
+        return False
+    if len(loaded) != len(players):
+        print(f"{path} holds {len(loaded)} players, this game has {len(players)}")
+        return False
+    for player, state in zip(players, loaded):
+        player.restore(state)
+    return True
 
 # ===========================
 # MAIN LOOP
 # ===========================
-def main_loop():
-    global paused, muted, modes, player1, player2
+def active_players():
+    """(player, controls) pairs for everyone currently in the game."""
+    pairs = [(player1, controls_p1)]
+    if modes["multiplayer_local"] and player2:
+        pairs.append((player2, controls_p2))
+    return pairs
+
+def main_loop(record_path=None, profile_path=None, cpu=False, broadcast_port=None, telemetry_path=None):
+    global paused, muted, show_profiler, inputs
     running = True
-    last_tick = pygame.time.get_ticks()
+    tick = 0
+    recorder = None
+    if record_path:
+        recorder = ReplayRecorder([p.seed for p, _ in active_players()], modes, TICK_MS,
+                                  player1.board.cols, player1.board.rows)
+    if profile_path:
+        profiler.enable_trace()
+    # per-piece stats, written off the frame loop (see telemetry.py)
+    session_log = None
+    if telemetry_path:
+        session_log = SessionLog(telemetry_path)
+        for p, _ in active_players():
+            session_log.bind(p)
+    # spectators: channel p1 / p2 on broadcast_port (see broadcast.py watch)
+    net_loop = None
+    streams = []
+    if broadcast_port is not None:
+        net_loop = asyncio.new_event_loop()
+        server = net_loop.run_until_complete(BroadcastServer().start("0.0.0.0", broadcast_port))
+        streams = [(StreamEncoder(p), server.channel(f"p{idx + 1}")) for idx, (p, _) in enumerate(active_players())]
+        print(f"Broadcasting on port {server.port}")
+    pending = []  # (player index, action) from the CPU, for the next logic tick
+    # CPU opponent takes the player 2 slot and plays through the same actions
+    cpus = {}
+    if cpu and len(active_players()) > 1:
+        cpus[1] = CpuController(player2, depth=CPU_DEPTH, budget_ms=CPU_BUDGET_MS)
+    inputs = InputQueue(build_dispatch({idx: controls for idx, (_, controls) in enumerate(active_players())
+                                        if idx not in cpus}), TICK_MS)
+    # undo / quick load would make the recorded inputs diverge from the game
+    history = UndoHistory() if recorder is None else None
     while running:
         dt = clock.tick(FPS)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
+        profiler.begin_frame()
+        with profiler.phase("input"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
                     running = False
-                elif event.key == pygame.K_p:
-                    paused = not paused
-                elif event.key == pygame.K_m:
-                    muted = not muted
-                # player 1 controls
-                if not paused:
-                    if event.key == controls_p1["left"]:
-                        player1.current.x -= 1
-                        if not valid_position(player1.current, player1.grid):
-                            player1.current.x += 1
-                    elif event.key == controls_p1["right"]:
-                        player1.current.x += 1
-                        if not valid_position(player1.current, player1.grid):
-                            player1.current.x -= 1
-                    elif event.key == controls_p1["rotate"]:
-                        player1.current.rotate(player1.grid)
-                    elif event.key == controls_p1["soft"]:
-                        if not player1.soft_drop():
-                            print("Player 1 lost")
-                            running = False
-                    elif event.key == controls_p1["hard"]:
-                        if not player1.hard_drop():
-                            print("Player 1 lost")
-                            running = False
-                    elif event.key == controls_p1["hold"]:
-                        player1.hold()
-
-                    # player 2 controls (if enabled)
-                    if modes["multiplayer_local"] and player2:
-                        if event.key == controls_p2["left"]:
-                            player2.current.x -= 1
-                            if not valid_position(player2.current, player2.grid):
-                                player2.current.x += 1
-                        elif event.key == controls_p2["right"]:
-                            player2.current.x += 1
-                            if not valid_position(player2.current, player2.grid):
-                                player2.current.x -= 1
-                        elif event.key == controls_p2["rotate"]:
-                            player2.current.rotate(player2.grid)
-                        elif event.key == controls_p2["soft"]:
-                            if not player2.soft_drop():
-                                print("Player 2 lost")
-                                running = False
-                        elif event.key == controls_p2["hard"]:
-                            if not player2.hard_drop():
-                                print("Player 2 lost")
-                                running = False
-                        elif event.key == controls_p2["hold"]:
-                            player2.hold()
-
-            # mouse/menu interactions could go here (not implemented)
-
-        if not paused:
-            # step players
-            ok1 = player1.step()
-            if not ok1:
-                print("GAME OVER - Player 1")
-                running = False
-            if modes["multiplayer_local"] and player2:
-                ok2 = player2.step()
-                if not ok2:
-                    print("GAME OVER - Player 2")
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        running = False
+                    elif event.key == pygame.K_p:
+                        paused = not paused
+                        inputs.reset()
+                    elif event.key == pygame.K_m:
+                        muted = not muted
+                    elif event.key == pygame.K_F3:
+                        show_profiler = not show_profiler
+                    elif event.key == pygame.K_F5:
+                        quick_save([p for p, _ in active_players()])
+                    elif event.key in (pygame.K_F9, pygame.K_BACKSPACE):
+                        if history is None:
+                            print("Undo / load are off while recording a replay")
+                        elif event.key == pygame.K_F9:
+                            if quick_load([p for p, _ in active_players()]):
+                                history = UndoHistory()
+                                inputs.reset()
+                        elif history.undo([p for p, _ in active_players()], game_clock.ticks()):
+                            inputs.reset()
+                    elif not paused:
+                        inputs.push(event.key, True)
+                elif event.type == pygame.KEYUP:
+                    inputs.push(event.key, False)
+                elif event.type == pygame.WINDOWFOCUSLOST:
+                    # the key ups go to another window: don't keep shifting
+                    inputs.reset()
+
+                # mouse/menu interactions could go here (not implemented)
+
+        if cpus and not paused:
+            with profiler.phase("cpu"):
+                for idx, controller in cpus.items():
+                    pending.extend((idx, action) for action in controller.update())
+
+        # fixed-timestep logic: 0..MAX_CATCH_UP ticks depending on elapsed time
+        steps = 0 if paused else timestep.advance(dt)
+        players = active_players()
+        for _ in range(steps):
+            if not running:
+                break
+            if history is not None:
+                history.track([p for p, _ in players], game_clock.ticks())
+            pending.extend(inputs.tick())
+            for idx, action in pending:
+                if recorder:
+                    recorder.record(tick, idx, action)
+                if not apply_action(players[idx][0], action):
+                    print(f"Player {idx + 1} lost")
+                    running = False
+            pending.clear()
+            if not running:
+                break
+            for idx, (player, _) in enumerate(players):
+                with profiler.phase(f"step_p{idx + 1}"):
+                    ok = player.step()
+                if not ok:
+                    print(f"GAME OVER - Player {idx + 1}")
                     running = False
+            game_clock.advance(TICK_MS)
+            tick += 1
+        if paused:
+            pending.clear()
+
+        if net_loop and steps:
+            with profiler.phase("broadcast"):
+                for encoder, channel in streams:
+                    channel.publish(*encoder.encode(tick))
+                net_loop.call_soon(net_loop.stop)
+                net_loop.run_forever()
+
+        draw(timestep.alpha())
+        inputs.presented()
+        profiler.end_frame()
+
+    if recorder:
+        recorder.finish(tick).save(record_path)
+        print(f"Replay saved to {record_path}")
+    if profile_path:
+        profiler.dump(profile_path)
+        print(f"Frame trace saved to {profile_path}")
+        print("\n".join(profiler.report_lines() + inputs.report_lines()))
+    if session_log:
+        session_log.close()
+        print(f"Telemetry: {session_log.written} records appended to {telemetry_path}")
+    pygame.quit()
+    sys.exit()
+
+def replay_loop(path):
+    """Play a recorded replay back in real time on screen."""
+    global modes
+    replay = Replay.load(path)
+    modes = replay.modes
 
+    def show(players, tick):
+        global player1, player2
+        player1 = players[0]
+        player2 = players[1] if len(players) > 1 else None
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                pygame.quit()
+                sys.exit()
         draw()
 
+    players = play_replay(replay, realtime=True, on_tick=show)
+    for player in players:
+        print(f"{player.side_name}: score {player.score}  lines {player.lines}")
+    pygame.quit()
+    sys.exit()
+
+def tournament_loop(count, replay_paths=()):
+    """Many boards in one window: count CPU players plus every player of the
+    given replays, scaled into a grid."""
+    global screen, renderer, paused, show_profiler
+    runners = [ReplayRunner(Replay.load(path)) for path in replay_paths]
+    for n, runner in enumerate(runners):
+        for i, player in enumerate(runner.players):
+            player.side_name = f"R{n + 1}.{i + 1}"
+    seed = random.randrange(1 << 32)
+    cpus = [TetrisPlayer(modes, side_name=f"CPU {i + 1}", clock=game_clock, seed=seed + i) for i in range(count)]
+    controllers = [CpuController(p, depth=1, budget_ms=TOURNAMENT_CPU_BUDGET_MS / max(count, 1)) for p in cpus]
+    players = [p for runner in runners for p in runner.players] + cpus
+    screen = pygame.display.set_mode(TOURNAMENT_SIZE)
+    renderer = DirtyRenderer(screen)
+    boards = list(zip(players, grid_layout(players, *TOURNAMENT_SIZE)))
+    pending = [[] for _ in cpus]
+    running = True
+    while running:
+        dt = clock.tick(FPS)
+        profiler.begin_frame()
+        with profiler.phase("input"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        running = False
+                    elif event.key == pygame.K_p:
+                        paused = not paused
+                    elif event.key == pygame.K_F3:
+                        show_profiler = not show_profiler
+
+        if not paused:
+            with profiler.phase("cpu"):
+                for idx, controller in enumerate(controllers):
+                    if cpus[idx].game_over_cause is None:
+                        pending[idx].extend(controller.update())
+
+        for _ in range(0 if paused else timestep.advance(dt)):
+            with profiler.phase("step"):
+                for player, actions in zip(cpus, pending):
+                    if player.game_over_cause is None:
+                        if all(apply_action(player, action) for action in actions):
+                            player.step()
+                    actions.clear()
+                for runner in runners:
+                    runner.step()
+            game_clock.advance(TICK_MS)
+
+        draw(timestep.alpha(), boards)
+        profiler.end_frame()
+
+    for player in players:
+        print(f"{player.side_name}: score {player.score}  lines {player.lines}")
+    pygame.quit()
+    sys.exit()
+
+def versus_loop(address):
+    """Online versus: player 1 is you, player 2 mirrors the remote opponent."""
+    global modes, player1, player2, game_clock, show_profiler, muted, inputs
+    host, port = address.rsplit(":", 1)
+    loop = asyncio.new_event_loop()
+    client = VersusClient(host, int(port))
+    print("Waiting for an opponent...")
+    session = loop.run_until_complete(client.connect())
+    modes = dict(session.modes, multiplayer_local=True)  # always show both boards
+    player1, player2 = session.local, session.mirror
+    player1.profiler = player2.profiler = profiler
+    game_clock = player1.clock
+    steps_timer = FixedTimestep(session.tick_ms, MAX_CATCH_UP)
+    inputs = InputQueue(build_dispatch({0: controls_p1}), session.tick_ms)
+    running = True
+    while running and not session.done:
+        dt = clock.tick(FPS)
+        profiler.begin_frame()
+        with profiler.phase("input"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        running = False
+                    elif event.key == pygame.K_m:
+                        muted = not muted
+                    elif event.key == pygame.K_F3:
+                        show_profiler = not show_profiler
+                    else:
+                        inputs.push(event.key, True)
+                elif event.type == pygame.KEYUP:
+                    inputs.push(event.key, False)
+                elif event.type == pygame.WINDOWFOCUSLOST:
+                    inputs.reset()
+
+        # no pause online: the opponent's game keeps running
+        for _ in range(steps_timer.advance(dt)):
+            with profiler.phase("step_p1"):
+                session.tick_local([action for _, action in inputs.tick()])
+        with profiler.phase("step_p2"):
+            session.advance_mirror()
+        with profiler.phase("net"):
+            client.flush()
+            # one non-blocking pass of the asyncio loop: socket reads/writes, timers
+            loop.call_soon(loop.stop)
+            loop.run_forever()
+
+        draw(steps_timer.alpha())
+        inputs.presented()
+        profiler.end_frame()
+
+    print(f"{session.result().upper()} - score {player1.score}  lines {player1.lines}  "
+          f"garbage sent {session.lines_sent} / received {session.lines_received}")
+    print(client.stats.report())
+    loop.run_until_complete(client.close())
+    loop.close()
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main_loop()
+    parser = argparse.ArgumentParser(description="Tetris Hardcore Pack")
+    parser.add_argument("--record", metavar="PATH", help="save a replay of this game")
+    parser.add_argument("--replay", metavar="PATH", nargs="+", help="watch recorded replays (several = tournament view)")
+    parser.add_argument("--profile", metavar="PATH", help="dump a per-frame timing trace (.csv or .json)")
+    parser.add_argument("--cpu", action="store_true", help="let the computer play player 2")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="online versus via a netplay.py server")
+    parser.add_argument("--broadcast", metavar="PORT", type=int, help="stream the boards to spectators")
+    parser.add_argument("--tournament", metavar="N", type=int, default=0, help="N CPU boards in one window")
+    parser.add_argument("--telemetry", metavar="PATH", help="append per-piece stats (see telemetry.py)")
+    args = parser.parse_args()
+    if args.tournament or (args.replay and len(args.replay) > 1):
+        tournament_loop(args.tournament, args.replay or ())
+    elif args.replay:
+        replay_loop(args.replay[0])
+    elif args.connect:
+        versus_loop(args.connect)
+    else:
+        main_loop(args.record, args.profile, args.cpu, args.broadcast, args.telemetry)
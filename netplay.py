@@ -0,0 +1,667 @@
+"""
+Netwerk versus mode: twee spelers op verschillende machines via asyncio.
+
+Er gaan geen borden over de lijn. Elke client simuleert zijn eigen speler en
+stuurt een compacte event stream (inputs per tick, ontvangen garbage en
+aanvallen). De tegenstander wordt lokaal nagespeeld als "mirror" vanuit
+diens seed en events - dezelfde determinisme-truc als replay.py.
+
+Protocol (little endian), frame = u16 payload length + u8 message type:
+    HELLO  c->s  u32 match id (0 = nieuwe match), u8 slot (0xFF = any)
+    START  s->c  u32 match id, u8 slot, u64 seed, u16 tick_ms, u16 modes mask
+    INPUT  c->c  u32 ack, u32 since, u32 upto, u8 flags,
+                 then varint tick delta + u8 code per event
+    PING / PONG  u32 timestamp (ms), PONG echoes the peer's PING
+    BYE          no payload
+
+INPUT is redundant: every message carries all events the peer has not
+acked yet, so a lost message is healed by the next one and a reconnect only
+has to resend what is still unacked. The server is a dumb relay that pairs
+two clients and forwards INPUT / PING / PONG.
+
+Run:
+    python netplay.py server --port 7777
+    python netplay.py client HOST 7777
+    python netplay.py loopback --latency 60 --jitter 20 --loss 0.1
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import struct
+import time
+
+from batch import load_policy
+from codec import read_varint, write_varint
+from engine import ACTIONS, DEFAULT_MODES, ManualClock, TetrisPlayer, add_garbage_line, apply_action
+from headless import random_policy
+from replay import MODE_ORDER, TICK_MS
+
+FRAME = struct.Struct("<HB")
+HELLO = struct.Struct("<IB")
+START = struct.Struct("<IBQHH")
+INPUT = struct.Struct("<IIIB")
+STAMP = struct.Struct("<I")
+
+MSG_HELLO, MSG_START, MSG_INPUT, MSG_PING, MSG_PONG, MSG_BYE = range(1, 7)
+ANY_SLOT = 0xFF
+FLAG_FINAL = 0x01  # sender stopped ticking: upto is its last tick
+
+# event codes: ACTIONS index, or a garbage / attack count in the low nibble
+GARBAGE_IN = 0x20  # garbage lines applied to the sender's own board
+ATTACK = 0x40  # lines sent to the opponent
+ATTACK_TABLE = {2: 1, 3: 2, 4: 4}  # lines cleared in one tick -> garbage sent
+
+INPUT_DELAY = 3  # ticks of cushion the mirror keeps behind the newest input
+MIRROR_CATCH_UP = 4  # max mirror ticks per local tick after a stall
+PING_INTERVAL_MS = 250
+RECONNECT_TRIES = 8
+RECONNECT_BACKOFF_MS = 100
+
+
+def modes_to_mask(modes):
+    mask = 0
+    for i, name in enumerate(MODE_ORDER):
+        if modes.get(name):
+            mask |= 1 << i
+    return mask
+
+
+def mask_to_modes(mask):
+    return {name: bool(mask >> i & 1) for i, name in enumerate(MODE_ORDER)}
+
+
+def _stamp():
+    return int(time.perf_counter() * 1000) & 0xFFFFFFFF
+
+
+# ===========================
+# LINK + STATS
+# ===========================
+class LinkSim:
+    """Simulated network conditions for outgoing frames.
+
+    latency_ms is one-way; jitter adds a uniform 0..jitter_ms on top (so
+    frames can overtake each other). Only game traffic (INPUT / PING / PONG)
+    is dropped with probability loss; HELLO / START / BYE are delayed but
+    always arrive, like a reliable control channel.
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, loss=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.dropped = 0
+
+    def delay(self):
+        """Seconds to hold a frame before it is written."""
+        return (self.latency_ms + self.rng.uniform(0, self.jitter_ms)) / 1000
+
+    def drops(self, kind):
+        if kind in (MSG_INPUT, MSG_PING, MSG_PONG) and self.loss and self.rng.random() < self.loss:
+            self.dropped += 1
+            return True
+        return False
+
+
+class NetStats:
+    """Byte / message counters and round-trip times for one endpoint."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.sent = 0
+        self.received = 0
+        self.rtts = []
+
+    def rtt(self, sent_stamp):
+        self.rtts.append((_stamp() - sent_stamp) & 0xFFFFFFFF)
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        rtts = sorted(self.rtts)
+        return {
+            "seconds": round(elapsed, 2),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "out_bytes_per_s": round(self.bytes_sent / elapsed, 1),
+            "in_bytes_per_s": round(self.bytes_received / elapsed, 1),
+            "messages_sent": self.sent,
+            "messages_received": self.received,
+            "rtt_samples": len(rtts),
+            "rtt_avg_ms": round(sum(rtts) / len(rtts), 1) if rtts else None,
+            "rtt_p50_ms": rtts[len(rtts) // 2] if rtts else None,
+            "rtt_max_ms": rtts[-1] if rtts else None,
+        }
+
+
+class Connection:
+    """Framed messages over an asyncio stream pair, optionally through a LinkSim."""
+
+    def __init__(self, reader, writer, stats=None, link=None):
+        self.reader = reader
+        self.writer = writer
+        self.stats = stats if stats is not None else NetStats()
+        self.link = link
+
+    @property
+    def closed(self):
+        return self.writer.is_closing()
+
+    def send(self, kind, payload=b""):
+        frame = FRAME.pack(len(payload), kind) + payload
+        self.stats.sent += 1
+        self.stats.bytes_sent += len(frame)
+        if self.link is None:
+            self._write(frame)
+        elif not self.link.drops(kind):
+            asyncio.get_running_loop().call_later(self.link.delay(), self._write, frame)
+
+    def _write(self, frame):
+        if not self.writer.is_closing():
+            self.writer.write(frame)
+
+    async def recv(self):
+        """(kind, payload); raises ConnectionError when the peer is gone."""
+        try:
+            head = await self.reader.readexactly(FRAME.size)
+            size, kind = FRAME.unpack(head)
+            payload = await self.reader.readexactly(size) if size else b""
+        except (asyncio.IncompleteReadError, OSError) as exc:
+            raise ConnectionError("connection lost") from exc
+        self.stats.received += 1
+        self.stats.bytes_received += FRAME.size + size
+        return kind, payload
+
+    def close(self):
+        if not self.writer.is_closing():
+            self.writer.close()
+
+
+# ===========================
+# SESSION (sync, geen sockets)
+# ===========================
+class VersusSession:
+    """One side of a versus match: the local player plus a mirror of the opponent.
+
+    tick_local() runs one local logic tick and records its events; on_input()
+    takes the opponent's stream; advance_mirror() replays it with a small
+    jitter buffer (delay ticks behind the newest complete tick).
+    """
+
+    def __init__(self, slot, seed, modes, tick_ms=TICK_MS, delay=INPUT_DELAY, clock=None, max_ticks=None):
+        self.slot = slot
+        self.seed = seed
+        self.modes = modes
+        self.tick_ms = tick_ms
+        self.delay = delay
+        self.max_ticks = max_ticks
+        self.local = TetrisPlayer(modes, side_name="YOU", clock=clock or ManualClock(), seed=seed + slot)
+        self.mirror = TetrisPlayer(modes, side_name="OPPONENT", clock=ManualClock(), seed=seed + 1 - slot)
+        self.tick = 0  # local ticks completed
+        self.events = []  # own (tick, code) the peer has not acked yet
+        self.acked = 0  # peer holds our ticks < acked
+        self.remote = {}  # tick -> [codes] not simulated yet
+        self.remote_upto = 0  # opponent ticks < remote_upto are complete
+        self.remote_final = False
+        self.mirror_tick = 0
+        self.incoming = 0  # garbage lines waiting for the local player
+        self.lines_sent = 0
+        self.lines_received = 0
+        self.stopped = False  # local side stopped ticking
+        self.local_over_at = None  # tick on which each side topped out
+        self.mirror_over_at = None
+
+    # --- local side ---
+    def tick_local(self, actions):
+        """Run one local tick with the given actions; False once stopped."""
+        if self.stopped:
+            return False
+        player = self.local
+        t = self.tick
+        codes = []
+        while self.incoming:
+            n = min(self.incoming, 15)
+            self.incoming -= n
+            for _ in range(n):
+                add_garbage_line(player.board, player.rng)
+            player.recheck_rows = True
+            player.telemetry.garbage(player, n)
+            codes.append(GARBAGE_IN | n)
+        lines = player.lines
+        alive = True
+        for action in actions:
+            codes.append(ACTIONS.index(action))
+            if not apply_action(player, action):
+                alive = False
+                break
+        if alive:
+            alive = player.step()
+        attack = ATTACK_TABLE.get(min(player.lines - lines, 4), 0)
+        if attack:
+            codes.append(ATTACK | attack)
+            self.lines_sent += attack
+        self.events.extend((t, code) for code in codes)
+        player.clock.advance(self.tick_ms)
+        self.tick += 1
+        if not alive:
+            self.local_over_at = t
+        if not alive or self.mirror.game_over_cause or self.tick == self.max_ticks:
+            self.stopped = True
+        return not self.stopped
+
+    def input_message(self):
+        out = bytearray(INPUT.pack(self.remote_upto, self.acked, self.tick, FLAG_FINAL if self.stopped else 0))
+        last = self.acked
+        for tick, code in self.events:
+            write_varint(out, tick - last)
+            out.append(code)
+            last = tick
+        return bytes(out)
+
+    # --- remote side ---
+    def on_input(self, payload):
+        ack, since, upto, flags = INPUT.unpack_from(payload)
+        if ack > self.acked:
+            self.acked = ack
+            self.events = [e for e in self.events if e[0] >= ack]
+        if since > self.remote_upto or upto < self.remote_upto:
+            return  # gap or stale (reordered) message: a later one covers it
+        pos = INPUT.size
+        tick = since
+        while pos < len(payload):
+            delta, pos = read_varint(payload, pos)
+            tick += delta
+            code = payload[pos]
+            pos += 1
+            if tick < self.remote_upto:
+                continue  # already have it
+            self.remote.setdefault(tick, []).append(code)
+            if code & ATTACK:
+                self.incoming += code & 0x0F
+                self.lines_received += code & 0x0F
+        self.remote_upto = upto
+        self.remote_final = self.remote_final or bool(flags & FLAG_FINAL)
+
+    def advance_mirror(self):
+        """Replay complete opponent ticks; returns how many were simulated."""
+        target = self.remote_upto if self.remote_final else self.remote_upto - self.delay
+        steps = 0
+        mirror = self.mirror
+        while self.mirror_tick < target and steps < MIRROR_CATCH_UP and mirror.game_over_cause is None:
+            alive = True
+            for code in self.remote.pop(self.mirror_tick, ()):
+                if code & GARBAGE_IN:
+                    for _ in range(code & 0x0F):
+                        add_garbage_line(mirror.board, mirror.rng)
+                    mirror.recheck_rows = True
+                elif code & ATTACK:
+                    continue
+                elif alive and not apply_action(mirror, ACTIONS[code]):
+                    alive = False
+            if alive:
+                alive = mirror.step()
+            if not alive:
+                self.mirror_over_at = self.mirror_tick
+            mirror.clock.advance(self.tick_ms)
+            self.mirror_tick += 1
+            steps += 1
+        if mirror.game_over_cause:
+            self.stopped = True
+        return steps
+
+    @property
+    def done(self):
+        """Both streams are complete and delivered."""
+        return (self.stopped and self.acked >= self.tick and self.remote_final
+                and (self.mirror_tick >= self.remote_upto or self.mirror.game_over_cause is not None))
+
+    def result(self):
+        """"won" / "lost" by who topped out first, else "draw"."""
+        mine, theirs = self.local_over_at, self.mirror_over_at
+        if mine is not None and (theirs is None or mine < theirs):
+            return "lost"
+        if theirs is not None and (mine is None or theirs < mine):
+            return "won"
+        return "draw"
+
+
+# ===========================
+# CLIENT
+# ===========================
+class VersusClient:
+    """Connects to a VersusServer, keeps the link alive and reconnects on loss."""
+
+    def __init__(self, host, port, link=None, match_id=0, delay=INPUT_DELAY, max_ticks=None, clock=None):
+        self.host = host
+        self.port = port
+        self.link = link
+        self.match_id = match_id
+        self.delay = delay
+        self.max_ticks = max_ticks
+        self.clock = clock
+        self.stats = NetStats()
+        self.conn = None
+        self.session = None
+        self.reconnects = 0
+        self._reader_task = None
+        self._reconnecting = None
+        self._started = None
+        self._closing = False
+        self._last_ping = 0
+
+    async def connect(self):
+        """Join (or re-join) the match; returns the session once START arrived."""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        self.conn = Connection(reader, writer, self.stats, self.link)
+        slot = self.session.slot if self.session else ANY_SLOT
+        self.conn.send(MSG_HELLO, HELLO.pack(self.match_id, slot))
+        self._started = asyncio.get_running_loop().create_future()
+        self._reader_task = asyncio.create_task(self._read(self.conn))
+        await self._started
+        return self.session
+
+    async def _read(self, conn):
+        try:
+            while True:
+                kind, payload = await conn.recv()
+                if kind == MSG_START:
+                    self._on_start(payload)
+                elif kind == MSG_INPUT and self.session:
+                    self.session.on_input(payload)
+                elif kind == MSG_PING:
+                    conn.send(MSG_PONG, payload)
+                elif kind == MSG_PONG:
+                    self.stats.rtt(STAMP.unpack(payload)[0])
+                elif kind == MSG_BYE:
+                    break
+        except ConnectionError:
+            pass
+        conn.close()
+        if self._started and not self._started.done():
+            self._started.set_exception(ConnectionError("server closed before the match started"))
+        elif self.session and not self._closing and self._reconnecting is None:
+            self._reconnecting = asyncio.create_task(self._reconnect())
+
+    def _on_start(self, payload):
+        match_id, slot, seed, tick_ms, mask = START.unpack(payload)
+        self.match_id = match_id
+        if self.session is None:
+            self.session = VersusSession(slot, seed, mask_to_modes(mask), tick_ms, self.delay,
+                                         clock=self.clock, max_ticks=self.max_ticks)
+        if not self._started.done():
+            self._started.set_result(self.session)
+
+    async def _reconnect(self):
+        delay = RECONNECT_BACKOFF_MS / 1000
+        try:
+            for _ in range(RECONNECT_TRIES):
+                await asyncio.sleep(delay)
+                try:
+                    await self.connect()
+                except OSError:
+                    delay *= 2
+                    continue
+                self.reconnects += 1
+                return
+        finally:
+            self._reconnecting = None
+
+    def drop_connection(self):
+        """Cut the current link (for testing the reconnect path)."""
+        if self.conn:
+            self.conn.writer.transport.abort()
+
+    def flush(self):
+        """Send the unacked event stream (and a ping now and then)."""
+        conn = self.conn
+        if conn is None or conn.closed or self.session is None:
+            return
+        conn.send(MSG_INPUT, self.session.input_message())
+        now = _stamp()
+        if (now - self._last_ping) & 0xFFFFFFFF >= PING_INTERVAL_MS:
+            self._last_ping = now
+            conn.send(MSG_PING, STAMP.pack(now))
+
+    async def play(self, policy=random_policy, rng=None, timeout=10.0):
+        """Play the match headless at the session's tick rate; returns the session."""
+        session = self.session
+        rng = rng if rng is not None else random.Random(~session.seed - session.slot)
+        loop = asyncio.get_running_loop()
+        tick_s = session.tick_ms / 1000
+        next_tick = loop.time()
+        while not session.stopped:
+            session.tick_local(policy(session.local, rng))
+            session.advance_mirror()
+            self.flush()
+            next_tick += tick_s
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+        # keep talking until both streams are delivered
+        deadline = loop.time() + timeout
+        while not session.done and loop.time() < deadline:
+            session.advance_mirror()
+            self.flush()
+            await asyncio.sleep(tick_s)
+        await self.close()
+        return session
+
+    async def close(self):
+        self._closing = True
+        if self._reconnecting:
+            self._reconnecting.cancel()
+        if self.conn and not self.conn.closed:
+            self.conn.send(MSG_BYE)
+            await asyncio.sleep((self.link.latency_ms + self.link.jitter_ms) / 1000 if self.link else 0)
+            self.conn.close()
+        if self._reader_task:
+            self._reader_task.cancel()
+
+
+# ===========================
+# SERVER
+# ===========================
+class _Match:
+    def __init__(self, match_id, seed):
+        self.match_id = match_id
+        self.seed = seed
+        self.conns = [None, None]
+        self.finished = set()  # slots that said BYE
+
+    def free_slot(self):
+        for slot, conn in enumerate(self.conns):
+            if conn is None:
+                return slot
+        return None
+
+
+class VersusServer:
+    """Relay that pairs clients into matches and forwards their streams."""
+
+    def __init__(self, modes=None, tick_ms=TICK_MS, seed=None, link=None):
+        self.modes = modes if modes is not None else dict(DEFAULT_MODES)
+        self.tick_ms = tick_ms
+        self.rng = random.Random(seed)
+        self.link = link
+        self.stats = NetStats()
+        self.matches = {}
+        self._match_ids = itertools.count(1)  # never reused, finished matches leave gaps
+        self.waiting = None  # match id still looking for a second player
+        self.server = None
+        self.port = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self._handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def _send_start(self, match, slot):
+        match.conns[slot].send(MSG_START, START.pack(match.match_id, slot, match.seed, self.tick_ms,
+                                                     modes_to_mask(self.modes)))
+
+    def _join(self, conn, match_id, slot):
+        if match_id == 0:
+            if self.waiting is None:
+                match_id = next(self._match_ids)
+                self.matches[match_id] = _Match(match_id, self.rng.randrange(1 << 32))
+                self.waiting = match_id
+            match_id = self.waiting
+        match = self.matches.get(match_id)
+        if match is None:
+            return None, None
+        if slot == ANY_SLOT:
+            slot = match.free_slot()
+            if slot is None:
+                return None, None
+        elif match.conns[slot] is not None:
+            match.conns[slot].close()  # rejoin beat the server to noticing the old link died
+        match.conns[slot] = conn
+        if match.free_slot() is None:
+            if self.waiting == match_id:
+                self.waiting = None
+                for s in (0, 1):
+                    self._send_start(match, s)
+            else:
+                self._send_start(match, slot)  # reconnect
+        return match, slot
+
+    async def _handle(self, reader, writer):
+        conn = Connection(reader, writer, self.stats, self.link)
+        match = slot = None
+        try:
+            kind, payload = await conn.recv()
+            if kind != MSG_HELLO:
+                return
+            match, slot = self._join(conn, *HELLO.unpack(payload))
+            if match is None:
+                return
+            while True:
+                kind, payload = await conn.recv()
+                if kind == MSG_BYE:
+                    match.finished.add(slot)
+                    if len(match.finished) == 2:
+                        self._drop_match(match)
+                    break
+                peer = match.conns[1 - slot]
+                if kind in (MSG_INPUT, MSG_PING, MSG_PONG) and peer is not None and not peer.closed:
+                    peer.send(kind, payload)
+        except ConnectionError:
+            pass
+        finally:
+            if match is not None and match.conns[slot] is conn:
+                match.conns[slot] = None
+                if match.conns == [None, None]:
+                    # both links gone without BYE: refuse rejoins rather than leak the match
+                    self._drop_match(match)
+            conn.close()
+
+    def _drop_match(self, match):
+        self.matches.pop(match.match_id, None)
+        if self.waiting == match.match_id:
+            self.waiting = None
+
+
+# ===========================
+# LOOPBACK TEST
+# ===========================
+async def loopback(latency_ms=0, jitter_ms=0, loss=0.0, max_ticks=1200, tick_ms=5, drop_at=None, seed=1,
+                   policy=random_policy):
+    """Server + two clients in one event loop over 127.0.0.1.
+
+    The link conditions apply to what each client sends, so a message to the
+    peer takes latency_ms (+ jitter) one way and the RTT is about twice that.
+    Returns (clients, server) with clients ordered by slot. drop_at cuts
+    slot 0's connection at that tick to exercise reconnecting.
+    """
+    def link(n):
+        return LinkSim(latency_ms, jitter_ms, loss, seed=seed * 10 + n) if (latency_ms or jitter_ms or loss) else None
+
+    server = await VersusServer(tick_ms=tick_ms, seed=seed).start()
+    clients = [VersusClient("127.0.0.1", server.port, link=link(n), max_ticks=max_ticks) for n in range(2)]
+    await asyncio.gather(*(c.connect() for c in clients))
+    clients.sort(key=lambda c: c.session.slot)
+
+    async def cut():
+        session = clients[0].session
+        while session.tick < drop_at and not session.stopped:
+            await asyncio.sleep(tick_ms / 1000)
+        clients[0].drop_connection()
+
+    tasks = [c.play(policy) for c in clients]
+    if drop_at is not None:
+        tasks.append(cut())
+    await asyncio.gather(*tasks)
+    await server.close()
+    return clients, server
+
+
+def _state(player):
+    return (player.score, player.lines, player.pieces, player.game_over_cause, tuple(player.board.masks))
+
+
+def in_sync(clients):
+    """Does every mirror match the other side's real player?"""
+    a, b = (c.session for c in clients)
+    return _state(a.mirror) == _state(b.local) and _state(b.mirror) == _state(a.local)
+
+
+async def _run_client(host, port, policy):
+    client = VersusClient(host, port)
+    session = await client.connect()
+    print(f"match {client.match_id}, slot {session.slot}")
+    await client.play(policy)
+    print(f"{session.result()}: score {session.local.score}  lines {session.local.lines}")
+    print(client.stats.report())
+
+
+async def _run_server(host, port):
+    server = await VersusServer().start(host, port)
+    print(f"listening on {host}:{server.port}")
+    await server.server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Networked versus mode.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("server")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=7777)
+    p = sub.add_parser("client", help="headless client with a random policy")
+    p.add_argument("host")
+    p.add_argument("port", type=int)
+    p.add_argument("--policy", default="headless:random_policy", help="module:function")
+    p = sub.add_parser("loopback", help="server + two clients on 127.0.0.1")
+    p.add_argument("--latency", type=int, default=0, help="one-way delay in ms")
+    p.add_argument("--jitter", type=int, default=0, help="extra random delay in ms")
+    p.add_argument("--loss", type=float, default=0.0, help="drop rate for game traffic")
+    p.add_argument("--ticks", type=int, default=1200)
+    p.add_argument("--tick-ms", type=int, default=5)
+    p.add_argument("--drop-at", type=int, help="cut client 0's link at this tick")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--policy", default="headless:random_policy", help="module:function")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "server":
+        asyncio.run(_run_server(args.host, args.port))
+    elif args.cmd == "client":
+        asyncio.run(_run_client(args.host, args.port, load_policy(args.policy)))
+    else:
+        clients, server = asyncio.run(loopback(args.latency, args.jitter, args.loss, args.ticks, args.tick_ms,
+                                               args.drop_at, args.seed, load_policy(args.policy)))
+        for client in clients:
+            session = client.session
+            print(f"slot {session.slot}: {session.result()}  ticks {session.tick}  score {session.local.score}  "
+                  f"garbage sent {session.lines_sent} / received {session.lines_received}  "
+                  f"reconnects {client.reconnects}")
+            print("  ", client.stats.report())
+        print("mirrors in sync" if in_sync(clients) else "MIRRORS DIVERGED")
+
+
+if __name__ == "__main__":
+    main()
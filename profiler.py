@@ -0,0 +1,149 @@
+"""
+Frame-time profiler: per-phase timings met rolling percentielen.
+
+Elke frame wordt opgedeeld in phases (input, step per speler, lock, line
+clear, draw stages, ...). Per phase houden we een rolling window bij voor
+p50/p95/p99 en optioneel een trace per frame die bij afsluiten als CSV of
+JSON wordt weggeschreven. Geen pygame nodig, dus ook bruikbaar headless.
+"""
+
+import csv
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+
+WINDOW = 600  # frames in the rolling percentile window (10s at 60 FPS)
+TRACE_LIMIT = 60 * 60 * 30  # frames kept for the trace dump (30 min at 60 FPS)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "t0")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.t0 = 0.0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, (time.perf_counter() - self.t0) * 1000.0)
+        return False
+
+
+class FrameProfiler:
+    """Collects per-phase milliseconds per frame.
+
+    Usage:
+        profiler.begin_frame()
+        with profiler.phase("input"): ...
+        profiler.end_frame()
+
+    Phases may nest (e.g. "lock" inside "step_p1"); repeated phases within one
+    frame are summed.
+    """
+
+    def __init__(self, window=WINDOW, trace=False, trace_limit=TRACE_LIMIT):
+        self.window = window
+        self.samples = {}  # phase -> deque of ms
+        self.trace = deque(maxlen=trace_limit) if trace else None
+        self.frames = 0
+        self._phases = {}
+        self._current = {}
+        self._frame_t0 = None
+
+    def enable_trace(self, trace_limit=TRACE_LIMIT):
+        if self.trace is None:
+            self.trace = deque(maxlen=trace_limit)
+
+    def phase(self, name):
+        ctx = self._phases.get(name)
+        if ctx is None:
+            ctx = self._phases[name] = _Phase(self, name)
+        return ctx
+
+    def add(self, name, ms):
+        self._current[name] = self._current.get(name, 0.0) + ms
+
+    def begin_frame(self):
+        self._current = {}
+        self._frame_t0 = time.perf_counter()
+
+    def end_frame(self):
+        if self._frame_t0 is None:
+            return
+        current = self._current
+        current["frame"] = (time.perf_counter() - self._frame_t0) * 1000.0
+        for name, ms in current.items():
+            window = self.samples.get(name)
+            if window is None:
+                window = self.samples[name] = deque(maxlen=self.window)
+            window.append(ms)
+        if self.trace is not None:
+            self.trace.append(current)
+        self.frames += 1
+        self._frame_t0 = None
+
+    def stats(self):
+        """{phase: {"p50", "p95", "p99", "max"}} over the rolling window."""
+        result = {}
+        for name, window in self.samples.items():
+            values = sorted(window)
+            result[name] = {
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": values[-1],
+            }
+        return result
+
+    def report_lines(self):
+        """Text lines for an overlay or log, slowest p95 first."""
+        stats = self.stats()
+        lines = ["phase        p50    p95    p99 (ms)"]
+        for name, s in sorted(stats.items(), key=lambda kv: -kv[1]["p95"]):
+            lines.append(f"{name:<10} {s['p50']:6.2f} {s['p95']:6.2f} {s['p99']:6.2f}")
+        return lines
+
+    def dump(self, path):
+        """Write the frame trace to path (.json, anything else -> CSV)."""
+        frames = list(self.trace or ())
+        phases = sorted({name for frame in frames for name in frame})
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump({"phases": phases, "summary": self.stats(), "frames": frames}, f)
+            return
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame_index"] + phases)
+            for idx, frame in enumerate(frames):
+                writer.writerow([idx] + [f"{frame.get(name, 0.0):.4f}" for name in phases])
+
+
+class NullProfiler:
+    """Stand-in with the same phase() API that records nothing."""
+
+    _null = nullcontext()
+
+    def phase(self, name):
+        return self._null
+
+    def begin_frame(self):
+        pass
+
+    def end_frame(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,203 @@
+"""
+Replays: compact binary opname van input events per engine tick.
+
+Omdat elke speler een eigen seeded RNG heeft en de engine op een ManualClock
+draait, is (seeds, modes, tick_ms, bordmaat, inputs) genoeg om een game
+exact opnieuw af te spelen - headless op volle snelheid of in real time.
+tick_ms is een breuk (teller / noemer), want 60 Hz is 1000/60 ms per tick.
+
+Formaat (little endian):
+    header   "TRPL", u8 version, u16 tick_ms numerator, u16 tick_ms denominator,
+             u8 cols, u8 rows, u16 modes bitmask, u8 players
+    seeds    u64 per player
+    events   varint tick delta + u8 code (player << 4 | action index)
+    end      varint delta to the last tick + u8 0xFF
+
+Run: python replay.py game.trpl [--realtime]
+"""
+
+import argparse
+import struct
+import time
+from fractions import Fraction
+
+from codec import read_varint, write_varint
+from engine import ACTIONS, COLS, DEFAULT_MODES, ROWS, ManualClock, TetrisPlayer, apply_action
+
+MAGIC = b"TRPL"
+# 2: events from the player RNG, 3: level gravity + lock delay, 4: piece queue, 5: fractional tick_ms,
+# 6: board size
+VERSION = 6
+HEADER = struct.Struct("<4sBHHBBHB")
+SEED = struct.Struct("<Q")
+END_CODE = 0xFF
+MODE_ORDER = tuple(DEFAULT_MODES)  # bit i of the modes mask = MODE_ORDER[i]
+TICK_MS = 1000 // 60
+
+
+class Replay:
+    """Seeds, modes, board size and the (tick, player index, action) input log of one game."""
+
+    def __init__(self, seeds, modes, tick_ms=TICK_MS, events=None, total_ticks=0, cols=COLS, rows=ROWS):
+        self.seeds = list(seeds)
+        self.modes = dict(modes)
+        self.tick_ms = tick_ms
+        self.cols = cols
+        self.rows = rows
+        self.events = events if events is not None else []
+        self.total_ticks = total_ticks
+
+    def to_bytes(self):
+        mask = 0
+        for i, name in enumerate(MODE_ORDER):
+            if self.modes.get(name):
+                mask |= 1 << i
+        tick = Fraction(self.tick_ms)
+        out = bytearray(HEADER.pack(MAGIC, VERSION, tick.numerator, tick.denominator, self.cols, self.rows,
+                                    mask, len(self.seeds)))
+        for seed in self.seeds:
+            out += SEED.pack(seed)
+        last = 0
+        for tick, player_index, action in self.events:
+            write_varint(out, tick - last)
+            out.append(player_index << 4 | ACTIONS.index(action))
+            last = tick
+        write_varint(out, self.total_ticks - last)
+        out.append(END_CODE)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, tick_num, tick_den, cols, rows, mask, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a replay file (or unsupported version)")
+        tick_ms = tick_num if tick_den == 1 else Fraction(tick_num, tick_den)
+        pos = HEADER.size
+        seeds = []
+        for _ in range(count):
+            seeds.append(SEED.unpack_from(data, pos)[0])
+            pos += SEED.size
+        modes = {name: bool(mask >> i & 1) for i, name in enumerate(MODE_ORDER)}
+        events = []
+        tick = 0
+        while True:
+            delta, pos = read_varint(data, pos)
+            tick += delta
+            code = data[pos]
+            pos += 1
+            if code == END_CODE:
+                return cls(seeds, modes, tick_ms, events, tick, cols, rows)
+            events.append((tick, code >> 4, ACTIONS[code & 0x0F]))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayRecorder:
+    """Collects input events while a game runs; finish() returns the Replay."""
+
+    def __init__(self, seeds, modes, tick_ms=TICK_MS, cols=COLS, rows=ROWS):
+        self.replay = Replay(seeds, modes, tick_ms, cols=cols, rows=rows)
+
+    def record(self, tick, player_index, action):
+        self.replay.events.append((tick, player_index, action))
+
+    def finish(self, total_ticks):
+        self.replay.total_ticks = total_ticks
+        return self.replay
+
+
+class ReplayRunner:
+    """Steps a replay one tick at a time (for drivers that own the loop).
+
+    Per tick: recorded inputs first, then every player steps, then the clock
+    advances - the same order the live loop and headless runner use. Inputs
+    stamped with total_ticks are applied without a step.
+    """
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.clock = ManualClock()
+        self.players = [TetrisPlayer(replay.modes, side_name=f"PLAYER {i + 1}", clock=self.clock, seed=seed,
+                                     cols=replay.cols, rows=replay.rows)
+                        for i, seed in enumerate(replay.seeds)]
+        self.tick = 0
+        self.finished = False
+        self._idx = 0
+
+    def step(self):
+        """Run the next tick; returns False once the replay is over."""
+        if self.finished:
+            return False
+        replay = self.replay
+        events = replay.events
+        tick = self.tick
+        alive = True
+        while self._idx < len(events) and events[self._idx][0] == tick:
+            _, player_index, action = events[self._idx]
+            self._idx += 1
+            if not apply_action(self.players[player_index], action):
+                alive = False
+        # inputs can land on the tick the game ended, which never stepped
+        if tick == replay.total_ticks:
+            self.finished = True
+            return False
+        if alive:
+            for player in self.players:
+                if not player.step():
+                    alive = False
+        self.clock.advance(replay.tick_ms)
+        self.tick += 1
+        if not alive:
+            self.finished = True
+        return not self.finished
+
+
+def play_replay(replay, realtime=False, on_tick=None):
+    """Re-run a replay; returns the players in their final state.
+
+    With realtime=True each tick is paced to tick_ms of wall time.
+    on_tick(players, tick) is called after every tick (e.g. to render).
+    """
+    runner = ReplayRunner(replay)
+    start = time.perf_counter()
+    while True:
+        tick = runner.tick
+        more = runner.step()
+        if runner.tick == tick:
+            break  # trailing inputs only, no tick ran
+        if on_tick is not None:
+            on_tick(runner.players, tick)
+        if not more:
+            break
+        if realtime:
+            delay = start + (tick + 1) * replay.tick_ms / 1000.0 - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    return runner.players
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play back a recorded Tetris replay.")
+    parser.add_argument("path")
+    parser.add_argument("--realtime", action="store_true", help="pace ticks to wall time")
+    args = parser.parse_args(argv)
+
+    replay = Replay.load(args.path)
+    start = time.perf_counter()
+    players = play_replay(replay, realtime=args.realtime)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    for player in players:
+        print(f"{player.side_name}: score {player.score}  lines {player.lines}  pieces {player.pieces}")
+    print(f"ticks: {replay.total_ticks}  events: {len(replay.events)}  "
+          f"time: {elapsed:.3f}s  ticks/s: {replay.total_ticks / elapsed:.0f}")
+
+
+if __name__ == "__main__":
+    main()
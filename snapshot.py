@@ -0,0 +1,251 @@
+"""
+Snapshots: de volledige game state van een of meer spelers als bytes.
+
+Waar een replay de game opnieuw afspeelt vanaf de seeds, legt een snapshot
+de state zelf vast: bord, pieces, score, timers, event queue en de RNG
+state, zodat een geladen game exact verder loopt zoals het origineel zou
+doen. Tijden worden relatief aan het moment van opslaan bewaard en bij het
+laden op de nieuwe clock gezet, dus een quick save overleeft een herstart.
+
+Voor in-memory forks (undo, AI rollouts) is TetrisPlayer.clone() sneller;
+dit formaat is voor opslaan en versturen.
+
+Formaat (little endian):
+    header   "TSNP", u8 version, u8 players
+    player   u8 cols, u8 rows, u16 modes bitmask, u8 flags, u8 status
+             [u64 seed], u8 name length + utf-8 name
+             varint score, lines, level, pieces, gravity, gravity_acc,
+                    lock_delay, lock_resets, shrink left / right
+             i32 last_drop_time, start_time, [lock_started] (ms relative to the save)
+             u8 blast radius, u8 blast flags
+             piece current, [hold]
+             queue    u64 piece seed, varint index (the preview is regenerated)
+             rows     per row: varint mask + 4 bit colors of the set cells (bit 3 = bomb)
+             events   varint count, per event i32 time + u8 kind
+             rng      625 x u32 Mersenne Twister state + f64 gauss_next (NaN = none)
+
+Run: python snapshot.py quicksave.tsnp [--ticks 600]
+"""
+
+import argparse
+import math
+import random
+import struct
+
+from codec import STATUS_CODES, STATUS_NAMES, decode_row, encode_row, read_varint, write_varint
+from engine import BlastResolver, Board, EventScheduler, ManualClock, Piece, PieceQueue, TetrisPlayer
+from headless import TICK_MS
+from profiler import NULL_PROFILER
+from replay import MODE_ORDER
+from telemetry import NULL_TELEMETRY
+
+MAGIC = b"TSNP"
+VERSION = 3  # 2: gravity and lock delay state, 3: piece queue instead of next piece
+HEADER = struct.Struct("<4sBB")
+PLAYER = struct.Struct("<BBHBB")
+SEED = struct.Struct("<Q")
+TIMES = struct.Struct("<ii")
+LOCK = struct.Struct("<i")
+BLAST = struct.Struct("<BB")
+PIECE = struct.Struct("<BbbiiB")  # code | rotation << 4, x, y, spawn, visible_until, hold_used
+EVENT = struct.Struct("<iB")
+RNG = struct.Struct("<625Id")
+
+F_SEED = 1
+F_HOLD = 2
+F_RECHECK = 4
+F_LOCK = 8
+B_CHAIN = 1
+B_GRAVITY = 2
+B_FUSE = 4
+EVENT_KINDS = ("swap", "garbage_window", "garbage", "shrink")
+STATS = ("score", "lines", "level", "pieces", "gravity", "gravity_acc", "lock_delay", "lock_resets",
+         "shrink_left", "shrink_right")
+
+
+def _pack_piece(out, piece, now):
+    code = piece.base_id | piece.is_bomb << 3 | piece.rotation << 4
+    out += PIECE.pack(code, piece.x, piece.y, piece.spawn_time - now,
+                      piece.visible_until - now, piece.hold_used)
+
+
+def _unpack_piece(data, pos, cols, now):
+    code, x, y, spawn, visible, hold_used = PIECE.unpack_from(data, pos)
+    piece = Piece(code & 7, is_bomb=bool(code & 8), spawn_time=now + spawn, cols=cols)
+    piece.rotation = code >> 4
+    piece.info = piece.rotations[piece.rotation]
+    piece.x, piece.y = x, y
+    piece.visible_until = now + visible
+    piece.hold_used = bool(hold_used)
+    return piece, pos + PIECE.size
+
+
+def dumps(players, now=None):
+    """Snapshot bytes of the players; times are stored relative to now
+    (default: the first player's clock)."""
+    if now is None:
+        now = players[0].clock.ticks()
+    out = bytearray(HEADER.pack(MAGIC, VERSION, len(players)))
+    for p in players:
+        board = p.board
+        mask = 0
+        for i, name in enumerate(MODE_ORDER):
+            if p.modes.get(name):
+                mask |= 1 << i
+        flags = ((F_SEED if p.seed is not None else 0) | (F_HOLD if p.hold_piece else 0)
+                 | (F_RECHECK if p.recheck_rows else 0) | (F_LOCK if p.lock_started is not None else 0))
+        out += PLAYER.pack(board.cols, board.rows, mask, flags, STATUS_CODES[p.game_over_cause])
+        if p.seed is not None:
+            out += SEED.pack(p.seed)
+        name = p.side_name.encode("utf-8")[:255]
+        out.append(len(name))
+        out += name
+        for stat in STATS:
+            write_varint(out, getattr(p, stat))
+        out += TIMES.pack(p.last_drop_time - now, p.start_time - now)
+        if p.lock_started is not None:
+            out += LOCK.pack(p.lock_started - now)
+        blast = p.blast
+        out += BLAST.pack(blast.radius, (B_CHAIN if blast.chain else 0) | (B_GRAVITY if blast.gravity else 0)
+                          | (B_FUSE if blast.fuse_on_lock else 0))
+        for piece in (p.current, p.hold_piece):
+            if piece is not None:
+                _pack_piece(out, piece, now)
+        out += SEED.pack(p.queue.seed)
+        write_varint(out, p.queue.index)
+        bombs = {}
+        for x, y in board.bombs:
+            bombs.setdefault(y, set()).add(x)
+        for y in range(board.rows):
+            encode_row(out, board.masks[y], board.colors[y], bombs.get(y, ()))
+        events = p.events.items()
+        write_varint(out, len(events))
+        for when, kind in events:
+            out += EVENT.pack(when - now, EVENT_KINDS.index(kind))
+        _, state, gauss = p.rng.getstate()
+        out += RNG.pack(*state, math.nan if gauss is None else gauss)
+    return bytes(out)
+
+
+def loads(data, clock=None):
+    """Players from snapshot bytes, timed against clock (default: a new
+    ManualClock shared by all of them). Players with the same modes share
+    one modes dict, like a live game. Truncated or damaged data raises
+    ValueError, like a wrong magic or version."""
+    try:
+        players, end = _loads(data, clock)
+    except (struct.error, IndexError, KeyError) as exc:
+        raise ValueError("corrupt snapshot") from exc
+    if end != len(data):
+        raise ValueError("corrupt snapshot")
+    return players
+
+
+def _loads(data, clock):
+    magic, version, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a snapshot file (or unsupported version)")
+    if clock is None:
+        clock = ManualClock()
+    now = clock.ticks()
+    pos = HEADER.size
+    modes_by_mask = {}
+    players = []
+    for _ in range(count):
+        cols, rows, mask, flags, status = PLAYER.unpack_from(data, pos)
+        pos += PLAYER.size
+        p = TetrisPlayer.__new__(TetrisPlayer)
+        p.clock = clock
+        p.profiler = NULL_PROFILER
+        p.telemetry = NULL_TELEMETRY
+        if mask not in modes_by_mask:
+            modes_by_mask[mask] = {name: bool(mask >> i & 1) for i, name in enumerate(MODE_ORDER)}
+        p.modes = modes_by_mask[mask]
+        p.game_over_cause = STATUS_NAMES[status]
+        p.recheck_rows = bool(flags & F_RECHECK)
+        p.seed = None
+        if flags & F_SEED:
+            p.seed = SEED.unpack_from(data, pos)[0]
+            pos += SEED.size
+        length = data[pos]
+        p.side_name = data[pos + 1:pos + 1 + length].decode("utf-8")
+        pos += 1 + length
+        for stat in STATS:
+            value, pos = read_varint(data, pos)
+            setattr(p, stat, value)
+        drop, start = TIMES.unpack_from(data, pos)
+        pos += TIMES.size
+        p.last_drop_time, p.start_time = now + drop, now + start
+        p.lock_started = None
+        if flags & F_LOCK:
+            p.lock_started = now + LOCK.unpack_from(data, pos)[0]
+            pos += LOCK.size
+        p.piece_started = now  # not stored; lock times restart at the load
+        radius, blast_flags = BLAST.unpack_from(data, pos)
+        pos += BLAST.size
+        p.blast = BlastResolver(radius, bool(blast_flags & B_CHAIN), bool(blast_flags & B_GRAVITY),
+                                bool(blast_flags & B_FUSE))
+        p.current, pos = _unpack_piece(data, pos, cols, now)
+        p.hold_piece = None
+        if flags & F_HOLD:
+            p.hold_piece, pos = _unpack_piece(data, pos, cols, now)
+        piece_seed = SEED.unpack_from(data, pos)[0]
+        index, pos = read_varint(data, pos + SEED.size)
+        p.queue = PieceQueue(piece_seed, p.modes, cols, index=index)
+        board = p.board = Board(cols, rows)
+        for y in range(rows):
+            row_mask, row, bomb_xs, pos = decode_row(data, pos, cols)
+            for x in range(cols):
+                if x in bomb_xs:
+                    board.set_bomb(x, y, row[x])
+                elif (row_mask >> x) & 1:
+                    board.set_cell(x, y, row[x])
+        p.grid = board.colors
+        p.events = EventScheduler()
+        n, pos = read_varint(data, pos)
+        for _ in range(n):
+            when, kind = EVENT.unpack_from(data, pos)
+            pos += EVENT.size
+            p.events.schedule(now + when, EVENT_KINDS[kind])
+        *state, gauss = RNG.unpack_from(data, pos)
+        pos += RNG.size
+        p.rng = random.Random.__new__(random.Random)
+        p.rng.setstate((3, tuple(state), None if math.isnan(gauss) else gauss))
+        p.last_cleared = []
+        p.last_affected = set()
+        players.append(p)
+    return players, pos
+
+
+def save(path, players, now=None):
+    with open(path, "wb") as f:
+        f.write(dumps(players, now))
+
+
+def load(path, clock=None):
+    with open(path, "rb") as f:
+        return loads(f.read(), clock)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect (and continue) a Tetris snapshot.")
+    parser.add_argument("path")
+    parser.add_argument("--ticks", type=int, default=0, help="keep playing gravity only for this many ticks")
+    args = parser.parse_args(argv)
+
+    clock = ManualClock()
+    players = load(args.path, clock)
+    for _ in range(args.ticks):
+        if not all([p.step() for p in players if p.game_over_cause is None]):
+            break
+        clock.advance(TICK_MS)
+    for p in players:
+        print(f"{p.side_name}: score {p.score}  lines {p.lines}  pieces {p.pieces}  "
+              f"{p.game_over_cause or 'playing'}")
+        for y, row in enumerate(p.grid):
+            print("|" + "".join("*" if (x, y) in p.board.bombs else (str(c) if c else ".")
+                                for x, c in enumerate(row)) + "|")
+
+
+if __name__ == "__main__":
+    main()
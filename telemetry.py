@@ -0,0 +1,372 @@
+"""
+Telemetry: een record per gelockte piece, weggeschreven zonder de game loop
+op te houden, plus een analyzer die miljoenen records streamend samenvat.
+
+De engine meldt feiten via player.telemetry (standaard NULL_TELEMETRY, dat
+niets doet): garbage ontvangen, een shrink, een lock (plaatsing, tijd tot de
+lock, lines, bomb blasts) en game over. SessionLog.bind() hangt een
+PlayerTelemetry aan een speler. Records gaan als tuple in een deque; een
+achtergrond thread haalt ze daar in batches uit en schrijft ze als
+line-delimited JSON arrays naar een append-only bestand. De frame loop doet
+dus alleen een deque.append().
+
+Formaat: elke sessie begint met een header regel met de kolommen per tabel,
+daarna een JSON array per record met de tabelnaam voorop:
+    {"format": "tetris-telemetry", "version": 3, "tables": {"game": [...], ...}}
+    ["game", 1, "PLAYER 1", 1234, 10, 20, 31]
+    ["piece", 1, 1850, 0, 3, 0, 1, 4, 18, 1850, 0, 0, 0, 0, 0, 0, 1, 1498]
+    ["end", 1, 80210, 41, 3, 3000, 1, "block_out"]
+
+Run: python headless.py --games 1000 --telemetry runs.tlog
+     python telemetry.py runs.tlog [more.tlog ...] [--json]
+"""
+
+import argparse
+import json
+import operator
+import os
+import threading
+import time
+from collections import deque
+
+FORMAT = "tetris-telemetry"
+# 2: piece records log gravity (engine.GRAVITY_ONE = 1 row/ms) instead of fall ms,
+# 3: modes bits in replay.MODE_ORDER order, like replays and snapshots
+VERSION = 3
+TABLES = {
+    "game": ("game", "name", "seed", "cols", "rows", "modes"),  # modes: bit i = replay.MODE_ORDER[i]
+    "piece": ("game", "t", "n", "shape", "bomb", "rot", "x", "y", "lock_ms", "lines",
+              "blasts", "blasted", "garbage", "shrinks", "score", "level", "gravity"),
+    "end": ("game", "t", "pieces", "lines", "score", "level", "cause"),
+}
+# the columns Analyzer.feed reads, looked up by name in each session's header
+PIECE_FIELDS = ("shape", "bomb", "lock_ms", "lines", "blasts", "blasted", "garbage", "shrinks")
+END_FIELDS = ("t", "pieces", "lines", "score", "cause")
+FLUSH_INTERVAL = 0.5  # s between background flushes
+MAX_BATCH = 4096  # records that wake the writer early
+MAX_PENDING = 1 << 20  # records queued before new ones are dropped (disk stalled)
+
+
+# ===========================
+# ENGINE HOOKS
+# ===========================
+class NullTelemetry:
+    """Stand-in with the PlayerTelemetry API that records nothing."""
+
+    def garbage(self, player, lines):
+        pass
+
+    def shrink(self, player, col):
+        pass
+
+    def piece(self, player, piece, lock_ms, blasts, blasted, cleared):
+        pass
+
+    def game_over(self, player, cause=None):
+        pass
+
+
+NULL_TELEMETRY = NullTelemetry()
+
+
+class PlayerTelemetry:
+    """Per-player side of a SessionLog: counts garbage and shrinks between
+    locks and turns every lock into one piece record."""
+
+    def __init__(self, log, game, player):
+        self.log = log
+        self.game = game
+        self.start = player.start_time
+        self.garbage_in = 0
+        self.shrinks = 0
+        self.ended = False
+
+    def garbage(self, player, lines):
+        self.garbage_in += lines
+
+    def shrink(self, player, col):
+        self.shrinks += 1
+
+    def piece(self, player, piece, lock_ms, blasts, blasted, cleared):
+        self.log.write(("piece", self.game, player.clock.ticks() - self.start, player.pieces - 1,
+                        piece.base_id, int(piece.is_bomb), piece.rotation, piece.x, piece.y, lock_ms,
+                        len(cleared), blasts, blasted, self.garbage_in, self.shrinks,
+                        player.score, player.level, player.gravity))
+        self.garbage_in = 0
+        self.shrinks = 0
+
+    def game_over(self, player, cause=None):
+        """End record; cause defaults to the player's game over cause."""
+        if self.ended:
+            return
+        self.ended = True
+        self.log.write(("end", self.game, player.clock.ticks() - self.start, player.pieces, player.lines,
+                        player.score, player.level, player.game_over_cause or cause or "quit"))
+
+
+# ===========================
+# WRITER
+# ===========================
+class SessionLog:
+    """Append-only telemetry file fed from the game loop, written by a thread.
+
+    write() never blocks: it appends to a deque (thread safe without a
+    lock) and wakes the writer once MAX_BATCH records are waiting. If the
+    disk can't keep up, records beyond max_pending are dropped and counted
+    instead of stalling the frame.
+    """
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH, max_pending=MAX_PENDING):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.pending = deque()
+        self.written = 0
+        self.dropped = 0
+        self.games = 0
+        self._players = []
+        self._wake = threading.Event()
+        self._stop = False
+        self._file = open(path, "a", encoding="utf-8")
+        # a header per session, so files appended to across versions stay readable
+        header = {"format": FORMAT, "version": VERSION, "tables": TABLES}
+        self._file.write(json.dumps(header) + "\n")
+        self._file.flush()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+
+    def bind(self, player):
+        """Start a game record for player and route its hooks here."""
+        self.games += 1
+        game = (os.getpid() << 20) + self.games  # unique across concurrent writers
+        from replay import MODE_ORDER  # not at the top: engine imports this module
+        mask = sum(1 << i for i, name in enumerate(MODE_ORDER) if player.modes.get(name))
+        self.write(("game", game, player.side_name, player.seed, player.board.cols, player.board.rows, mask))
+        player.telemetry = PlayerTelemetry(self, game, player)
+        self._players.append(player)
+        return player.telemetry
+
+    def unbind(self, player, cause="quit"):
+        """Close the player's game (end record unless it already has one)."""
+        player.telemetry.game_over(player, cause)
+        player.telemetry = NULL_TELEMETRY
+        if player in self._players:
+            self._players.remove(player)
+
+    def write(self, record):
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self.pending.append(record)
+        if len(self.pending) >= self.max_batch:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._flush()
+
+    def _flush(self):
+        pending = self.pending
+        lines = []
+        while pending:
+            lines.append(json.dumps(pending.popleft(), separators=(",", ":")))
+        if lines:
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            self.written += len(lines)
+
+    def close(self):
+        """End record for players still in a game, final flush, close."""
+        for player in list(self._players):
+            self.unbind(player)
+        self._stop = True
+        self._wake.set()
+        self._thread.join()
+        self._flush()
+        self._file.close()
+
+
+# ===========================
+# ANALYZER
+# ===========================
+class Histogram:
+    """Fixed buckets of width `step` up to `limit`, so memory stays bounded
+    no matter how many values go in. Percentiles report the lower edge of
+    their bucket (values past limit land in the last one)."""
+
+    def __init__(self, step, limit):
+        self.step = step
+        self.counts = [0] * (limit // step + 1)
+        self.n = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        idx = min(int(value) // self.step, len(self.counts) - 1)
+        self.counts[max(idx, 0)] += 1
+        self.n += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct):
+        if not self.n:
+            return 0
+        rank = max(1, int(round(pct / 100.0 * self.n)))
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(idx * self.step, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.n,
+            "mean": self.total / self.n if self.n else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class Analyzer:
+    """Streams telemetry records into running totals and histograms."""
+
+    def __init__(self):
+        self.games = 0
+        self.finished = 0
+        self.pieces = 0
+        self.shapes = [0] * 8
+        self.bombs = 0
+        self.clears = [0] * 5  # 0, 1, 2, 3, 4+ lines per lock
+        self.blasts = 0
+        self.blasted = 0
+        self.garbage = 0
+        self.shrinks = 0
+        self.causes = {}
+        self.lock_ms = Histogram(1, 60000)
+        self.game_score = Histogram(1000, 1000000)
+        self.game_lines = Histogram(1, 1000)
+        self.game_pieces = Histogram(10, 10000)
+        self.game_ms = Histogram(100, 3600000)
+        self.bad_lines = 0
+        self.use_columns(TABLES)
+
+    def use_columns(self, tables):
+        """Read the records that follow with these columns per table (a
+        session header); raises ValueError if a column feed needs is missing."""
+        self.columns = {name: tuple(cols) for name, cols in tables.items()}
+        try:
+            # + 1: records start with the table name
+            self._piece = operator.itemgetter(*(self.columns["piece"].index(f) + 1 for f in PIECE_FIELDS))
+            self._end = operator.itemgetter(*(self.columns["end"].index(f) + 1 for f in END_FIELDS))
+        except (KeyError, ValueError):
+            raise ValueError(f"telemetry tables lack a column the analyzer needs: {tables}") from None
+
+    def feed_file(self, path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("{"):
+                    header = json.loads(line)
+                    if header.get("format") != FORMAT or not 1 <= header.get("version", 0) <= VERSION:
+                        raise ValueError(f"{path}: not a telemetry file (or unsupported version)")
+                    self.use_columns(header["tables"])
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    self.bad_lines += 1  # a torn last line after a crash
+                    continue
+                self.feed(record)
+
+    def feed(self, record):
+        table = record[0]
+        if table == "piece":
+            shape, bomb, lock_ms, lines, blasts, blasted, garbage, shrinks = self._piece(record)
+            self.pieces += 1
+            self.shapes[shape] += 1
+            self.bombs += bomb
+            self.clears[min(lines, 4)] += 1
+            self.blasts += blasts
+            self.blasted += blasted
+            self.garbage += garbage
+            self.shrinks += shrinks
+            self.lock_ms.add(lock_ms)
+        elif table == "game":
+            self.games += 1
+        elif table == "end":
+            t, pieces, lines, score, cause = self._end(record)
+            self.finished += 1
+            self.causes[cause] = self.causes.get(cause, 0) + 1
+            self.game_score.add(score)
+            self.game_lines.add(lines)
+            self.game_pieces.add(pieces)
+            self.game_ms.add(t)
+
+    def report(self):
+        pieces = max(self.pieces, 1)
+        return {
+            "games": self.games,
+            "finished": self.finished,
+            "pieces": self.pieces,
+            "shapes": {"IJLOSTZ"[i - 1]: self.shapes[i] for i in range(1, 8)},
+            "bomb_pieces": self.bombs,
+            "clears": {("4+" if n == 4 else str(n)): c for n, c in enumerate(self.clears)},
+            "lines_per_piece": sum(n * c for n, c in enumerate(self.clears)) / pieces,
+            "blasts": self.blasts,
+            "cells_blasted": self.blasted,
+            "garbage_received": self.garbage,
+            "shrinks": self.shrinks,
+            "game_over": self.causes,
+            "lock_ms": self.lock_ms.summary(),
+            "score_per_game": self.game_score.summary(),
+            "lines_per_game": self.game_lines.summary(),
+            "pieces_per_game": self.game_pieces.summary(),
+            "ms_per_game": self.game_ms.summary(),
+            "bad_lines": self.bad_lines,
+        }
+
+
+def print_report(report):
+    print(f"games: {report['games']} ({report['finished']} finished)  pieces: {report['pieces']}  "
+          f"bombs: {report['bomb_pieces']}")
+    print("shapes:  " + "  ".join(f"{k} {v}" for k, v in report["shapes"].items()))
+    print("clears:  " + "  ".join(f"{k}: {v}" for k, v in report["clears"].items())
+          + f"   lines/piece {report['lines_per_piece']:.3f}")
+    print(f"blasts: {report['blasts']} ({report['cells_blasted']} cells)  garbage in: "
+          f"{report['garbage_received']}  shrinks: {report['shrinks']}")
+    print("game over: " + "  ".join(f"{k} {v}" for k, v in sorted(report["game_over"].items())))
+    for name in ("lock_ms", "score_per_game", "lines_per_game", "pieces_per_game", "ms_per_game"):
+        s = report[name]
+        print(f"{name:<17} mean {s['mean']:9.1f}  p50 {s['p50']:7}  p95 {s['p95']:7}  "
+              f"p99 {s['p99']:7}  max {s['max']}")
+    if report["bad_lines"]:
+        print(f"skipped {report['bad_lines']} unreadable lines")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize Tetris telemetry files.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    analyzer = Analyzer()
+    start = time.perf_counter()
+    for path in args.paths:
+        analyzer.feed_file(path)
+    report = analyzer.report()
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print_report(report)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"{analyzer.pieces + analyzer.games + analyzer.finished} records in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
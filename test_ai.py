@@ -0,0 +1,104 @@
+"""CPU search: depth limits and plans that play legal moves."""
+
+import random
+
+import pytest
+
+from ai import MAX_DEPTH, SPAWN_Y, WEIGHTS, CpuController, best_plan, placements, score_placement, spawn_x
+from engine import DEFAULT_MODES, SHAPE_TABLE, ManualClock, TetrisPlayer, add_garbage_line, apply_action
+
+MODES = dict(DEFAULT_MODES, bombs=False, hyper_mode=False, random_swap=False)
+
+
+def test_depth_is_checked():
+    player = TetrisPlayer(dict(DEFAULT_MODES), clock=ManualClock(), seed=1)
+    for depth in (0, MAX_DEPTH + 1):
+        with pytest.raises(ValueError):
+            best_plan(player, depth)
+        with pytest.raises(ValueError):
+            CpuController(player, depth=depth)
+
+
+def messy_player(seed, pieces):
+    """A player a few pieces into a game, with some garbage under the stack."""
+    rng = random.Random(seed)
+    player = TetrisPlayer(MODES, clock=ManualClock(), seed=seed)
+    for _ in range(pieces):
+        if rng.random() < 0.3:
+            add_garbage_line(player.board, rng)
+        for action in best_plan(player):
+            apply_action(player, action)
+    return player
+
+
+def play_plan(player, plan):
+    """Apply a plan on a clone, checking that every action does exactly what
+    it says. Returns the (base_id, rotation, x, y) the piece lands at."""
+    player = player.clone()
+    assert plan[-1] == "hard" and "hard" not in plan[:-1]
+    for action in plan[:-1]:
+        piece = player.current
+        base_id, rotation, x, y = piece.base_id, piece.rotation, piece.x, piece.y
+        assert apply_action(player, action)
+        piece = player.current
+        if action == "hold":
+            assert player.hold_piece.base_id == base_id and piece.hold_used
+            continue
+        assert piece.y == y
+        if action == "rotate":
+            assert piece.rotation == (rotation + 1) % len(SHAPE_TABLE[base_id])
+            assert abs(piece.x - x) <= 1  # at most the one-column wall kick
+        else:
+            assert piece.rotation == rotation
+            assert piece.x == x + (1 if action == "right" else -1)
+    piece = player.current
+    landing = (piece.base_id, piece.rotation, piece.x, player.ghost_y())
+    pieces = player.pieces
+    apply_action(player, "hard")
+    assert player.pieces == pieces + 1
+    return landing
+
+
+def candidates(player, use_hold=True):
+    """{(base_id, rotation, x, y): depth-1 score} of every placement the search can pick."""
+    board = player.board
+    masks, heights, rows, cols = list(board.masks), board.heights, board.rows, board.cols
+    cur = player.current
+    starts = [(cur.base_id, cur.rotation, cur.x, cur.y)]
+    if use_hold and not cur.hold_used:
+        held = player.hold_piece or player.next_piece
+        starts.append((held.base_id, 0, spawn_x(held.base_id, cols), SPAWN_Y))
+    out = {}
+    for base_id, rotation, x, y in starts:
+        for turns, _, tx, ty, info in placements(masks, heights, rows, cols, base_id, rotation, x, y):
+            key = (base_id, (rotation + turns) % len(SHAPE_TABLE[base_id]), tx, ty)
+            out[key] = score_placement(masks, rows, cols, info, tx, ty, WEIGHTS)
+    return out
+
+
+def test_plans_play_legal_moves_to_the_chosen_placement():
+    for seed in range(6):
+        player = messy_player(seed, pieces=6 + seed)
+        for depth in range(1, MAX_DEPTH + 1):
+            for use_hold in (False, True):
+                options = candidates(player, use_hold)
+                landing = play_plan(player, best_plan(player, depth, use_hold))
+                assert landing in options
+                if depth == 1:
+                    assert options[landing] == pytest.approx(max(options.values()))
+
+
+def test_controller_restarts_when_the_board_changes():
+    player = messy_player(3, pieces=5)
+    controller = CpuController(player, depth=2, budget_ms=0)
+    assert controller.update() == []  # no budget: the search started but did not run
+    started = controller._search
+    add_garbage_line(player.board, random.Random(1))
+    assert controller.update() == []
+    assert controller._search is not started and controller.masks == player.board.masks
+    controller.budget_ms = 1e6
+    plan = controller.update()
+    assert play_plan(player, plan) in candidates(player)
+    # a finished plan is queued already: a board change must not plan the piece twice
+    add_garbage_line(player.board, random.Random(2))
+    assert controller.update() == []
@@ -0,0 +1,161 @@
+"""BlastResolver on small hand-built boards: radius, chains and collapse."""
+
+from engine import BlastResolver, Board, Piece, lock_piece
+
+BOMBS = {"bombs": True}
+
+
+def board_from(picture):
+    """Rows of '.' (empty), 1-7 (color) or '*' (live bomb, color 1)."""
+    board = Board(len(picture[0]), len(picture))
+    for y, line in enumerate(picture):
+        for x, ch in enumerate(line):
+            if ch == "*":
+                board.set_bomb(x, y, 1)
+            elif ch != ".":
+                board.set_cell(x, y, int(ch))
+    return board
+
+
+def picture(board):
+    return ["".join("*" if (x, y) in board.bombs else (str(c) if c else ".") for x, c in enumerate(row))
+            for y, row in enumerate(board.colors)]
+
+
+def heights(board):
+    return [max((board.rows - y for y in range(board.rows) if board.masks[y] >> x & 1), default=0)
+            for x in range(board.cols)]
+
+
+def test_radius_one_empties_the_square_around_the_bomb():
+    board = board_from([
+        ".....",
+        "22222",
+        "23*32",
+        "23332",
+        "22222",
+    ])
+    blast = BlastResolver(radius=1)
+    changed = blast.detonate(board, [(2, 2)])
+    assert picture(board) == [
+        ".....",
+        "2...2",
+        "2...2",
+        "2...2",
+        "22222",
+    ]
+    assert changed == {(x, y) for x in (1, 2, 3) for y in (1, 2, 3)}
+    assert blast.detonations == 1 and not board.bombs
+    assert board.heights == heights(board)
+
+
+def test_radius_two_is_clipped_at_the_edges():
+    board = board_from([
+        "11111",
+        "1*111",
+        "11111",
+        "11111",
+        "11111",
+    ])
+    changed = BlastResolver(radius=2).detonate(board, [(1, 1)])
+    assert picture(board) == [
+        "....1",
+        "....1",
+        "....1",
+        "....1",
+        "11111",
+    ]
+    assert changed == {(x, y) for x in range(4) for y in range(4)}
+    assert board.heights == heights(board)
+
+
+def test_bombs_in_the_blast_chain():
+    start = [
+        "......",
+        "1*1111",
+        "11*111",
+        "11111*",
+    ]
+    board = board_from(start)
+    blast = BlastResolver(radius=1)
+    blast.detonate(board, [(1, 1)])
+    # (1, 1) sets off (2, 2); (5, 3) is out of reach of both
+    assert picture(board) == [
+        "......",
+        "....11",
+        "....11",
+        "1...1*",
+    ]
+    assert blast.detonations == 2 and board.bombs == {(5, 3)}
+
+    board = board_from(start)
+    blast = BlastResolver(radius=1, chain=False)
+    blast.detonate(board, [(1, 1)])
+    assert picture(board) == [
+        "......",
+        "...111",
+        "...111",
+        "11111*",
+    ]
+    assert blast.detonations == 1 and board.bombs == {(5, 3)}
+
+
+def test_gravity_collapses_the_blasted_columns():
+    board = board_from([
+        "3.4..",
+        "3.4..",
+        "22*22",
+        "11111",
+        "1.1.1",
+    ])
+    changed = BlastResolver(radius=1, gravity=True).detonate(board, [(2, 2)])
+    # rows 1-3 of columns 1-3 go, then only those columns fall (column 0 keeps its 3s up top)
+    assert picture(board) == [
+        "3....",
+        "3....",
+        "2...2",
+        "1.4.1",
+        "1.1.1",
+    ]
+    assert {(2, 0), (2, 3)} <= changed
+    assert board.heights == heights(board)
+
+
+def test_bombs_move_with_the_collapse():
+    board = board_from([
+        ".*...",
+        ".1...",
+        "1*1..",
+        "111..",
+        "1.1..",
+    ])
+    BlastResolver(radius=0, chain=False, gravity=True).detonate(board, [(1, 2)])
+    assert picture(board) == [
+        ".....",
+        ".....",
+        "1*1..",
+        "111..",
+        "111..",
+    ]
+    assert board.bombs == {(1, 2)}
+
+
+def test_lock_piece_fuse():
+    floor = ["....", "....", "....", "1111"]
+    piece = Piece(4, is_bomb=True, cols=4)  # O piece
+    piece.x, piece.y = 1 - piece.info.min_x, 1 - piece.info.min_y  # cells (1..2, 1..2)
+    cells = set(piece.get_cells())
+
+    board = board_from(floor)
+    changed = lock_piece(piece, board, BOMBS, BlastResolver(radius=1, fuse_on_lock=False))
+    assert changed == cells and board.bombs == cells
+
+    board = board_from(floor)
+    blast = BlastResolver(radius=1)
+    lock_piece(piece, board, BOMBS, blast)
+    assert not board.bombs and blast.detonations == 4
+    assert picture(board) == ["....", "....", "....", "...."]
+
+    board = board_from(floor)
+    lock_piece(piece, board, {"bombs": False}, blast)
+    assert not board.bombs and all(board.colors[y][x] == 4 for x, y in cells)
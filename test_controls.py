@@ -0,0 +1,73 @@
+"""InputQueue auto-repeat: DAS, ARR and soft drop, ticked on a ManualClock."""
+
+from controls import WALL_SHIFT, InputQueue, build_dispatch
+from engine import ManualClock
+
+KEYS = {"left": "a", "right": "d", "soft": "s", "rotate": "w"}
+
+
+def make_queue(tick_ms=10, das_ms=50, arr_ms=20, soft_drop_ms=30):
+    clock = ManualClock()
+    inputs = InputQueue(build_dispatch({0: KEYS}), tick_ms=tick_ms, das_ms=das_ms, arr_ms=arr_ms,
+                        soft_drop_ms=soft_drop_ms, clock=clock)
+    return inputs, clock
+
+
+def run(inputs, clock, ticks, presses=None):
+    """Tick `ticks` times; presses maps a tick index to [(action, down)] pushed before it.
+    Returns the actions per tick."""
+    out = []
+    for i in range(ticks):
+        for action, down in (presses or {}).get(i, ()):
+            inputs.push(KEYS[action], down)
+        out.append([action for _, action in inputs.tick()])
+        clock.advance(inputs.tick_ms)
+    return out
+
+
+def test_held_shift_waits_for_das_then_repeats_at_arr():
+    inputs, clock = make_queue()
+    out = run(inputs, clock, 12, {0: [("left", True)]})
+    # press on tick 0, DAS charges at 50 ms (tick 5), then one shift per 20 ms
+    assert [i for i, acts in enumerate(out) for _ in acts] == [0, 5, 7, 9, 11]
+    assert all(acts in ([], ["left"]) for acts in out)
+
+
+def test_repeats_keep_time_when_das_is_not_a_whole_tick():
+    inputs, clock = make_queue(tick_ms=16)
+    out = run(inputs, clock, 20, {0: [("right", True)]})
+    shifted = 0
+    for i, acts in enumerate(out):
+        shifted += len(acts)
+        held = i * 16
+        # the press, the DAS shift, then every ARR_MS after DAS: no drift from rounding to ticks
+        assert shifted == 1 + (held >= 50) + max(0, (held - 50) // 20)
+    assert [i for i, acts in enumerate(out) if acts] == [0, 4, 5, 6, 7, 9, 10, 11, 12, 14, 15, 16, 17, 19]
+
+
+def test_arr_zero_shifts_to_the_wall():
+    inputs, clock = make_queue(arr_ms=0)
+    out = run(inputs, clock, 7, {0: [("left", True)]})
+    assert [len(acts) for acts in out] == [1, 0, 0, 0, 0, WALL_SHIFT, WALL_SHIFT]
+
+
+def test_release_stops_the_repeat():
+    inputs, clock = make_queue()
+    out = run(inputs, clock, 12, {0: [("left", True)], 6: [("left", False)]})
+    assert [i for i, acts in enumerate(out) for _ in acts] == [0, 5]
+
+
+def test_releasing_the_newer_direction_falls_back_with_a_fresh_das():
+    inputs, clock = make_queue()
+    presses = {0: [("left", True)], 2: [("right", True)], 3: [("right", False)]}
+    out = run(inputs, clock, 12, presses)
+    assert out[0] == ["left"] and out[2] == ["right"]
+    # left is still held: it takes over on tick 3 but must charge DAS again
+    assert [i for i, acts in enumerate(out) if acts == ["left"]] == [0, 8, 10]
+
+
+def test_soft_drop_repeats_while_held():
+    inputs, clock = make_queue()
+    out = run(inputs, clock, 10, {0: [("soft", True), ("rotate", True)], 7: [("soft", False)]})
+    assert out[0] == ["soft", "rotate"]
+    assert [i for i, acts in enumerate(out) if "soft" in acts] == [0, 3, 6]
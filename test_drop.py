@@ -0,0 +1,48 @@
+"""drop_distance (height map + bottom profile) against a brute-force step-down."""
+
+import random
+
+from engine import SHAPE_TABLE, Board, drop_distance, mask_collides
+
+
+def random_board(rng, cols=10, rows=20):
+    """Ragged stacks with holes and the odd overhang, so both paths get used."""
+    board = Board(cols, rows)
+    for x in range(cols):
+        height = rng.randrange(rows // 2)
+        for y in range(rows - height, rows):
+            if rng.random() < 0.8:
+                board.set_cell(x, y, 1)
+        if rng.random() < 0.2:
+            board.set_cell(x, rows - height - rng.randrange(2, 5), 2)  # overhang
+    return board
+
+
+def step_down(board, info, x, y):
+    dist = 0
+    while not mask_collides(board.masks, board.rows, info.row_masks, x, y + dist + 1):
+        dist += 1
+    return dist
+
+
+def test_drop_distance_matches_brute_force():
+    rng = random.Random(12)
+    checked = 0
+    for _ in range(15):
+        board = random_board(rng)
+        for rotations in SHAPE_TABLE.values():
+            for info in rotations:
+                for x in range(-info.min_x, board.cols - info.max_x):
+                    for y in range(-4, board.rows):
+                        if mask_collides(board.masks, board.rows, info.row_masks, x, y):
+                            continue
+                        assert drop_distance(board.masks, board.heights, board.rows, info, x, y) \
+                            == step_down(board, info, x, y), (info.cells, x, y)
+                        checked += 1
+    assert checked > 2000
+
+
+def test_drop_from_far_above_is_not_capped():
+    board = Board(10, 20)
+    info = SHAPE_TABLE[4][0]  # O
+    assert drop_distance(board.masks, board.heights, board.rows, info, 4, -30) == 30 + 20 - 1 - info.max_y
@@ -0,0 +1,38 @@
+"""Timed events (swap, hyper garbage, shrink) fire at the same game times at any tick rate."""
+
+from engine import DEFAULT_MODES, GARBAGE_PERIOD_MS, SHRINK_PERIOD_MS, ManualClock, TetrisPlayer
+
+MODES = dict(DEFAULT_MODES, bombs=False)
+PLAY_MS = 100000
+
+
+def run_events(dt, seed=21):
+    """Step a player whose piece never falls, so only the events change the
+    game; returns the (time, kind) of every event and the final board."""
+    clock = ManualClock()
+    player = TetrisPlayer(MODES, clock=clock, seed=seed)
+    player.gravity = 0
+    fired = []
+    pop_due = player.events.pop_due
+
+    def logged(now):
+        due = pop_due(now)
+        if due:
+            fired.append(due)
+        return due
+
+    player.events.pop_due = logged
+    while clock.now < PLAY_MS:
+        clock.advance(dt)
+        player.step()
+    return fired, player.board.masks, player.current.shape_id
+
+
+def test_event_times_do_not_depend_on_the_tick_rate():
+    fired, masks, shape = run_events(1)
+    kinds = [kind for _, kind in fired]
+    assert kinds.count("shrink") == PLAY_MS // SHRINK_PERIOD_MS
+    assert kinds.count("garbage_window") == PLAY_MS // GARBAGE_PERIOD_MS
+    assert kinds.count("garbage") > 0 and kinds.count("swap") > 5
+    for dt in (16, 50, 250):
+        assert run_events(dt) == (fired, masks, shape)
@@ -0,0 +1,105 @@
+"""Fixed-point gravity per level and the lock delay, stepped on a ManualClock."""
+
+from engine import (
+    BASE_FALL_MS, DEFAULT_MODES, GRAVITY, GRAVITY_20G, GRAVITY_ONE, LOCK_DELAY_MS, LOCK_RESETS, MAX_LEVEL,
+    ManualClock, TetrisPlayer, apply_action, gravity_table,
+)
+
+MODES = dict(DEFAULT_MODES, bombs=False, hyper_mode=False, random_swap=False)
+
+
+def player_at(level_gravity):
+    clock = ManualClock()
+    player = TetrisPlayer(MODES, clock=clock, seed=5)
+    player.gravity = level_gravity
+    return player, clock
+
+
+def row_times(player, clock, rows, dt=1):
+    """Clock times at which the current piece moved down, stepping dt ms at a time."""
+    times = []
+    y = player.current.y
+    while len(times) < rows:
+        clock.advance(dt)
+        player.step()
+        times.extend([clock.now] * (player.current.y - y))
+        y = player.current.y
+    return times[:rows]
+
+
+def lock_time(player, clock):
+    while player.pieces == 0:
+        clock.advance(1)
+        player.step()
+    return clock.now
+
+
+def test_gravity_table_is_fixed_point_and_capped_at_20g():
+    assert GRAVITY[1] == round(GRAVITY_ONE / BASE_FALL_MS) == 1498
+    speeds = GRAVITY[1:]
+    assert all(isinstance(g, int) for g in speeds)
+    assert all(a <= b for a, b in zip(speeds, speeds[1:]))
+    assert max(speeds) == GRAVITY_20G == GRAVITY[MAX_LEVEL]
+    assert GRAVITY[MAX_LEVEL - 1] == GRAVITY_20G  # 0.8 ms per row already saturates
+    assert gravity_table(levels=3)[-1] == GRAVITY_20G  # the top level is 20G whatever the count
+
+
+def test_level_one_falls_a_row_every_700_ms():
+    player, clock = player_at(GRAVITY[1])
+    # 699 ms * 1498 is just short of GRAVITY_ONE, 700 ms is just past it
+    assert row_times(player, clock, 3) == [700, 1400, 2100]
+
+
+def test_fractional_gravity_carries_over():
+    # level 2: 1889 / 2**20 rows per ms, ~555.09 ms per row
+    player, clock = player_at(GRAVITY[2])
+    assert row_times(player, clock, 3) == [556, 1111, 1666]
+
+
+def test_rows_fallen_do_not_depend_on_the_step_size():
+    # same piece, same gravity: 1 ms steps and 16/17 ms frames reach the same rows
+    for dt in (1, 16, 17):
+        player, clock = player_at(GRAVITY[5])
+        y0 = player.current.y
+        while clock.now < 1200:
+            clock.advance(dt)
+            player.step()
+        assert player.current.y - y0 == clock.now * GRAVITY[5] // GRAVITY_ONE
+
+
+def test_20g_lands_in_one_step():
+    player, clock = player_at(GRAVITY_20G)
+    ghost = player.ghost_y()
+    clock.advance(1)
+    player.step()
+    assert player.current.y == ghost and player.lock_started == 1
+
+
+def test_lock_delay_expires_exactly_after_lock_delay_ms():
+    player, clock = player_at(GRAVITY_20G)
+    player.step()  # lands at t=0
+    assert player.lock_started == 0 and player.pieces == 0
+    assert lock_time(player, clock) == LOCK_DELAY_MS
+
+
+def test_moves_on_the_ground_restart_the_lock_delay():
+    player, clock = player_at(GRAVITY_20G)
+    player.step()
+    clock.advance(300)
+    player.step()
+    apply_action(player, "left")
+    assert player.lock_started == 300 and player.lock_resets == 1
+    assert lock_time(player, clock) == 300 + LOCK_DELAY_MS
+
+
+def test_lock_resets_run_out():
+    player, clock = player_at(GRAVITY_20G)
+    player.step()
+    last_reset = 100 * LOCK_RESETS
+    for i in range(LOCK_RESETS + 4):  # four moves past the last reset, all before it expires
+        clock.advance(100)
+        player.step()
+        apply_action(player, "left" if i % 2 else "right")
+    assert player.lock_resets == LOCK_RESETS and player.lock_started == last_reset
+    assert player.pieces == 0
+    assert lock_time(player, clock) == last_reset + LOCK_DELAY_MS
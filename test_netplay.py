@@ -0,0 +1,96 @@
+"""Netplay: loopback mirrors stay in sync, the server pairs and cleans up matches."""
+
+import asyncio
+
+import pytest
+
+from ai import ai_policy
+from engine import DEFAULT_MODES
+from netplay import (
+    ANY_SLOT, HELLO, MSG_BYE, MSG_HELLO, MSG_START, START, Connection, VersusServer, in_sync, loopback,
+    mask_to_modes, modes_to_mask,
+)
+
+
+def test_loopback_in_sync():
+    clients, _ = asyncio.run(loopback(max_ticks=300, tick_ms=2, policy=ai_policy))
+    assert in_sync(clients)
+    sessions = [c.session for c in clients]
+    assert [s.tick for s in sessions] == [300, 300]
+    assert sum(s.lines_sent for s in sessions)  # garbage went through the mirrors too
+    assert [s.lines_sent for s in sessions] == [s.lines_received for s in reversed(sessions)]
+
+
+def test_loopback_bad_link_and_reconnect():
+    clients, _ = asyncio.run(loopback(latency_ms=10, jitter_ms=5, loss=0.05, max_ticks=300, tick_ms=2,
+                                      drop_at=120, policy=ai_policy))
+    assert in_sync(clients)
+    assert clients[0].reconnects == 1
+    assert [c.session.tick for c in clients] == [300, 300]
+
+
+def test_modes_mask_round_trip():
+    modes = dict(DEFAULT_MODES, seven_bag=True, sound=True)
+    assert mask_to_modes(modes_to_mask(modes)) == modes
+
+
+async def _hello(port, match_id=0, slot=ANY_SLOT):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    conn = Connection(reader, writer)
+    conn.send(MSG_HELLO, HELLO.pack(match_id, slot))
+    return conn
+
+
+async def _started(conn):
+    kind, payload = await asyncio.wait_for(conn.recv(), 2)
+    assert kind == MSG_START
+    return START.unpack(payload)[:2]  # match id, slot
+
+
+async def _until(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("server never got there")
+
+
+def test_match_ids_are_not_reused():
+    async def run():
+        server = await VersusServer(seed=1).start()
+        conns = [await _hello(server.port) for _ in range(4)]
+        assert [(await _started(c))[0] for c in conns] == [1, 1, 2, 2]
+        second = server.matches[2]
+        for conn in conns[:2]:
+            conn.send(MSG_BYE)
+        await _until(lambda: 1 not in server.matches)
+        newer = [await _hello(server.port) for _ in range(2)]
+        assert [(await _started(c))[0] for c in newer] == [3, 3]
+        assert server.matches[2] is second and second.conns[0] is not None
+        for conn in conns + newer:
+            conn.close()
+        await server.close()
+    asyncio.run(run())
+
+
+def test_abandoned_match_is_dropped():
+    async def run():
+        server = await VersusServer(seed=1).start()
+        # alone in the lobby, then gone
+        lone = await _hello(server.port)
+        await _until(lambda: server.waiting is not None)
+        lone.close()
+        await _until(lambda: not server.matches and server.waiting is None)
+        # both players vanish without BYE
+        conns = [await _hello(server.port) for _ in range(2)]
+        match_id, _ = await _started(conns[0])
+        await _started(conns[1])
+        for conn in conns:
+            conn.writer.transport.abort()
+        await _until(lambda: not server.matches)
+        # a late rejoin is refused instead of waiting for a START forever
+        rejoin = await _hello(server.port, match_id, 0)
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(rejoin.recv(), 2)
+        await server.close()
+    asyncio.run(run())
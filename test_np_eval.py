@@ -0,0 +1,76 @@
+"""np_eval scores the same boards and placements as the pure Python search in ai.py."""
+
+import random
+
+import pytest
+
+from ai import SPAWN_Y, WEIGHTS, evaluate, placements, score_placement, spawn_x
+from engine import DEFAULT_MODES, ManualClock, TetrisPlayer
+
+np = pytest.importorskip("numpy")
+import np_eval  # noqa: E402
+
+MODES = dict(DEFAULT_MODES, bombs=False, hyper_mode=False, random_swap=False)
+
+
+def random_player(rng, seed):
+    """A player on a ragged board with holes and now and then a full row."""
+    player = TetrisPlayer(MODES, clock=ManualClock(), seed=seed)
+    board = player.board
+    for x in range(board.cols):
+        for y in range(board.rows - rng.randrange(board.rows // 2), board.rows):
+            if rng.random() < 0.75:
+                board.set_cell(x, y, rng.randint(1, 7))
+    for y in range(board.rows - 4, board.rows):
+        if rng.random() < 0.3:
+            for x in range(board.cols):
+                board.set_cell(x, y, 1)
+    return player
+
+
+def expected(player, base_id, rotation, x, y):
+    """(moves, scores) the way ai.search sees them, lock-outs left out like np_eval does."""
+    board = player.board
+    masks = list(board.masks)
+    moves, scores = [], []
+    for turns, _, tx, ty, info in placements(masks, board.heights, board.rows, board.cols, base_id, rotation, x, y):
+        if ty + info.min_y < 0:
+            continue
+        moves.append((base_id, turns, tx, ty))
+        scores.append(score_placement(masks, board.rows, board.cols, info, tx, ty, WEIGHTS))
+    return moves, scores
+
+
+def test_score_boards_matches_evaluate():
+    rng = random.Random(3)
+    players = [random_player(rng, seed) for seed in range(100)]
+    boards = np.stack([np_eval.board_array(p.board) for p in players])
+    scores = np_eval.score_boards(boards)
+    for player, score in zip(players, scores):
+        board = player.board
+        assert score == pytest.approx(evaluate(board.masks, board.rows, board.cols))
+
+
+def test_score_player_matches_score_placement():
+    rng = random.Random(4)
+    for seed in range(100):
+        player = random_player(rng, seed)
+        cur = player.current
+        moves, scores = np_eval.score_player(player)
+        want_moves, want_scores = expected(player, cur.base_id, cur.rotation, cur.x, cur.y)
+        assert moves == want_moves
+        assert list(scores) == pytest.approx(want_scores)
+
+
+def test_score_player_for_every_spawn_piece():
+    rng = random.Random(5)
+    player = random_player(rng, 0)
+    pieces = [(base_id, False) for base_id in range(1, 8)]
+    moves, scores = np_eval.score_player(player, pieces)
+    want_moves, want_scores = [], []
+    for base_id, _ in pieces:
+        m, s = expected(player, base_id, 0, spawn_x(base_id, player.board.cols), SPAWN_Y)
+        want_moves += m
+        want_scores += s
+    assert moves == want_moves
+    assert list(scores) == pytest.approx(want_scores)
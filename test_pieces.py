@@ -0,0 +1,93 @@
+"""Seeded piece queue: 7-bag / random sequences, preview and piece pooling."""
+
+from engine import (
+    BOMB_BIT, CHUNK, DEFAULT_MODES, PREVIEW, ManualClock, PieceQueue, TetrisPlayer, piece_chunk, piece_sequence,
+)
+
+MODES = dict(DEFAULT_MODES, hyper_mode=False, random_swap=False)
+
+
+def test_seven_bag_runs_are_full_sets():
+    codes = piece_sequence(7, 20 * CHUNK, bag=True)
+    for i in range(0, len(codes), 7):
+        assert sorted(code & 7 for code in codes[i:i + 7]) == [1, 2, 3, 4, 5, 6, 7]
+
+
+def test_sequence_is_seeded_and_sliceable():
+    for bag in (False, True):
+        codes = piece_sequence(3, 300, bag)
+        assert piece_sequence(3, 100, bag, start=150) == codes[150:250]
+        piece_chunk.cache_clear()
+        assert piece_sequence(3, 300, bag) == codes
+        assert piece_sequence(4, 300, bag) != codes
+    shapes = [code & 7 for code in piece_sequence(3, 7000)]
+    assert set(shapes) == {1, 2, 3, 4, 5, 6, 7}
+
+
+def test_queue_follows_sequence():
+    for bag in (False, True):
+        modes = dict(MODES, seven_bag=bag)
+        codes = piece_sequence(11, 100, bag)
+        queue = PieceQueue(11, modes)
+        assert len(queue.preview) == PREVIEW
+        for now in range(60):
+            assert queue.index == now
+            assert [p.base_id for p in queue.preview] == [code & 7 for code in codes[now:now + PREVIEW]]
+            piece = queue.pop(now)
+            assert piece.base_id == codes[now] & 7
+            assert piece.is_bomb == bool(codes[now] & BOMB_BIT)
+            assert piece.spawn_time == now
+            queue.release(piece)
+
+
+def test_queue_resumes_from_index():
+    queue = PieceQueue(5, MODES)
+    for now in range(25):
+        queue.release(queue.pop(now))
+    resumed = PieceQueue(5, MODES, index=queue.index)
+    copy = queue.copy()
+    assert [p.base_id for p in resumed.preview] == [p.base_id for p in queue.preview]
+    for now in range(25, 80):
+        a, b, c = queue.pop(now), resumed.pop(now), copy.pop(now)
+        assert a.base_id == b.base_id == c.base_id and a is not c
+
+
+def test_bombs_off_keeps_shapes():
+    with_bombs = PieceQueue(9, dict(MODES, bombs=True))
+    without = PieceQueue(9, dict(MODES, bombs=False))
+    for now in range(100):
+        a, b = with_bombs.pop(now), without.pop(now)
+        assert a.base_id == b.base_id and not b.is_bomb
+
+
+def test_player_pieces_are_pooled():
+    for bag in (False, True):
+        clock = ManualClock()
+        player = TetrisPlayer(dict(MODES, seven_bag=bag), clock=clock, seed=11)
+        codes = piece_sequence(11, 60, bag)
+        assert [player.current.base_id] + [p.base_id for p in player.queue.preview] == \
+            [code & 7 for code in codes[:PREVIEW + 1]]
+        objects = set()
+        for k in range(30):
+            assert player.current.base_id == codes[k] & 7
+            assert player.next_piece is player.queue.preview[0]
+            objects.add(id(player.current))
+            player.hard_drop()
+            if player.game_over_cause:
+                break
+            clock.advance(16)
+        # the preview plus one locked piece in flight; nothing new past that
+        assert len(objects) <= PREVIEW + 2
+
+
+def test_hold_swaps_with_queue():
+    player = TetrisPlayer(MODES, clock=ManualClock(), seed=3)
+    first, second = player.current, player.next_piece
+    player.hold()
+    assert player.hold_piece is first and player.current is second and player.current.hold_used
+    player.hold()
+    assert player.current is second  # once per piece
+    player.hard_drop()
+    third = player.current
+    player.hold()
+    assert player.current is first and player.hold_piece is third
@@ -0,0 +1,84 @@
+"""Replay round trip: recorded inputs replay to the same game."""
+
+import random
+from fractions import Fraction
+
+from ai import ai_policy
+from engine import COLS, DEFAULT_MODES, ROWS, ManualClock, TetrisPlayer, apply_action
+from headless import random_policy
+from replay import Replay, ReplayRecorder, TICK_MS, play_replay
+
+
+def state(player):
+    return (player.score, player.lines, player.level, player.pieces, player.game_over_cause,
+            tuple(player.board.masks), tuple(map(tuple, player.board.colors)),
+            player.queue.index, player.rng.getstate())
+
+
+def record(seeds, modes, policies, ticks, tick_ms=TICK_MS, cols=COLS, rows=ROWS):
+    """Play len(seeds) players side by side, recording every action."""
+    clock = ManualClock()
+    players = [TetrisPlayer(modes, side_name=f"P{i + 1}", clock=clock, seed=seed, cols=cols, rows=rows)
+               for i, seed in enumerate(seeds)]
+    recorder = ReplayRecorder(seeds, modes, tick_ms, cols, rows)
+    rngs = [random.Random(~seed) for seed in seeds]
+    tick = 0
+    alive = True
+    while alive and tick < ticks:
+        # same order as ReplayRunner: every input of the tick, then the steps
+        for idx, player in enumerate(players):
+            for action in policies[idx](player, rngs[idx]):
+                recorder.record(tick, idx, action)
+                if not apply_action(player, action):
+                    alive = False
+                    break
+        if not alive:
+            break
+        for player in players:
+            if not player.step():
+                alive = False
+        clock.advance(tick_ms)
+        tick += 1
+    return players, recorder.finish(tick)
+
+
+def test_replay_reproduces_game(tmp_path):
+    modes = dict(DEFAULT_MODES)
+    players, replay = record([5, 6], modes, [random_policy, ai_policy], 3000)
+    assert players[0].pieces and players[1].pieces
+    path = tmp_path / "game.trpl"
+    replay.save(path)
+    loaded = Replay.load(path)
+    assert (loaded.seeds, loaded.modes, loaded.total_ticks) == (replay.seeds, replay.modes, replay.total_ticks)
+    assert loaded.events == replay.events
+    replayed = play_replay(loaded)
+    assert [state(p) for p in replayed] == [state(p) for p in players]
+
+
+def test_replay_seven_bag_without_bombs():
+    modes = dict(DEFAULT_MODES, seven_bag=True, bombs=False, hyper_mode=False)
+    players, replay = record([11], modes, [ai_policy], 2000)
+    replayed, = play_replay(Replay.from_bytes(replay.to_bytes()))
+    assert replayed.modes == modes
+    assert state(replayed) == state(players[0])
+
+
+def test_replay_keeps_a_fractional_tick():
+    # the live loop ticks at exactly 60 Hz: 16/17/17 ms of game time
+    tick_ms = Fraction(1000, 60)
+    players, replay = record([8], dict(DEFAULT_MODES), [random_policy], 1500, tick_ms)
+    loaded = Replay.from_bytes(replay.to_bytes())
+    assert loaded.tick_ms == tick_ms
+    replayed, = play_replay(loaded)
+    assert state(replayed) == state(players[0])
+    assert Replay.from_bytes(Replay([1], DEFAULT_MODES, 16).to_bytes()).tick_ms == 16
+
+
+def test_replay_keeps_the_board_size():
+    players, replay = record([9, 10], dict(DEFAULT_MODES), [ai_policy, random_policy], 2000, cols=7, rows=14)
+    assert players[0].pieces and players[1].pieces
+    loaded = Replay.from_bytes(replay.to_bytes())
+    assert (loaded.cols, loaded.rows) == (7, 14)
+    replayed = play_replay(loaded)
+    assert [(p.board.cols, p.board.rows) for p in replayed] == [(7, 14)] * 2
+    assert [state(p) for p in replayed] == [state(p) for p in players]
@@ -0,0 +1,110 @@
+"""Snapshot round trip: a loaded game plays on exactly like the original."""
+
+import random
+
+import pytest
+
+from engine import DEFAULT_MODES, ManualClock, TetrisPlayer, apply_action
+import snapshot
+
+TICK = 16
+# no hard drops, so the stack grows slowly enough for bombs and lock delays
+MOVES = ("left", "right", "rotate", "soft", "hold", "left", "right")
+
+
+def play(player, rng, ticks):
+    for _ in range(ticks):
+        if player.game_over_cause is None and rng.random() < 0.1:
+            apply_action(player, rng.choice(MOVES))
+        if player.game_over_cause is None:
+            player.step()
+        player.clock.advance(TICK)
+
+
+def state(player):
+    now = player.clock.ticks()
+    piece = player.current
+    hold = player.hold_piece
+    return (
+        player.score, player.lines, player.level, player.pieces, player.game_over_cause,
+        tuple(player.board.masks), tuple(map(tuple, player.board.colors)), dict(player.board.bombs),
+        (piece.base_id, piece.rotation, piece.x, piece.y, piece.is_bomb),
+        hold and (hold.base_id, hold.is_bomb),
+        player.queue.index, [p.base_id for p in player.queue.preview],
+        player.gravity, player.gravity_acc, player.lock_resets,
+        None if player.lock_started is None else now - player.lock_started,
+        [(when - now, kind) for when, kind in player.events.items()],
+        player.rng.getstate(),
+    )
+
+
+def mid_game(seed):
+    """A player with a held piece, live bombs on the board, pending events
+    and the current piece on the ground inside its lock delay."""
+    clock = ManualClock()
+    player = TetrisPlayer(dict(DEFAULT_MODES), clock=clock, seed=seed)
+    player.blast.fuse_on_lock = False  # bomb pieces stay on the board
+    rng = random.Random(seed)
+    play(player, rng, 300)
+    if player.hold_piece is None:
+        apply_action(player, "hold")
+    for _ in range(5000):
+        if player.board.bombs and player.lock_started is not None and player.hold_piece is not None:
+            break
+        play(player, rng, 1)
+    assert player.game_over_cause is None
+    assert player.board.bombs and player.lock_started is not None and player.hold_piece is not None
+    assert len(player.events)
+    return player, rng
+
+
+def test_snapshot_continues_identically():
+    for seed in (3, 15, 24):
+        player, rng = mid_game(seed)
+        data = snapshot.dumps([player])
+        loaded, = snapshot.loads(data, ManualClock())
+        assert state(loaded) == state(player)
+        assert snapshot.dumps([loaded]) == data
+
+        loaded_rng = random.Random()
+        loaded_rng.setstate(rng.getstate())
+        for _ in range(20):
+            play(player, rng, 100)
+            play(loaded, loaded_rng, 100)
+            assert state(loaded) == state(player), seed
+
+
+def test_snapshot_two_players_share_modes():
+    clock = ManualClock()
+    modes = dict(DEFAULT_MODES, seven_bag=True)
+    players = [TetrisPlayer(modes, side_name=f"P{i + 1}", clock=clock, seed=40 + i) for i in range(2)]
+    rng = random.Random(1)
+    for player in players:
+        play(player, rng, 200)
+    loaded = snapshot.loads(snapshot.dumps(players))
+    assert [p.side_name for p in loaded] == ["P1", "P2"]
+    assert loaded[0].modes is loaded[1].modes and loaded[0].modes == modes
+    assert [state(p) for p in loaded] == [state(p) for p in players]
+
+
+def test_snapshot_rejects_other_data():
+    with pytest.raises(ValueError):
+        snapshot.loads(b"TRPL\x04\x00")
+
+
+def test_truncated_or_damaged_snapshot_raises_value_error():
+    player, _ = mid_game(3)
+    data = snapshot.dumps([player])
+    for cut in list(range(0, 64)) + [len(data) // 2, len(data) - 5, len(data) - 1]:
+        with pytest.raises(ValueError):
+            snapshot.loads(data[:cut])
+    with pytest.raises(ValueError):
+        snapshot.loads(data + b"\0")
+    rng = random.Random(1)
+    for _ in range(500):
+        damaged = bytearray(data)
+        damaged[rng.randrange(len(damaged))] = rng.randrange(256)
+        try:
+            snapshot.loads(bytes(damaged))
+        except ValueError:
+            pass  # anything else would crash quick load (F9)
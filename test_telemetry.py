@@ -0,0 +1,55 @@
+"""Telemetry log + analyzer: columns by name, modes mask like replays."""
+
+import json
+
+import pytest
+
+from engine import DEFAULT_MODES, ManualClock, TetrisPlayer
+from headless import run_game
+from netplay import modes_to_mask
+from telemetry import FORMAT, TABLES, VERSION, Analyzer, SessionLog
+
+
+def test_session_log_round_trip(tmp_path):
+    path = tmp_path / "runs.tlog"
+    log = SessionLog(str(path))
+    results = [run_game(seed, max_ticks=3000, telemetry=log) for seed in range(5)]
+    log.close()
+    analyzer = Analyzer()
+    analyzer.feed_file(path)
+    assert analyzer.games == analyzer.finished == 5
+    assert analyzer.pieces == sum(r["pieces"] for r in results)
+    assert sum(n * c for n, c in enumerate(analyzer.clears)) == sum(r["lines"] for r in results)
+    assert analyzer.game_score.n == 5 and analyzer.bad_lines == 0
+
+
+def test_analyzer_reads_columns_by_name(tmp_path):
+    tables = {name: list(reversed(cols)) + ["extra"] for name, cols in TABLES.items()}
+    piece = dict(zip(TABLES["piece"], [1, 100, 0, 3, 1, 0, 4, 18, 250, 2, 1, 5, 0, 0, 2000, 1, 1498]))
+    end = dict(zip(TABLES["end"], [1, 9000, 1, 2, 2000, 1, "block_out"]))
+    lines = [{"format": FORMAT, "version": VERSION, "tables": tables},
+             ["piece"] + [piece[c] for c in tables["piece"][:-1]] + [None],
+             ["end"] + [end[c] for c in tables["end"][:-1]] + [None]]
+    path = tmp_path / "reordered.tlog"
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    analyzer = Analyzer()
+    analyzer.feed_file(path)
+    report = analyzer.report()
+    assert report["shapes"]["L"] == 1 and report["bomb_pieces"] == 1
+    assert report["clears"]["2"] == 1 and report["cells_blasted"] == 5
+    assert report["game_over"] == {"block_out": 1}
+    assert (analyzer.lock_ms.max, analyzer.game_ms.max, analyzer.game_score.max) == (250, 9000, 2000)
+
+    tables["piece"].remove("lock_ms")
+    path.write_text(json.dumps({"format": FORMAT, "version": VERSION, "tables": tables}) + "\n")
+    with pytest.raises(ValueError):
+        Analyzer().feed_file(path)
+
+
+def test_modes_mask_matches_replays(tmp_path):
+    modes = dict(DEFAULT_MODES, seven_bag=True, invisible_mode=False)
+    log = SessionLog(str(tmp_path / "modes.tlog"))
+    log.bind(TetrisPlayer(modes, clock=ManualClock(), seed=1))
+    log.close()
+    game = json.loads((tmp_path / "modes.tlog").read_text().splitlines()[1])
+    assert game[0] == "game" and game[-1] == modes_to_mask(modes)
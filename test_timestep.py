@@ -0,0 +1,53 @@
+"""FixedTimestep (accumulator, catch-up clamp, alpha) and fractional ManualClock ticks."""
+
+from fractions import Fraction
+
+import pytest
+
+from engine import FixedTimestep, ManualClock
+
+HZ60 = Fraction(1000, 60)
+
+
+def test_accumulator_carries_the_remainder():
+    timestep = FixedTimestep(10)
+    assert timestep.advance(7) == 0
+    assert timestep.advance(7) == 1  # 14 ms: one tick, 4 left over
+    assert timestep.accumulator == 4
+    assert timestep.advance(26) == 3
+    assert timestep.accumulator == 0 and timestep.dropped == 0
+
+
+def test_long_stall_is_clamped_to_max_steps():
+    timestep = FixedTimestep(10, max_steps=5)
+    assert timestep.advance(123) == 5
+    assert timestep.dropped == 7  # 12 whole ticks due, 5 run
+    assert timestep.accumulator == 3  # the fraction of a tick is kept
+    assert timestep.advance(7) == 1
+
+
+def test_alpha_is_the_fraction_of_the_next_tick():
+    timestep = FixedTimestep(20)
+    timestep.advance(45)
+    assert timestep.alpha() == pytest.approx(0.25)
+    timestep.reset()
+    assert timestep.alpha() == 0
+
+
+def test_fractional_tick_runs_at_exactly_60_hz():
+    timestep = FixedTimestep(HZ60, max_steps=100)
+    # one second of 1 ms frames: 60 ticks, not the 62 a 16 ms tick gives
+    assert sum(timestep.advance(1) for _ in range(1000)) == 60
+    truncated = FixedTimestep(1000 // 60, max_steps=100)
+    assert sum(truncated.advance(1) for _ in range(1000)) == 62
+
+
+def test_manual_clock_keeps_whole_ms_ticks_without_drift():
+    clock = ManualClock()
+    seen = [clock.ticks()]
+    for _ in range(60):
+        clock.advance(HZ60)
+        seen.append(clock.ticks())
+    assert all(isinstance(t, int) for t in seen)
+    assert {b - a for a, b in zip(seen, seen[1:])} == {16, 17}
+    assert seen[-1] == 1000